@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_score(apps, schema_editor):
+    """Заполнение рейтинга существующих постов (сумма значений оценок)"""
+    Post = apps.get_model('blog', 'Post')
+    Rating = apps.get_model('blog', 'Rating')
+    score = (
+        Rating.objects.filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(total=Sum('mark__value'))
+        .values('total')
+    )
+    Post.objects.update(score=Coalesce(Subquery(score), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_comments_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='score',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Рейтинг поста'),
+        ),
+        migrations.RunPython(fill_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-score', '-id'], name='score_id_idx'),
+        ),
+    ]
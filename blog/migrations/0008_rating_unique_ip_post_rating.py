@@ -0,0 +1,52 @@
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def delete_duplicate_ratings(apps, schema_editor):
+    """
+    Удаление повторных рейтингов одного ip к посту (сохраняется последний добавленный рейтинг)
+    и пересчёт рейтинга постов и авторов по оставшимся оценкам
+    """
+    Post = apps.get_model('blog', 'Post')
+    Rating = apps.get_model('blog', 'Rating')
+    User = apps.get_model('users', 'User')
+
+    last_ids = Rating.objects.values('ip', 'post').annotate(last_id=Max('id')).values('last_id')
+    deleted, _ = Rating.objects.exclude(id__in=Subquery(last_ids)).delete()
+    if not deleted:
+        return
+
+    post_score = (
+        Rating.objects.filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(total=Sum('mark__value'))
+        .values('total')
+    )
+    Post.objects.update(score=Coalesce(Subquery(post_score), 0))
+
+    author_rating = (
+        Rating.objects.filter(post__author=OuterRef('pk'))
+        .order_by()
+        .values('post__author')
+        .annotate(total=Sum('mark__value'))
+        .values('total')
+    )
+    User.objects.update(user_rating=Coalesce(Subquery(author_rating), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_score'),
+        ('users', '0005_user_description_en_user_description_ru'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_ratings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('ip', 'post'), name='unique_ip_post_rating'),
+        ),
+    ]
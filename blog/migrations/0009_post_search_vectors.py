@@ -0,0 +1,51 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_CONFIGS = {'ru': 'russian', 'en': 'english'}
+
+
+def fill_search_vectors(apps, schema_editor):
+    """Заполнение поисковых векторов существующих постов (заголовок с весом A, содержание с весом B)"""
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.update(
+        **{
+            f'search_vector_{language}': SearchVector(f'title_{language}', weight='A', config=config)
+            + SearchVector(f'body_{language}', weight='B', config=config)
+            for language, config in SEARCH_CONFIGS.items()
+        }
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_rating_unique_ip_post_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector_en',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name='Поисковый вектор [en]'
+            ),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='search_vector_ru',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name='Поисковый вектор [ru]'
+            ),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector_ru'], name='search_vector_ru_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector_en'], name='search_vector_en_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_post_search_vectors'),
+        ('taggit', '0005_auto_20220424_2025'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['title_ru'], name='title_ru_trgm_idx', opclasses=('gin_trgm_ops',)
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['title_en'], name='title_en_trgm_idx', opclasses=('gin_trgm_ops',)
+            ),
+        ),
+        # Индекс триграмм названий тегов (модель приложения taggit, поэтому индекс создаётся SQL-запросом)
+        migrations.RunSQL(
+            'CREATE INDEX taggit_tag_name_trgm_idx ON taggit_tag USING gin (name gin_trgm_ops);',
+            'DROP INDEX IF EXISTS taggit_tag_name_trgm_idx;',
+        ),
+    ]
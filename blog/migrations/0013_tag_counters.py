@@ -0,0 +1,83 @@
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_tag_counters(apps, schema_editor):
+    """Заполнение счётчиков опубликованных постов с тегами (всего и по категориям) для существующих постов"""
+    Post = apps.get_model('blog', 'Post')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    TagCounter = apps.get_model('blog', 'TagCounter')
+
+    post_categories = dict(Post.objects.filter(draft=False).values_list('id', 'category_id'))
+    tagged_items = TaggedItem.objects.filter(content_type__app_label='blog', content_type__model='post').values_list(
+        'tag_id', 'object_id'
+    )
+
+    counts = Counter()
+    for tag_id, post_id in tagged_items.iterator():
+        if post_id not in post_categories:
+            continue
+        counts[tag_id, None] += 1
+        if post_categories[post_id] is not None:
+            counts[tag_id, post_categories[post_id]] += 1
+
+    TagCounter.objects.bulk_create(
+        TagCounter(tag_id=tag_id, category_id=category_id, posts_count=posts_count)
+        for (tag_id, category_id), posts_count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taggit', '0005_auto_20220424_2025'),
+        ('blog', '0012_comment_replies_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                (
+                    'category',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='tag_counters',
+                        to='blog.category',
+                        verbose_name='Категория',
+                    ),
+                ),
+                (
+                    'tag',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='counters',
+                        to='taggit.tag',
+                        verbose_name='Тег',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Счётчик тега',
+                'verbose_name_plural': 'Счётчики тегов',
+                'indexes': [models.Index(fields=['category', '-posts_count', 'tag'], name='category_posts_count_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tagcounter',
+            constraint=models.UniqueConstraint(fields=('tag', 'category'), name='unique_tag_category_counter'),
+        ),
+        migrations.AddConstraint(
+            model_name='tagcounter',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('category', None)), fields=('tag',), name='unique_tag_total_counter'
+            ),
+        ),
+        migrations.RunPython(fill_tag_counters, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,11 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
 from django.db import models
 from django.utils import timezone
 from taggit.managers import TaggableManager
+from taggit.models import Tag
 
 
 class Category(models.Model):
@@ -37,6 +40,9 @@ class Video(models.Model):
         ordering = ('-create_at',)
         verbose_name = 'Видеозапись'
         verbose_name_plural = 'Видеозаписи'
+        indexes = [
+            models.Index(fields=('-create_at', '-id'), name='create_at_id_idx'),
+        ]
 
 
 class Post(models.Model):
@@ -73,6 +79,10 @@ class Post(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     draft = models.BooleanField(default=False, verbose_name='Черновик')
+    comments_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев')
+    score = models.IntegerField(default=0, editable=False, verbose_name='Рейтинг поста')
+    search_vector_ru = SearchVectorField(null=True, editable=False, verbose_name='Поисковый вектор [ru]')
+    search_vector_en = SearchVectorField(null=True, editable=False, verbose_name='Поисковый вектор [en]')
 
     def __str__(self):
         return self.title
@@ -82,6 +92,11 @@ class Post(models.Model):
         verbose_name_plural = 'Посты'
         indexes = [
             models.Index(fields=('-publish', '-id'), name='publish_id_idx'),
+            models.Index(fields=('-score', '-id'), name='score_id_idx'),
+            GinIndex(fields=('search_vector_ru',), name='search_vector_ru_idx'),
+            GinIndex(fields=('search_vector_en',), name='search_vector_en_idx'),
+            GinIndex(fields=('title_ru',), opclasses=('gin_trgm_ops',), name='title_ru_trgm_idx'),
+            GinIndex(fields=('title_en',), opclasses=('gin_trgm_ops',), name='title_en_trgm_idx'),
         ]
         ordering = ('-publish', '-id')
 
@@ -122,6 +137,10 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('created',)
+        indexes = [
+            models.Index(fields=('post', 'created', 'id'), name='post_created_id_idx'),
+            models.Index(fields=('parent', 'created', 'id'), name='parent_created_id_idx'),
+        ]
 
 
 class Mark(models.Model):
@@ -152,3 +171,40 @@ class Rating(models.Model):
     class Meta:
         verbose_name = 'Рейтинг'
         verbose_name_plural = 'Рейтинги'
+        constraints = [
+            models.UniqueConstraint(fields=('ip', 'post'), name='unique_ip_post_rating'),
+        ]
+
+
+class TagCounter(models.Model):
+    """
+    Счётчик опубликованных постов с тегом: всего (категория не указана) и в отдельной категории.
+    Поддерживается обработчиками сигналов постов и тегов (см. services.tag_counters)
+    """
+
+    tag = models.ForeignKey(Tag, verbose_name='Тег', on_delete=models.CASCADE, related_name='counters')
+    category = models.ForeignKey(
+        'blog.Category',
+        verbose_name='Категория',
+        on_delete=models.CASCADE,
+        related_name='tag_counters',
+        blank=True,
+        null=True,
+    )
+    posts_count = models.PositiveIntegerField(verbose_name='Количество постов', default=0)
+
+    def __str__(self):
+        return f'{self.tag}: {self.posts_count}'
+
+    class Meta:
+        verbose_name = 'Счётчик тега'
+        verbose_name_plural = 'Счётчики тегов'
+        indexes = [
+            models.Index(fields=('category', '-posts_count', 'tag'), name='category_posts_count_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=('tag', 'category'), name='unique_tag_category_counter'),
+            models.UniqueConstraint(
+                fields=('tag',), condition=models.Q(category=None), name='unique_tag_total_counter'
+            ),
+        ]
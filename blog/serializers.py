@@ -1,10 +1,14 @@
+from collections import defaultdict
+from typing import Iterable
+
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 from taggit.models import Tag
 
 from blog.models import Category, Comment, Post, Rating, Video
-from blog_by_me_DRF.settings import KEY_SIMPLE_POSTS_LIST
+from blog_by_me_DRF.settings import COMMENT_REPLIES_LIMIT, KEY_COMMENT_REPLIES
+from services.blog.paginators import CursorPaginationForComments
 from services.queryset import qs_definition
 from users.serializers import AuthorDetailSerializer
 
@@ -32,7 +36,7 @@ class PostsSerializer(TagsSerializerMixin, serializers.ModelSerializer):
 
     category = serializers.SlugRelatedField(slug_field='name', read_only=True)
     author = AuthorDetailSerializer(fields=('id', 'username'))
-    ncomments = serializers.IntegerField()
+    ncomments = serializers.IntegerField(source='comments_count', read_only=True)
 
     def __init__(self, *args, **kwargs):
         fields = kwargs.pop('fields', None)
@@ -47,7 +51,20 @@ class PostsSerializer(TagsSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        exclude = ('created', 'updated', 'draft', 'video', 'title_ru', 'title_en', 'body_en', 'body_ru')
+        exclude = (
+            'created',
+            'updated',
+            'draft',
+            'video',
+            'title_ru',
+            'title_en',
+            'body_en',
+            'body_ru',
+            'comments_count',
+            'score',
+            'search_vector_ru',
+            'search_vector_en',
+        )
 
 
 class VideoDetailSerializer(serializers.ModelSerializer):
@@ -58,28 +75,71 @@ class VideoDetailSerializer(serializers.ModelSerializer):
         fields = ('title', 'file')
 
 
-class CommentsSerializer(serializers.ModelSerializer):
-    """Вывод комментариев к постам"""
+class CommentTreeListSerializer(serializers.ListSerializer):
+    """
+    Вывод списка комментариев в виде дерева из двух уровней за один проход.
 
-    children = serializers.SerializerMethodField()
+    Вместо отдельного сериализатора для ответов каждого комментария первого уровня ответы на все комментарии
+    страницы получаются одним упорядоченным запросом (не более COMMENT_REPLIES_LIMIT + 1 на комментарий)
+    и распределяются по комментариям за один проход. Комментарии и ответы выбираются словарями
+    (см. queryset.COMMENT_FIELDS), поэтому объекты модели и сериализаторы для каждого объекта не создаются
+    """
 
-    def get_children(self, obj):
-        """
-        Возвращает вложенные комментарии второго уровня для комментария первого уровня.
+    def to_representation(self, data):
+        comments = list(data)
+        parent_ids = [comment['id'] for comment in comments if comment['parent_id'] is None]
+        replies = qs_definition(KEY_COMMENT_REPLIES, parent_ids=parent_ids) if parent_ids else ()
+        return self.build_tree(comments, replies)
 
-        Метод проверяет, есть ли предзагруженные данные для комментариев второго уровня
-        в атрибуте `prefetched_comments2`. Если данные есть, они сериализуются и возвращаются.
-        Если данных нет, возвращается пустой список, что означает отсутствие данных,
-        а не ошибку в предзагрузке.
+    def build_tree(self, comments: list[dict], replies: Iterable[dict]) -> list[dict]:
+        """
+        Дерево комментариев в формате CommentsSerializer (без запросов к БД).
+        replies - ответы на комментарии первого уровня, упорядоченные по времени создания
         """
+        replies_by_parent = defaultdict(list)
+        for reply in replies:
+            replies_by_parent[reply['parent_id']].append(reply)
+
+        request = self.context.get('request')
+        paginator = CursorPaginationForComments()
+        created_field, updated_field = self.child.fields['created'], self.child.fields['updated']
+
+        def represent(comment: dict, children: list[dict], more_replies: str | None) -> dict:
+            return {
+                'id': comment['id'],
+                'children': children,
+                'more_replies': more_replies,
+                'name': comment['name'],
+                'text': comment['text'],
+                'created': created_field.to_representation(comment['created']),
+                'updated': updated_field.to_representation(comment['updated']),
+                'post': comment['post_id'],
+            }
+
+        tree = []
+        for comment in comments:
+            comment_replies = replies_by_parent.get(comment['id'], [])
+            children = [represent(reply, [], None) for reply in comment_replies[:COMMENT_REPLIES_LIMIT]]
+            more_replies = paginator.get_replies_link(request, comment, comment_replies) if request else None
+            tree.append(represent(comment, children, more_replies))
+        return tree
+
+
+class CommentsSerializer(serializers.ModelSerializer):
+    """
+    Вывод комментариев к постам.
+
+    Комментарии первого уровня выводятся с первыми COMMENT_REPLIES_LIMIT ответами (children)
+    и ссылкой на остальные ответы (more_replies), список формируется CommentTreeListSerializer
+    """
 
-        if hasattr(obj, 'prefetched_comments2'):
-            return CommentsSerializer(obj.prefetched_comments2, many=True, context=self.context).data
-        return []
+    children = serializers.ListField(child=serializers.DictField(), read_only=True)
+    more_replies = serializers.URLField(read_only=True, allow_null=True)
 
     class Meta:
         model = Comment
         exclude = ('email', 'active', 'parent')
+        list_serializer_class = CommentTreeListSerializer
 
 
 class AddCommentSerializer(serializers.ModelSerializer):
@@ -118,7 +178,7 @@ class PostDetailSerializer(TagsSerializerMixin, serializers.ModelSerializer):
     category = serializers.SlugRelatedField(slug_field='name', read_only=True)
     author = AuthorDetailSerializer(fields=('id', 'username'))
     video = VideoDetailSerializer(read_only=True)
-    ncomments = serializers.IntegerField()
+    ncomments = serializers.IntegerField(source='comments_count', read_only=True)
 
     def __init__(self, *args, **kwargs):
         fields = kwargs.pop('fields', None)
@@ -133,7 +193,17 @@ class PostDetailSerializer(TagsSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        exclude = ('draft', 'title_ru', 'title_en', 'body_ru', 'body_en')
+        exclude = (
+            'draft',
+            'title_ru',
+            'title_en',
+            'body_ru',
+            'body_en',
+            'comments_count',
+            'score',
+            'search_vector_ru',
+            'search_vector_en',
+        )
 
 
 class CategoryListSerializer(serializers.ModelSerializer):
@@ -148,7 +218,7 @@ class VideoListSerializer(serializers.ModelSerializer):
     """Список видеозаписей"""
 
     post_video = PostDetailSerializer(read_only=True, fields=('id', 'url', 'category', 'author', 'tags'))
-    ncomments = serializers.IntegerField()
+    ncomments = serializers.IntegerField(source='post_video.comments_count', read_only=True)
 
     class Meta:
         model = Video
@@ -163,40 +233,6 @@ class RatingDetailSerializer(serializers.ModelSerializer):
         fields = ('mark',)
 
 
-class AddRatingSerializer(serializers.ModelSerializer):
-    """Создание/обновление рейтинга к посту"""
-
-    # queryset переопределяется в __init__(), чтобы избежать раннего запроса
-    # и всегда иметь актуальные данные (применяется фильтрация по времени)
-    post = serializers.SlugRelatedField(slug_field='url', queryset=Post.objects.none())
-
-    class Meta:
-        model = Rating
-        fields = ('mark', 'post')
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # устанавливаем актуальную выборку постов для поиска значения поля post
-        self.fields['post'].queryset = qs_definition(KEY_SIMPLE_POSTS_LIST)
-
-    def to_internal_value(self, data):
-        """Автоматически добавляет slug в поле post из контекста"""
-        data['post'] = self.context['slug']
-        return super().to_internal_value(data)
-
-    def create(self, validated_data):
-        return Rating.objects.create(
-            ip=validated_data['ip'],
-            mark=validated_data['mark'],
-            post=validated_data['post'],
-        )
-
-    def update(self, instance, validated_data):
-        instance.mark = validated_data.get('mark', instance.mark)
-        instance.save()
-        return instance
-
-
 class TopTagsSerializer(serializers.ModelSerializer):
     npost = serializers.IntegerField()
 
@@ -1,28 +1,146 @@
-from django.core.cache import cache
+from datetime import date
+from functools import partial
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
 from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch.dispatcher import receiver
+from django.utils import timezone
+from taggit.models import Tag, TaggedItem
 
-from blog.models import Post, Video
-from blog_by_me_DRF import settings
+from blog.models import Category, Comment, Post, Rating, Video
+from services import post_filters, search, suggest, tag_counters
+from services.caching import (
+    NAMESPACE_AUTHOR,
+    NAMESPACE_CALENDAR,
+    NAMESPACE_CATEGORIES,
+    NAMESPACE_COMMENTS,
+    NAMESPACE_POST,
+    NAMESPACE_POST_FILTERS,
+    NAMESPACE_POST_TITLES,
+    NAMESPACE_POSTS,
+    NAMESPACE_RATINGS,
+    NAMESPACE_TAGS,
+    NAMESPACE_VIDEOS,
+    bump_cache_version,
+    change_calendar_days,
+    make_namespace,
+)
 
 
-def _clear_cache_post(instance: Post) -> None:
-    """Функция для очистки кэша с данными постов"""
-
-    # Список ключей для кэширования объектов, которые нужно очистить
-    keys_list_objects = [
-        f'{settings.KEY_POSTS_LIST}',
-        f'{settings.KEY_LAST_POSTS}',
-        f'{settings.KEY_POST_DETAIL}{instance.url}',
-        f'{settings.KEY_AUTHOR_DETAIL}{instance.author.id}',
+def _get_post_namespaces(instance: Post) -> list[str]:
+    """Пространства имён кэша, связанные с отдельным постом (сам пост, его автор и месяц публикации)"""
+    publish = timezone.localtime(instance.publish)
+    return [
+        make_namespace(NAMESPACE_POST, instance.url),
+        make_namespace(NAMESPACE_AUTHOR, instance.author_id),
+        make_namespace(NAMESPACE_CALENDAR, f'{publish.year}/{publish.month}'),
     ]
-    # Если у поста есть видео, добавляем ключ для кэширования видеозаписей в список для очистки кэша
-    if instance.video:
-        keys_list_objects.append(f'{settings.KEY_VIDEOS_LIST}')
 
-    # Удаляем кэш для каждого ключа из списка
-    for key in keys_list_objects:
-        cache.delete(f'{settings.CACHE_KEY}{key}')
+
+def _clear_cache_post(instance: Post) -> None:
+    """
+    Функция для очистки кэша с данными постов.
+
+    Увеличивает версии общих пространств имён (списки постов и видео, популярные посты и теги, последние посты)
+    и пространств отдельного поста, включая состояние поста до изменения (slug, автор, месяц публикации)
+    """
+    namespaces = {NAMESPACE_POSTS, NAMESPACE_VIDEOS, NAMESPACE_TAGS, NAMESPACE_POST_FILTERS, NAMESPACE_POST_TITLES}
+    namespaces.update(_get_post_namespaces(instance))
+    namespaces.update(getattr(instance, '_old_cache_namespaces', ()))
+    bump_cache_version(*namespaces)
+
+
+def _is_published(instance: Post) -> bool:
+    """Опубликован ли пост (не черновик и время публикации наступило)"""
+    return not instance.draft and instance.publish <= timezone.now()
+
+
+def _get_calendar_day(instance: Post) -> date | None:
+    """День публикации поста в календаре (None для неопубликованных постов)"""
+    return timezone.localdate(instance.publish) if _is_published(instance) else None
+
+
+def _get_tag_counter_state(instance: Post) -> tuple[bool, int | None]:
+    """Данные поста, от которых зависят счётчики количества постов по тегам (черновик и категория)"""
+    return instance.draft, instance.category_id
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_cache_namespaces(sender, instance, **kwargs):
+    """
+    Запоминает пространства имён кэша поста до изменения (для случаев смены slug, автора или даты публикации),
+    данные поста для счётчиков количества постов по тегам и день его публикации в календаре
+    """
+    instance._old_tag_counter_state = None
+    instance._old_calendar_day = None
+    if instance.id:
+        old_instance = (
+            Post.objects.filter(id=instance.id).only('url', 'author_id', 'publish', 'draft', 'category_id').first()
+        )
+        if old_instance:
+            instance._old_cache_namespaces = _get_post_namespaces(old_instance)
+            instance._old_tag_counter_state = _get_tag_counter_state(old_instance)
+            instance._old_calendar_day = _get_calendar_day(old_instance)
+
+
+@receiver(post_save, sender=Post)
+def clear_cache_when_saving_post(sender, instance, **kwargs):
+    """Вызывает функцию для удаления старых данных из кэша при создании или изменении поста"""
+    _clear_cache_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def update_post_search_vectors(sender, instance, update_fields=None, **kwargs):
+    """Обновляет хранимые поисковые векторы поста при изменении заголовка или содержания"""
+    search_fields = {'title', 'body', 'title_ru', 'title_en', 'body_ru', 'body_en'}
+    if update_fields is None or search_fields.intersection(update_fields):
+        search.update_search_vectors(Post.objects.filter(id=instance.id))
+
+
+@receiver(post_save, sender=Post)
+def update_tag_counters_when_saving_post(sender, instance, **kwargs):
+    """
+    Пересчитывает счётчики количества постов по тегам поста после фиксации снятия поста с черновика,
+    перевода в черновик или смены категории (теги нового поста учитываются при их добавлении)
+    """
+    old_state, new_state = instance._old_tag_counter_state, _get_tag_counter_state(instance)
+    if old_state is None or old_state == new_state or (old_state[0] and new_state[0]):
+        return
+    tag_counters.refresh_tag_counters_on_commit(instance.tags.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Post)
+def update_calendar_when_saving_post(sender, instance, **kwargs):
+    """Изменяет битовые карты календаря при публикации поста, переносе его на другой день или снятии с публикации"""
+    old_day, new_day = instance._old_calendar_day, _get_calendar_day(instance)
+    if old_day == new_day:
+        return
+    days = {old_day: False} if old_day else {}
+    if new_day:
+        days[new_day] = True
+    change_calendar_days(days)
+
+
+@receiver(post_delete, sender=Post)
+def update_calendar_when_deleting_post(sender, instance, **kwargs):
+    """Изменяет битовую карту календаря при удалении опубликованного поста"""
+    day = _get_calendar_day(instance)
+    if day:
+        change_calendar_days({day: False})
+
+
+@receiver(post_save, sender=Post)
+def update_post_title_index(sender, instance, **kwargs):
+    """Обновляет индекс подсказок заголовков текущего процесса после фиксации изменения поста"""
+    transaction.on_commit(partial(suggest.post_title_index.update_post, instance.id, suggest.get_post_entry(instance)))
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_title_index(sender, instance, **kwargs):
+    """Удаляет пост из индекса подсказок заголовков текущего процесса после фиксации удаления"""
+    transaction.on_commit(partial(suggest.post_title_index.remove_post, instance.id))
 
 
 @receiver(post_delete, sender=Post)
@@ -31,6 +149,13 @@ def clear_cache_when_deleting_post(sender, instance, **kwargs):
     _clear_cache_post(instance)
 
 
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def update_post_filter_index(sender, instance, **kwargs):
+    """Обновляет данные поста в индексе фильтрации текущего процесса после фиксации изменения или удаления поста"""
+    transaction.on_commit(partial(post_filters.post_filter_index.refresh_post, instance.id))
+
+
 @receiver(post_delete, sender=Post)
 def post_image_file_delete(sender, instance, **kwargs):
     """Удаляет файл с изображением при удалении поста"""
@@ -47,11 +172,11 @@ def post_image_file_delete_when_replace(sender, instance, **kwargs):
             old_instance.image.delete(save=False)
 
 
-@receiver(post_save, sender=Post)
-def clear_cache_when_draft_post(sender, instance, **kwargs):
-    """Вызывает функцию для удаления старых данных из кэша при скрытии поста поста (draft=True)"""
-    if instance.draft:
-        _clear_cache_post(instance)
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+def clear_cache_when_changing_video(sender, instance, **kwargs):
+    """Удаляет старые данные списка видеозаписей из кэша при изменении или удалении видео"""
+    bump_cache_version(NAMESPACE_VIDEOS)
 
 
 @receiver(post_delete, sender=Video)
@@ -59,3 +184,113 @@ def video_file_delete(sender, instance, **kwargs):
     """Удаляет файл с видео при удалении видео в блоге"""
     if instance.file:
         instance.file.delete(save=False)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def clear_cache_when_changing_category(sender, instance, **kwargs):
+    """Удаляет старые данные категорий и постов (содержат название категории) из кэша и индекс фильтрации постов"""
+    bump_cache_version(NAMESPACE_CATEGORIES, NAMESPACE_POSTS, NAMESPACE_POST_FILTERS)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def clear_cache_when_changing_tags(sender, instance, **kwargs):
+    """
+    Удаляет старые данные тегов и постов (содержат список тегов) из кэша и индекс фильтрации постов
+    при изменении тегов
+    """
+    bump_cache_version(NAMESPACE_TAGS, NAMESPACE_POSTS, NAMESPACE_POST_FILTERS)
+
+
+def _is_post_tagged(instance: TaggedItem) -> bool:
+    """Относится ли тег к посту"""
+    return ContentType.objects.get_for_id(instance.content_type_id).model_class() is Post
+
+
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def update_post_filter_index_when_tagging_post(sender, instance, **kwargs):
+    """Обновляет данные поста в индексе фильтрации текущего процесса после фиксации изменения тегов поста"""
+    if _is_post_tagged(instance):
+        transaction.on_commit(partial(post_filters.post_filter_index.refresh_post, instance.object_id))
+
+
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def update_tag_counters_when_tagging_post(sender, instance, **kwargs):
+    """
+    Пересчитывает счётчики количества постов по тегу после фиксации добавления тега к посту или его удаления
+    (в том числе при удалении поста - связи с тегами удаляются вместе с ним)
+    """
+    if _is_post_tagged(instance):
+        tag_counters.refresh_tag_counters_on_commit([instance.tag_id])
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def clear_cache_when_changing_rating(sender, instance, **kwargs):
+    """Удаляет старые данные популярных постов из кэша при изменении рейтинга"""
+    bump_cache_version(NAMESPACE_RATINGS)
+
+
+def _change_comments_count(post_id: int, delta: int) -> None:
+    """
+    Изменение хранимого количества активных комментариев поста на delta
+    с удалением из кэша данных поста, списков постов и видеозаписей (содержат количество комментариев)
+    """
+    posts = Post.objects.filter(id=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    posts.update(comments_count=F('comments_count') + delta)
+
+    namespaces = [NAMESPACE_POSTS, NAMESPACE_VIDEOS]
+    post_url = Post.objects.filter(id=post_id).values_list('url', flat=True).first()
+    if post_url:
+        namespaces.append(make_namespace(NAMESPACE_POST, post_url))
+    bump_cache_version(*namespaces)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_counted_post(sender, instance, **kwargs):
+    """
+    Запоминает пост комментария до изменения (для смены поста) и пост, в счётчике которого учитывался
+    комментарий (только для активных комментариев)
+    """
+    instance._old_post_id = instance._old_counted_post_id = None
+    if instance.id:
+        old_instance = Comment.objects.filter(id=instance.id).values('post_id', 'active').first()
+        if old_instance:
+            instance._old_post_id = old_instance['post_id']
+            if old_instance['active']:
+                instance._old_counted_post_id = old_instance['post_id']
+
+
+@receiver(post_save, sender=Comment)
+def update_comments_count_when_saving_comment(sender, instance, **kwargs):
+    """Обновляет количество комментариев поста при создании комментария, смене его активности или поста"""
+    old_post_id = instance._old_counted_post_id
+    new_post_id = instance.post_id if instance.active else None
+    if old_post_id == new_post_id:
+        return
+    if old_post_id:
+        _change_comments_count(old_post_id, -1)
+    if new_post_id:
+        _change_comments_count(new_post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def update_comments_count_when_deleting_comment(sender, instance, **kwargs):
+    """Уменьшает количество комментариев поста при удалении активного комментария"""
+    if instance.active:
+        _change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def clear_cache_when_changing_comment(sender, instance, **kwargs):
+    """Удаляет старые страницы комментариев поста (и прежнего поста комментария) из кэша"""
+    post_ids = {instance.post_id, getattr(instance, '_old_post_id', None)} - {None}
+    bump_cache_version(*(make_namespace(NAMESPACE_COMMENTS, post_id) for post_id in post_ids))
@@ -25,6 +25,7 @@ router.register(r'comments', views.CommentViewSet, basename='Comment')
 urlpatterns = [
     path('', include(router.urls)),
     path('posts/<slug:slug>/rating/', views.RatingViewSet.as_view({'get': 'retrieve', 'post': 'create_or_update'})),
+    path('calendar/<int:year>/', views.DaysInYearCalendarView.as_view()),
     path('calendar/<int:year>/<int:month>/', views.DaysInCalendarView.as_view()),
     path('top-tags/', views.TagViewSet.as_view({'get': 'list'})),
     path('categories/', views.CategoryViewSet.as_view({'get': 'list'})),
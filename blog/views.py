@@ -8,7 +8,7 @@ from rest_framework.views import APIView
 
 from blog import serializers
 from blog_by_me_DRF import settings
-from services import caching, queryset, search
+from services import caching, queryset, search, suggest
 from services.blog import paginators, validators
 from services.client_ip import get_client_ip
 from services.rating import ServiceUserRating
@@ -180,17 +180,20 @@ from services.renderer import NoHTMLFormBrowsableAPIRenderer
 #         return super().get_serializer(*args, **kwargs)
 
 
-class PostViewSet(viewsets.ReadOnlyModelViewSet):
+class PostViewSet(caching.CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """
     Вьюсет для работы с постами блога.
 
     Поддерживаемые действия:
     - Вывод списка постов
-    - Поиск постов по запросу
+    - Поиск постов по запросу (полнотекстовый или с нечётким поиском при опечатках)
+    - Подсказки заголовков постов при поиске по мере ввода
     - Фильтрация постов по дате
     - Фильтрация постов по тегу
+    - Фильтрация постов по категории
+    - Фильтрация постов по пересечению нескольких тегов, категории и даты публикации
     - Вывод отдельного поста
-    - Вывод трёх постов с наивысшим рейтингом
+    - Вывод трёх постов с наивысшим рейтингом (за всё время, неделю или месяц)
     - Вывод трёх последних опубликованных постов
     """
 
@@ -200,9 +203,17 @@ class PostViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False)
     def search(self, request, *args, **kwargs):
         self.kwargs['q'] = self.request.query_params.get('q')
+        self.kwargs['mode'] = self.request.query_params.get('mode')
         validators.validate_q_param(self.kwargs['q'])
+        validators.validate_search_mode_param(self.kwargs['mode'])
         return self.list(request, *args, **kwargs)
 
+    @action(detail=False)
+    def suggest(self, request, *args, **kwargs):
+        q = self.request.query_params.get('q')
+        validators.validate_q_param(q)
+        return Response(suggest.suggest_titles(q, self.request.LANGUAGE_CODE))
+
     @action(detail=False, url_path=r'date/(?P<date_post>[^/]+)')
     def filter_by_date(self, request, *args, **kwargs):
         validators.validate_date_format(self.kwargs['date_post'])
@@ -212,40 +223,91 @@ class PostViewSet(viewsets.ReadOnlyModelViewSet):
     def filter_by_tag(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
+    @action(detail=False, url_path=r'category/(?P<category_slug>[^/]+)')
+    def filter_by_category(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
+    @action(detail=False, url_path=r'filter')
+    def filter_posts(self, request, *args, **kwargs):
+        self.kwargs['tags'] = self.request.query_params.getlist('tag')
+        self.kwargs['category'] = self.request.query_params.get('category')
+        self.kwargs['date'] = self.request.query_params.get('date')
+        validators.validate_filter_params(self.kwargs['tags'], self.kwargs['category'], self.kwargs['date'])
+        return self.list(request, *args, **kwargs)
+
     @action(detail=False, url_path=r'top-posts')
     def top_posts(self, request, *args, **kwargs):
+        self.kwargs['period'] = self.request.query_params.get('period')
+        validators.validate_period_param(self.kwargs['period'])
         return self.list(request, *args, **kwargs)
 
     @action(detail=False, url_path=r'last-posts')
     def last_posts(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_response_cache_dependencies(self):
+        if self.action == 'top_posts':
+            return settings.KEY_TOP_POSTS, self._get_top_posts_kwargs()
+        elif self.action == 'last_posts':
+            return settings.KEY_LAST_POSTS, {}
+        elif self.detail:
+            return settings.KEY_POST_DETAIL, {'slug': self.kwargs['slug']}
+        else:
+            return settings.KEY_POSTS_LIST, {}
+
     def get_queryset(self):
         if self.action == 'top_posts':
-            return caching.get_cached_objects_or_queryset(settings.KEY_TOP_POSTS)
+            return caching.get_cached_objects_or_queryset(settings.KEY_TOP_POSTS, **self._get_top_posts_kwargs())
         elif self.action == 'last_posts':
             return caching.get_cached_objects_or_queryset(settings.KEY_LAST_POSTS)
-        else:
+        elif self.action == 'list' and isinstance(self.paginator, paginators.PageNumberPaginationForPosts):
             return caching.get_cached_objects_or_queryset(settings.KEY_POSTS_LIST)
+        else:
+            # Пагинация по ключу, поиск и фильтрация дополняют выборку условиями (запрос к БД выполняется в любом
+            # случае), поэтому вычисленная выборка из кэша не используется, чтобы не загружать из кэша весь список
+            return queryset.qs_definition(settings.KEY_POSTS_LIST)
 
     def filter_queryset(self, queryset):
         if self.action == 'search':
-            return search.search_by_q(self.kwargs['q'], queryset, self.request.LANGUAGE_CODE)
+            return search.search_by_q(self.kwargs['q'], queryset, self.request.LANGUAGE_CODE, self.kwargs['mode'])
         elif self.action == 'filter_by_date':
             return search.search_by_date(queryset, self.kwargs['date_post'])
         elif self.action == 'filter_by_tag':
             return search.search_by_tag(queryset, self.kwargs['tag_slug'])
+        elif self.action == 'filter_by_category':
+            return search.search_by_category(queryset, self.kwargs['category_slug'])
+        elif self.action == 'filter_posts':
+            return search.search_by_filters(queryset, self.kwargs['tags'], self.kwargs['category'], self.kwargs['date'])
         else:
             return queryset
 
     def get_object(self):
         return caching.get_cached_objects_or_queryset(settings.KEY_POST_DETAIL, slug=self.kwargs['slug'])
 
+    def _get_top_posts_kwargs(self):
+        # Период передаётся только если он указан (без периода выводятся популярные посты за всё время)
+        return {'period': self.kwargs['period']} if self.kwargs['period'] else {}
+
     @property
     def paginator(self):
         # Динамический выбор пагинации через параметр 'pagination'
+        # (результаты поиска по умолчанию выводятся постранично в порядке релевантности)
         if not hasattr(self, '_paginator'):
-            self._paginator = paginators.get_paginator_for_post_list(self.request.query_params.get('pagination'))
+            if self.action in ('top_posts', 'last_posts'):
+                # Популярные и последние посты - срез выборки из нескольких постов, который нельзя пересортировать
+                # для пагинации по ключу, поэтому они всегда выводятся постранично
+                self._paginator = paginators.PageNumberPaginationForPosts()
+            else:
+                self._paginator = paginators.get_paginator_for_post_list(
+                    self.request.query_params.get('pagination'),
+                    default='page' if self.action == 'search' else 'cursor',
+                )
         return self._paginator
 
     def get_serializer(self, *args, **kwargs):
@@ -280,11 +342,17 @@ class PostViewSet(viewsets.ReadOnlyModelViewSet):
 #         return caching.get_cached_objects_or_queryset(settings.KEY_CATEGORIES_LIST)
 
 
-class CategoryViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+class CategoryViewSet(caching.CachedResponseMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
     """Вывод списка категорий"""
 
     serializer_class = serializers.CategoryListSerializer
 
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def get_response_cache_dependencies(self):
+        return settings.KEY_CATEGORIES_LIST, {}
+
     def get_queryset(self):
         return caching.get_cached_objects_or_queryset(settings.KEY_CATEGORIES_LIST)
 
@@ -310,14 +378,29 @@ class CategoryViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
 #         return caching.get_cached_objects_or_queryset(settings.KEY_VIDEOS_LIST)
 
 
-class VideoViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+class VideoViewSet(caching.CachedResponseMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
     """Вывод всех видеозаписей"""
 
     serializer_class = serializers.VideoListSerializer
-    pagination_class = paginators.LimitOffsetPaginationForVideoList
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def get_response_cache_dependencies(self):
+        return settings.KEY_VIDEOS_LIST, {}
 
     def get_queryset(self):
-        return caching.get_cached_objects_or_queryset(settings.KEY_VIDEOS_LIST)
+        if isinstance(self.paginator, paginators.LimitOffsetPaginationForVideoList):
+            return caching.get_cached_objects_or_queryset(settings.KEY_VIDEOS_LIST)
+        # Пагинация по ключу дополняет выборку условием, поэтому вычисленная выборка из кэша не используется
+        return queryset.qs_definition(settings.KEY_VIDEOS_LIST)
+
+    @property
+    def paginator(self):
+        # Динамический выбор пагинации через параметр 'pagination'
+        if not hasattr(self, '_paginator'):
+            self._paginator = paginators.get_paginator_for_video_list(self.request.query_params.get('pagination'))
+        return self._paginator
 
 
 # class GetAddRatingView(APIView):
@@ -419,7 +502,7 @@ class VideoViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
 #         serializer.save(ip=self.kwargs['ip'])
 
 
-class RatingViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, viewsets.GenericViewSet):
+class RatingViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     """
     Вьюсет для работы с рейтингом пользователя к посту.
 
@@ -432,21 +515,22 @@ class RatingViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, viewsets
     """
 
     renderer_classes = [JSONRenderer, NoHTMLFormBrowsableAPIRenderer]
+    serializer_class = serializers.RatingDetailSerializer
 
     def setup_rating_service(self, request, *args, **kwargs):
         """Получение ip пользователя и создание объекта класса для работы с рейтингом"""
         self.kwargs['ip'] = get_client_ip(request)
-        self.service_rating = ServiceUserRating(
-            ip=self.kwargs['ip'], post_slug=kwargs['slug'], mark_id=request.data.get('mark')
-        )
+        self.service_rating = ServiceUserRating(ip=self.kwargs['ip'], post_slug=kwargs['slug'])
 
     def retrieve(self, request, *args, **kwargs):
         self.setup_rating_service(request, *args, **kwargs)
         return super().retrieve(request, *args, **kwargs)
 
     def create_or_update(self, request, *args, **kwargs):
+        mark_id = request.data.get('mark')
+        validators.validate_mark_param(mark_id)
         self.setup_rating_service(request, *args, **kwargs)
-        super().update(request, *args, **kwargs)
+        self.service_rating.save_rating(int(mark_id))
         return Response({'message': _(self.service_rating.get_message())}, status=self.service_rating.get_status_code())
 
     def get_object(self):
@@ -454,32 +538,24 @@ class RatingViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, viewsets
         # если он существует в базе данных. В противном случае возвращает None
         return self.service_rating.existing_rating
 
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return serializers.RatingDetailSerializer
-        elif self.action == 'create_or_update':
-            return serializers.AddRatingSerializer
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context['slug'] = self.kwargs['slug']
-        return context
-
-    def perform_update(self, serializer):
-        # Обновляем рейтинг пользователя на основе выбранной оценки
-        self.service_rating.update_author_rating()
-
-        serializer.save(ip=self.kwargs['ip'])
-
 
 class DaysInCalendarView(APIView):
     """Вывод дат публикации постов для заданного месяца"""
 
     def get(self, request: Request, year: int, month: int) -> Response:
+        validators.validate_calendar_params(year, month)
         days_with_post = caching.get_cached_objects_or_queryset(settings.KEY_POSTS_CALENDAR, year=year, month=month)
         return Response(days_with_post)
 
 
+class DaysInYearCalendarView(APIView):
+    """Вывод дат публикации постов для всех месяцев заданного года"""
+
+    def get(self, request: Request, year: int) -> Response:
+        validators.validate_calendar_params(year)
+        return Response(caching.get_calendar_year(year))
+
+
 # class TopTagsView(APIView):
 #     """Вывод десяти самых популярных тегов и количества постов к ним"""
 #
@@ -498,13 +574,24 @@ class DaysInCalendarView(APIView):
 #         return caching.get_cached_objects_or_queryset(settings.KEY_ALL_TAGS)
 
 
-class TagViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
-    """Вывод десяти самых популярных тегов и количества постов к ним"""
+class TagViewSet(caching.CachedResponseMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Вывод десяти самых популярных тегов и количества постов к ним (всего или в категории ?category=<url>)"""
 
     serializer_class = serializers.TopTagsSerializer
 
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def get_response_cache_dependencies(self):
+        return settings.KEY_ALL_TAGS, self._get_top_tags_kwargs()
+
     def get_queryset(self):
-        return caching.get_cached_objects_or_queryset(settings.KEY_ALL_TAGS)
+        return caching.get_cached_objects_or_queryset(settings.KEY_ALL_TAGS, **self._get_top_tags_kwargs())
+
+    def _get_top_tags_kwargs(self):
+        # Категория передаётся только если она указана (без категории выводятся популярные теги по всем постам)
+        category = self.request.query_params.get('category')
+        return {'category': category} if category else {}
 
 
 # class CommentListCreateView(APIView):
@@ -547,8 +634,18 @@ class TagViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
 #         return Response({'message': _('Комментарий успешно добавлен.')}, status=status.HTTP_201_CREATED)
 
 
-class CommentViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
-    """Получение списка комментариев и добавление нового комментария к заданному посту"""
+class CommentViewSet(
+    caching.CachedResponseMixin, mixins.ListModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet
+):
+    """
+    Получение списка комментариев и добавление нового комментария к заданному посту.
+
+    Список содержит комментарии первого уровня с первыми ответами и ссылкой на остальные ответы ("more_replies"),
+    либо ответы на комментарий, если передан параметр запроса "parent".
+    Страницы списка кэшируются для каждого поста до изменения его комментариев
+    """
+
+    pagination_class = paginators.CursorPaginationForComments
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -557,12 +654,19 @@ class CommentViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, viewsets.Ge
             return serializers.AddCommentSerializer
 
     def get_queryset(self):
-        return queryset.qs_definition(settings.KEY_COMMENTS_LIST, post_id=self.kwargs['post_id'])
+        return queryset.qs_definition(
+            settings.KEY_COMMENTS_LIST, post_id=self.kwargs['post_id'], parent_id=self.kwargs['parent_id']
+        )
+
+    def get_response_cache_dependencies(self):
+        return settings.KEY_COMMENTS_LIST, {'post_id': int(self.kwargs['post_id'])}
 
     def list(self, request, *args, **kwargs):
         self.kwargs['post_id'] = request.query_params.get('post_id')
+        self.kwargs['parent_id'] = request.query_params.get(paginators.CursorPaginationForComments.parent_query_param)
         validators.validate_post_id_param(self.kwargs['post_id'])
-        return super().list(request, *args, **kwargs)
+        validators.validate_parent_id_param(self.kwargs['parent_id'])
+        return self.get_cached_response(super().list, request, *args, **kwargs)
 
     def create(self, request, *args, **kwargs):
         super().create(request, *args, **kwargs)
@@ -78,6 +78,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'debug_toolbar',
@@ -200,6 +201,23 @@ LANGUAGES = (
 )
 
 
+# Конфигурации полнотекстового поиска PostgreSQL для языков из LANGUAGES
+SEARCH_CONFIGS = {
+    'ru': 'russian',
+    'en': 'english',
+}
+
+# Режимы поиска постов (значения параметра запроса "mode"), дополнительные к полнотекстовому поиску:
+# "fuzzy" - при отсутствии результатов полнотекстового поиска используется поиск по сходству триграмм (pg_trgm)
+# в заголовках и тегах постов, устойчивый к опечаткам
+SEARCH_MODES = ('fuzzy',)
+
+# Нечёткий поиск: минимальное сходство слова запроса со словами заголовка или тега (от 0 до 1)
+# и максимальное количество найденных постов (отдельно по заголовкам и по тегам)
+FUZZY_SEARCH_SIMILARITY = 0.4
+FUZZY_SEARCH_LIMIT = 50
+
+
 # Путь Python к файлам локализации
 LOCALE_PATHS = (os.path.join(BASE_DIR, 'locale/'),)
 
@@ -244,22 +262,27 @@ INTERNAL_IPS = [
 
 # Ключи для кэширования данных (функция get_cached_objects_or_queryset)
 # и определения необходимого запроса к БД (функция qs_definition)
-KEY_SIMPLE_POSTS_LIST = os.getenv('KEY_SIMPLE_POSTS_LIST')
 KEY_POSTS_LIST = os.getenv('KEY_POSTS_LIST')
 KEY_POST_DETAIL = os.getenv('KEY_POST_DETAIL')
 KEY_RATING_DETAIL = os.getenv('KEY_RATING_DETAIL')
-KEY_MARK_DETAIL = os.getenv('KEY_MARK_DETAIL')
 KEY_CATEGORIES_LIST = os.getenv('KEY_CATEGORIES_LIST')
 KEY_VIDEOS_LIST = os.getenv('KEY_VIDEOS_LIST')
 KEY_ABOUT = os.getenv('KEY_ABOUT')
 KEY_AUTHORS_LIST = os.getenv('KEY_AUTHORS_LIST')
 KEY_AUTHOR_DETAIL = os.getenv('KEY_AUTHOR_DETAIL')
-KEY_AUTHOR_DETAIL_STRICT = os.getenv('KEY_AUTHOR_DETAIL_STRICT')
 KEY_TOP_POSTS = os.getenv('KEY_TOP_POSTS')
 KEY_LAST_POSTS = os.getenv('KEY_LAST_POSTS')
 KEY_ALL_TAGS = os.getenv('KEY_ALL_TAGS')
 KEY_POSTS_CALENDAR = os.getenv('KEY_POSTS_CALENDAR')
+KEY_POSTS_CALENDAR_YEAR = os.getenv('KEY_POSTS_CALENDAR_YEAR')
+KEY_DATE_POSTS = os.getenv('KEY_DATE_POSTS')
 KEY_COMMENTS_LIST = os.getenv('KEY_COMMENTS_LIST')
+KEY_COMMENT_REPLIES = os.getenv('KEY_COMMENT_REPLIES')
+KEY_SCHEDULED_POSTS = os.getenv('KEY_SCHEDULED_POSTS')
+KEY_SEARCH_POSTS = os.getenv('KEY_SEARCH_POSTS')
+KEY_FUZZY_SEARCH_POSTS = os.getenv('KEY_FUZZY_SEARCH_POSTS')
+KEY_SUGGEST_POSTS = os.getenv('KEY_SUGGEST_POSTS')
+KEY_POST_FILTERS = os.getenv('KEY_POST_FILTERS')
 
 
 # Ключ-префикс для других ключей
@@ -280,21 +303,39 @@ CACHES = {
 
 
 # Время кэширования для разных типов данных
+# (данные постов инвалидируются при изменении и в момент отложенной публикации, поэтому хранятся долго)
 CACHE_TIMES = {
-    KEY_POSTS_LIST: 300,  # 5 минут для списка постов
-    KEY_POST_DETAIL: 600,  # 10 минут для отдельного поста
+    KEY_POSTS_LIST: 3600,  # 1 час для списка постов
+    KEY_POST_DETAIL: 3600,  # 1 час для отдельного поста
     KEY_CATEGORIES_LIST: 3600,  # 1 час для списка категорий
-    KEY_VIDEOS_LIST: 600,  # 10 минут для списка видеозаписей
+    KEY_VIDEOS_LIST: 3600,  # 1 час для списка видеозаписей
     KEY_ABOUT: 86400,  # 1 день для информации о компании
     KEY_AUTHORS_LIST: 3600,  # 1 час для списка авторов
-    KEY_AUTHOR_DETAIL: 600,  # 10 минут для отдельного автора
-    KEY_TOP_POSTS: 900,  # 15 минут для трёх самых популярных постов
-    KEY_LAST_POSTS: 300,  # 5 минут для трёх последних постов
-    KEY_ALL_TAGS: 1800,  # 30 миннут для десяти популярных тегов
+    KEY_AUTHOR_DETAIL: 3600,  # 1 час для отдельного автора
+    KEY_TOP_POSTS: 3600,  # 1 час для трёх самых популярных постов
+    KEY_LAST_POSTS: 3600,  # 1 час для трёх последних постов
+    KEY_ALL_TAGS: 3600,  # 1 час для десяти популярных тегов
     KEY_POSTS_CALENDAR: 3600,  # 1 час для списка с днями публикации постов
+    KEY_POSTS_CALENDAR_YEAR: 86400,  # 1 день для битовых карт дней публикации постов за год
+    KEY_DATE_POSTS: 3600,  # 1 час для списков id постов, опубликованных за день
+    KEY_SCHEDULED_POSTS: 86400,  # 1 день для времени публикации отложенных постов
+    KEY_SEARCH_POSTS: 3600,  # 1 час для результатов поиска постов
+    KEY_FUZZY_SEARCH_POSTS: 3600,  # 1 час для результатов нечёткого поиска постов
+    KEY_COMMENTS_LIST: 3600,  # 1 час для страниц комментариев поста
 }
 
 
+# Защита от одновременного перестроения кэша (функция get_cached_objects_or_queryset)
+CACHE_STALE_TIME = 60  # время (сек.), в течение которого устаревшие данные отдаются, пока идёт их перестроение
+CACHE_REBUILD_LOCK_TIME = 10  # максимальное время (сек.) блокировки перестроения данных одним процессом
+CACHE_REBUILD_WAIT_TIME = 2  # время (сек.) ожидания данных от другого процесса при полном отсутствии их в кэше
+CACHE_EARLY_REFRESH_BETA = 1.0  # коэффициент вероятностного раннего обновления (XFetch), 0 - отключение
+
+
+# Время кэширования (сек.) пустых результатов и отсутствующих объектов (ответ 404)
+CACHE_NEGATIVE_TIME = 60
+
+
 # Настроки для работы SMTP сервера
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER_KEY')
@@ -302,6 +343,14 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD_KEY')
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 
+# Очередь исходящих писем (команда send_mail_outbox): количество писем, отправляемых через одно соединение
+# с SMTP-сервером, максимальное количество попыток отправки письма, задержка (сек.) перед повторной попыткой
+# (удваивается с каждой неудачной попыткой) и интервал (сек.) проверки очереди при отсутствии писем
+MAIL_BATCH_SIZE = 50
+MAIL_MAX_ATTEMPTS = 5
+MAIL_RETRY_DELAY = 60
+MAIL_POLL_INTERVAL = 5
+
 
 # Путь к каталогу загрузки мультимедиа CKEditor
 CKEDITOR_UPLOAD_PATH = "uploads/"
@@ -421,6 +470,35 @@ TITLE_LIKE_MARK = 'Лайк'
 TITLE_DISLIKE_MARK = 'Дизлайк'
 
 
+# Режим отложенной записи оценок (write-behind): оценки сохраняются в буфер Redis и записываются в БД
+# командой flush_rating_votes партиями (не более RATING_FLUSH_BATCH_SIZE оценок) с интервалом RATING_FLUSH_INTERVAL
+# (сек.); время (сек.) блокировки записи буфера одним процессом - RATING_FLUSH_LOCK_TIME
+RATING_WRITE_BEHIND = False
+RATING_FLUSH_BATCH_SIZE = 1000
+RATING_FLUSH_INTERVAL = 5
+RATING_FLUSH_LOCK_TIME = 60
+
+
+# Периоды для вывода популярных постов (значение параметра запроса "period": количество дней)
+TOP_POSTS_PERIODS = {
+    'week': 7,
+    'month': 30,
+}
+
+# Максимальное количество подсказок заголовков постов при поиске по мере ввода
+SUGGEST_POSTS_LIMIT = 10
+
+# Количество популярных тегов (всего и в отдельной категории)
+TOP_TAGS_LIMIT = 10
+
+# Количество последних постов автора в списке авторов и данных отдельного автора
+AUTHOR_LAST_POSTS_LIMIT = 3
+
+# Максимальное количество ответов, выводимых вместе с комментарием первого уровня
+# (остальные ответы получаются по ссылке "more_replies")
+COMMENT_REPLIES_LIMIT = 3
+
+
 # Настройка библиотеки "django-taggit" для игнорирования регистра в тегах
 TAGGIT_CASE_INSENSITIVE = True
 
@@ -0,0 +1,103 @@
+import time
+from datetime import timedelta
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from blog.models import Comment
+from blog.serializers import CommentsSerializer
+from blog_by_me_DRF.settings import COMMENT_REPLIES_LIMIT
+
+
+class NestedCommentsSerializer(serializers.ModelSerializer):
+    """Прежний способ вывода комментариев: отдельный сериализатор для ответов каждого комментария первого уровня"""
+
+    children = serializers.SerializerMethodField()
+    more_replies = serializers.SerializerMethodField()
+
+    def get_children(self, obj):
+        if hasattr(obj, 'prefetched_comments2'):
+            replies = obj.prefetched_comments2[:COMMENT_REPLIES_LIMIT]
+            return NestedCommentsSerializer(replies, many=True, context=self.context).data
+        return []
+
+    def get_more_replies(self, obj):
+        return None
+
+    class Meta:
+        model = Comment
+        exclude = ('email', 'active', 'parent')
+
+
+def _make_comments(count: int) -> tuple[list[Comment], list[dict], list[dict]]:
+    """
+    Комментарии поста в памяти (без записи в БД): комментарии первого уровня с COMMENT_REPLIES_LIMIT ответами.
+    Возвращает объекты модели с предзагруженными ответами (для прежнего способа вывода),
+    а также словари комментариев первого уровня и ответов (для CommentTreeListSerializer)
+    """
+    now = timezone.now()
+    objects, comments, replies = [], [], []
+    for comment_id in range(1, count + 1):
+        created = now + timedelta(seconds=comment_id)
+        fields = {
+            'post_id': 1,
+            'name': 'Читатель',
+            'text': 'Интересный пост ' * 10,
+            'created': created,
+            'updated': created,
+        }
+
+        if (comment_id - 1) % (COMMENT_REPLIES_LIMIT + 1) == 0:
+            comment = Comment(id=comment_id, parent_id=None, **fields)
+            comment.prefetched_comments2 = []
+            objects.append(comment)
+            comments.append({'id': comment_id, 'parent_id': None, **fields})
+        else:
+            parent = objects[-1]
+            parent.prefetched_comments2.append(Comment(id=comment_id, parent_id=parent.id, **fields))
+            replies.append({'id': comment_id, 'parent_id': parent.id, **fields})
+    return objects, comments, replies
+
+
+def _measure(func, repeat: int) -> tuple[float, object]:
+    """Лучшее время выполнения функции (сек.) из repeat запусков и её результат"""
+    best_time, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best_time = elapsed if best_time is None else min(best_time, elapsed)
+    return best_time, result
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время вывода дерева комментариев прежним способом (вложенные сериализаторы) '
+        'и за один проход (CommentTreeListSerializer). Данные создаются в памяти, БД не используется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000], help='Количество комментариев')
+        parser.add_argument('--repeat', type=int, default=3, help='Количество запусков для каждого способа')
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        tree_serializer = CommentsSerializer(many=True)
+
+        self.stdout.write(f'\n{"Комментарии":>12} | {"Вложенные, с":>13} | {"Один проход, с":>15} | Ускорение')
+        for size in options['sizes']:
+            objects, comments, replies = _make_comments(size)
+
+            nested_time, nested_data = _measure(
+                lambda: NestedCommentsSerializer(objects, many=True).data, options['repeat']
+            )
+            tree_time, tree_data = _measure(lambda: tree_serializer.build_tree(comments, replies), options['repeat'])
+            if renderer.render(nested_data) != renderer.render(tree_data):
+                raise CommandError('Результаты вывода комментариев различаются.')
+
+            self.stdout.write(
+                f'{size:>12} | {nested_time:>13.3f} | {tree_time:>15.3f} | x{nested_time / tree_time:.1f}'
+            )
+        self.stdout.write(self.style.SUCCESS('Результаты вывода совпадают.'))
@@ -0,0 +1,51 @@
+import logging
+import time
+
+from django.core.management import BaseCommand
+
+from blog_by_me_DRF.settings import RATING_FLUSH_BATCH_SIZE, RATING_FLUSH_INTERVAL
+from services.rating import flush_rating_votes
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает в БД оценки постов из буфера (режим отложенной записи RATING_WRITE_BEHIND) партиями: '
+        'рейтинги постов и авторов изменяются одним запросом на партию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Записать все оценки из буфера и завершить')
+        parser.add_argument(
+            '--batch-size', type=int, default=RATING_FLUSH_BATCH_SIZE, help='Количество оценок в одной партии'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write('\nЗапись оценок из буфера...')
+
+        try:
+            while True:
+                try:
+                    flushed = flush_rating_votes(batch_size)
+                except Exception as error:
+                    info = f'Ошибка записи оценок из буфера: {error}'
+                    logger.error(info)
+                    self.stdout.write(self.style.ERROR(info))
+                    if options['once']:
+                        break
+                    flushed = 0
+
+                if flushed:
+                    self.stdout.write(self.style.SUCCESS(f'Записано оценок: {flushed}.'))
+
+                # Неполная партия означает, что буфер пуст
+                if flushed < batch_size:
+                    if options['once']:
+                        break
+                    time.sleep(RATING_FLUSH_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write('Запись оценок из буфера завершена.')
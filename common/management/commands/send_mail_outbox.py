@@ -0,0 +1,47 @@
+import logging
+import time
+
+from django.core.management import BaseCommand
+
+from blog_by_me_DRF.settings import MAIL_BATCH_SIZE, MAIL_POLL_INTERVAL
+from services.company.send_mail import send_pending_mail
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из очереди исходящих писем (запросы обратной связи) партиями '
+        'через одно соединение с SMTP-сервером с повторными попытками при ошибках.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true', help='Отправить все письма, время отправки которых наступило, и завершить'
+        )
+        parser.add_argument('--batch-size', type=int, default=MAIL_BATCH_SIZE, help='Количество писем в одной партии')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write('\nОбработка очереди исходящих писем...')
+
+        try:
+            while True:
+                result = send_pending_mail(batch_size)
+
+                if result.sent:
+                    self.stdout.write(self.style.SUCCESS(f'Отправлено писем: {result.sent}.'))
+                for error in result.errors:
+                    info = f'Ошибка отправки письма {error}'
+                    logger.warning(info)
+                    self.stdout.write(self.style.WARNING(info))
+
+                # Неполная партия означает, что писем для отправки в данный момент больше нет
+                if result.sent + result.failed < batch_size:
+                    if options['once']:
+                        break
+                    time.sleep(MAIL_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write('Обработка очереди исходящих писем завершена.')
@@ -0,0 +1,49 @@
+from django.core.management import BaseCommand
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from blog.models import Comment, Post, Rating
+from services import tag_counters
+from services.caching import NAMESPACE_POSTS, NAMESPACE_RATINGS, NAMESPACE_VIDEOS, bump_cache_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает хранимые счётчики постов (количество активных комментариев и рейтинг поста) '
+        'и счётчики количества постов по тегам.'
+    )
+
+    def handle(self, *args, **options):
+
+        self.stdout.write('\nПересчёт количества комментариев и рейтинга постов...')
+
+        # Количество активных комментариев каждого поста
+        comments_count = (
+            Comment.objects.filter(post=OuterRef('pk'), active=True)
+            .order_by()
+            .values('post')
+            .annotate(count=Count('id'))
+            .values('count')
+        )
+        # Рейтинг каждого поста (сумма значений оценок)
+        score = (
+            Rating.objects.filter(post=OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(total=Sum('mark__value'))
+            .values('total')
+        )
+        # Обновление всех счётчиков одним запросом UPDATE с подзапросами
+        updated = Post.objects.update(
+            comments_count=Coalesce(Subquery(comments_count), 0),
+            score=Coalesce(Subquery(score), 0),
+        )
+
+        # Удаление из кэша данных со старыми значениями счётчиков
+        bump_cache_version(NAMESPACE_POSTS, NAMESPACE_VIDEOS, NAMESPACE_RATINGS)
+
+        self.stdout.write(self.style.SUCCESS(f'Счётчики обновлены у постов: {updated}.'))
+
+        self.stdout.write('Пересчёт количества постов по тегам...')
+        tags_count = tag_counters.rebuild_tag_counters()
+        self.stdout.write(self.style.SUCCESS(f'Счётчики обновлены у тегов: {tags_count}.'))
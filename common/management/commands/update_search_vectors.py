@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+
+from blog.models import Post
+from services.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает хранимые поисковые векторы постов для всех языков.'
+
+    def handle(self, *args, **options):
+
+        self.stdout.write('\nПересчёт поисковых векторов постов...')
+
+        updated = update_search_vectors(Post.objects.all())
+
+        self.stdout.write(self.style.SUCCESS(f'Поисковые векторы обновлены у постов: {updated}.'))
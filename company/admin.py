@@ -66,12 +66,12 @@ class AboutAdmin(TranslationAdmin):
 class ContactAdmin(admin.ModelAdmin):
     """Обратная связь"""
 
-    list_display = ('name', 'email', 'phone', 'date', 'feedback')
-    list_filter = ('email', 'phone')
+    list_display = ('name', 'email', 'phone', 'date', 'feedback', 'mail_status')
+    list_filter = ('email', 'phone', 'mail_status')
     search_fields = ('name', 'email', 'phone')
     list_editable = ('feedback',)
     ordering = ('feedback',)
-    readonly_fields = ('name', 'email', 'phone', 'date', 'message')
+    readonly_fields = ('name', 'email', 'phone', 'date', 'message', 'mail_status', 'mail_attempts')
 
     def has_add_permission(self, request):
         """Запрет на добавление объектов модели вне зависимости от статуса пользователя"""
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CompanyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'company'
+
+    def ready(self):
+        """Регистрирует обработчики сигналов при инициализации приложения"""
+        import company.signals
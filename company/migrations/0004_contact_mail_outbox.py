@@ -0,0 +1,57 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0003_about_description_en_about_description_ru'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='mail_attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Попытки отправки письма'),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='mail_next_attempt',
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name='Время следующей попытки отправки письма',
+            ),
+        ),
+        # Письма по существующим запросам уже были отправлены во время запроса
+        migrations.AddField(
+            model_name='contact',
+            name='mail_status',
+            field=models.CharField(
+                choices=[('pending', 'Ожидает отправки'), ('sent', 'Отправлено'), ('failed', 'Не отправлено')],
+                default='sent',
+                editable=False,
+                max_length=10,
+                verbose_name='Письмо пользователю',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='mail_status',
+            field=models.CharField(
+                choices=[('pending', 'Ожидает отправки'), ('sent', 'Отправлено'), ('failed', 'Не отправлено')],
+                default='pending',
+                editable=False,
+                max_length=10,
+                verbose_name='Письмо пользователю',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(
+                condition=models.Q(('mail_status', 'pending')),
+                fields=['mail_next_attempt', 'id'],
+                name='contact_mail_pending_idx',
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 
 
@@ -32,7 +33,21 @@ class About(models.Model):
 
 
 class Contact(models.Model):
-    """Обратная связь"""
+    """
+    Обратная связь.
+
+    Запрос одновременно является записью очереди исходящих писем (outbox): письмо пользователю
+    отправляется не во время запроса, а фоновой командой send_mail_outbox (см. services.company.send_mail)
+    """
+
+    MAIL_PENDING = 'pending'
+    MAIL_SENT = 'sent'
+    MAIL_FAILED = 'failed'
+    MAIL_STATUSES = (
+        (MAIL_PENDING, 'Ожидает отправки'),
+        (MAIL_SENT, 'Отправлено'),
+        (MAIL_FAILED, 'Не отправлено'),
+    )
 
     name = models.CharField(verbose_name='Имя')
     email = models.EmailField(verbose_name='Эл. почта')
@@ -40,6 +55,13 @@ class Contact(models.Model):
     message = models.TextField(verbose_name='Сообщение')
     date = models.DateTimeField(auto_now_add=True)
     feedback = models.BooleanField(verbose_name='Обрантая связь', default=False)
+    mail_status = models.CharField(
+        verbose_name='Письмо пользователю', max_length=10, choices=MAIL_STATUSES, default=MAIL_PENDING, editable=False
+    )
+    mail_attempts = models.PositiveSmallIntegerField(verbose_name='Попытки отправки письма', default=0, editable=False)
+    mail_next_attempt = models.DateTimeField(
+        verbose_name='Время следующей попытки отправки письма', default=timezone.now, editable=False
+    )
 
     def __str__(self):
         return self.email
@@ -47,3 +69,10 @@ class Contact(models.Model):
     class Meta:
         verbose_name = 'Запрос от пользователя блога'
         verbose_name_plural = 'Запросы от пользователей блога'
+        indexes = [
+            models.Index(
+                fields=('mail_next_attempt', 'id'),
+                condition=models.Q(mail_status='pending'),
+                name='contact_mail_pending_idx',
+            ),
+        ]
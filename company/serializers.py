@@ -16,4 +16,4 @@ class ContactSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Contact
-        exclude = ('feedback',)
+        exclude = ('feedback', 'mail_status', 'mail_attempts', 'mail_next_attempt')
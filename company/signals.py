@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch.dispatcher import receiver
+
+from company.models import About
+from services.caching import NAMESPACE_ABOUT, bump_cache_version
+
+
+@receiver(post_save, sender=About)
+@receiver(post_delete, sender=About)
+def clear_cache_when_changing_about(sender, instance, **kwargs):
+    """Удаляет старые данные страницы 'О нас' из кэша при её изменении"""
+    bump_cache_version(NAMESPACE_ABOUT)
@@ -8,7 +8,6 @@ from rest_framework.viewsets import GenericViewSet
 from blog_by_me_DRF.settings import KEY_ABOUT
 from company.serializers import AboutSerializer, ContactSerializer
 from services.caching import get_cached_objects_or_queryset
-from services.company.send_mail import send
 
 # from rest_framework.views import APIView
 
@@ -71,14 +70,13 @@ class AboutViewSet(mixins.RetrieveModelMixin, GenericViewSet):
 
 
 class ContactViewSet(mixins.CreateModelMixin, GenericViewSet):
-    """Добавление сообщения обратной связи"""
+    """
+    Добавление сообщения обратной связи.
+    Письмо пользователю ставится в очередь исходящих писем и отправляется командой send_mail_outbox
+    """
 
     serializer_class = ContactSerializer
 
-    def perform_create(self, serializer):
-        serializer.save()
-        send(serializer.validated_data['email'])
-
     def create(self, request, *args, **kwargs):
         super().create(request, *args, **kwargs)
         return Response(
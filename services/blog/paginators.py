@@ -1,16 +1,109 @@
-from rest_framework.pagination import CursorPagination, LimitOffsetPagination, PageNumberPagination
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connection
+from django.db.models import Count, QuerySet, Window
+from django.utils.translation import gettext as _
+from rest_framework.pagination import Cursor, CursorPagination, LimitOffsetPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+from blog_by_me_DRF.settings import COMMENT_REPLIES_LIMIT
+
+
+class WindowCountPaginator(Paginator):
+    """
+    Пагинатор, получающий страницу и общее количество объектов одним запросом к БД.
+
+    Количество объектов вычисляется оконной функцией COUNT(*) OVER () вместе с выборкой страницы,
+    поэтому отдельный запрос SELECT COUNT(*) не выполняется.
+    Если страница пуста (количество определить нельзя), для страниц после первой выполняется обычный подсчёт.
+    Для уже вычисленной выборки (например, полученной из кэша) запросы к БД не выполняются
+    """
+
+    def page(self, number):
+        if not isinstance(self.object_list, QuerySet) or self.object_list._result_cache is not None:
+            return super().page(number)
+
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        object_list = list(self.object_list.annotate(window_count=Window(Count('*')))[bottom:top])
+
+        if object_list:
+            self.count = object_list[0].window_count
+        elif number == 1:
+            self.count = 0
+        else:
+            return super().page(number)
+
+        return self._get_page(object_list, number, self)
+
+
+def estimate_count(queryset: QuerySet) -> int:
+    """
+    Приблизительное количество объектов выборки по оценке планировщика PostgreSQL (EXPLAIN).
+
+    Оценка строится по статистике таблиц (pg_class, pg_statistic) без чтения строк,
+    поэтому, в отличие от COUNT(*), не зависит от размера выборки
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Пагинация по ключу (keyset) на основе курсора.
+
+    Следующая страница выбирается условием по полям сортировки последнего объекта предыдущей страницы
+    (используется индекс по этим полям), поэтому, в отличие от OFFSET, время получения страницы
+    не зависит от её номера, а COUNT(*) не выполняется.
+    По параметру запроса "count" (count=true) в ответ добавляется приблизительное количество объектов
+    (см. estimate_count())
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.approximate_count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true') and isinstance(queryset, QuerySet):
+            self.approximate_count = estimate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.approximate_count is not None:
+            response.data = {'count': self.approximate_count, **response.data}
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'] = {
+            'count': {'type': 'integer', 'example': 123, 'description': 'Приблизительное количество (count=true)'},
+            **response_schema['properties'],
+        }
+        return response_schema
 
 
 class PageNumberPaginationForPosts(PageNumberPagination):
     """Пагинация списка постов для постраничного отображения"""
 
+    django_paginator_class = WindowCountPaginator
     page_size = 3
     page_size_query_param = 'page_size'
     max_page_size = 50
 
 
-class CursorPaginationForPostsInCategoryList(CursorPagination):
-    """Пагинация для списка постов в разделе "Категории" с помощью курсора"""
+class CursorPaginationForPosts(KeysetPagination):
+    """Пагинация списка постов по ключу (-publish, -id) с помощью курсора (индекс publish_id_idx)"""
 
     page_size = 10
     ordering = ('-publish', '-id')
@@ -23,13 +116,74 @@ class LimitOffsetPaginationForVideoList(LimitOffsetPagination):
     max_limit = 50
 
 
+class CursorPaginationForVideoList(KeysetPagination):
+    """Пагинация списка видеозаписей по ключу (-create_at, -id) с помощью курсора (индекс create_at_id_idx)"""
+
+    page_size = 3
+    ordering = ('-create_at', '-id')
+
+
+class CursorPaginationForComments(KeysetPagination):
+    """
+    Пагинация комментариев первого уровня и ответов на комментарий (параметр запроса "parent")
+    по ключу (created, id) с помощью курсора (индексы post_created_id_idx, parent_created_id_idx)
+    """
+
+    page_size = 20
+    max_page_size = 100
+    ordering = ('created', 'id')
+    parent_query_param = 'parent'
+
+    def get_replies_link(self, request, parent: dict, replies: list[dict]) -> str | None:
+        """
+        Ссылка на ответы на комментарий parent, следующие за выведенными вместе с ним.
+
+        replies - первые ответы, выбранные с запасом в один объект (см. queryset._qs_comment_replies()):
+        если лишний ответ есть, курсор ссылки указывает на позицию после последнего выведенного ответа,
+        иначе возвращается None.
+        Позиция и смещение курсора вычисляются так же, как для ссылки на следующую страницу (get_next_link())
+        """
+        if len(replies) <= COMMENT_REPLIES_LIMIT:
+            return None
+
+        compare = self._get_position_from_instance(replies[COMMENT_REPLIES_LIMIT], self.ordering)
+        position, offset = None, 0
+        for reply in reversed(replies[:COMMENT_REPLIES_LIMIT]):
+            reply_position = self._get_position_from_instance(reply, self.ordering)
+            if reply_position != compare:
+                position = reply_position
+                break
+            compare = reply_position
+            offset += 1
+
+        self.base_url = replace_query_param(
+            replace_query_param(request.build_absolute_uri(request.path), 'post_id', parent['post_id']),
+            self.parent_query_param,
+            parent['id'],
+        )
+        return self.encode_cursor(Cursor(offset=offset, reverse=False, position=position))
+
+
 def get_paginator_for_post_list(
-    type_pagination: str | None = None,
-) -> PageNumberPagination | CursorPaginationForPostsInCategoryList:
+    type_pagination: str | None = None, default: str = 'cursor'
+) -> PageNumberPaginationForPosts | CursorPaginationForPosts:
     """
     Возвращает экземпляр пагинации для списка постов в зависимости от типа пагинации.
-    Если передан 'cursor', возвращается курсорная пагинация, по умолчанию — постраничная.
+    'page' - постраничная пагинация, 'cursor' - пагинация по ключу с помощью курсора.
+    Если тип не передан, используется тип default (по умолчанию - курсорная пагинация).
+    """
+    if (type_pagination or default) == 'page':
+        return PageNumberPaginationForPosts()
+    return CursorPaginationForPosts()
+
+
+def get_paginator_for_video_list(
+    type_pagination: str | None = None,
+) -> LimitOffsetPaginationForVideoList | CursorPaginationForVideoList:
+    """
+    Возвращает экземпляр пагинации для списка видеозаписей в зависимости от типа пагинации.
+    Если передан 'offset', возвращается пагинация на основе смещения и лимита, по умолчанию — курсорная.
     """
-    if type_pagination == 'cursor':
-        return CursorPaginationForPostsInCategoryList()
-    return PageNumberPaginationForPosts()
+    if type_pagination == 'offset':
+        return LimitOffsetPaginationForVideoList()
+    return CursorPaginationForVideoList()
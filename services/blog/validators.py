@@ -1,13 +1,53 @@
+import datetime
 import re
 
 from django.utils.translation import gettext as _
 from rest_framework.exceptions import ValidationError
 
+from blog_by_me_DRF.settings import SEARCH_MODES, TOP_POSTS_PERIODS
+
+# Максимальное значение первичного ключа (BigAutoField)
+_MAX_ID = 2**63 - 1
+
+
+def _is_positive_id(value: str | int) -> bool:
+    """
+    Является ли значение допустимым первичным ключом: целое число из цифр 0-9 (str.isdigit() принимает
+    и другие символы Юникода, например "²") в пределах от 1 до _MAX_ID
+    """
+    if isinstance(value, bool) or not isinstance(value, (str, int)) or not re.fullmatch(r'[0-9]+', str(value)):
+        return False
+    return 0 < int(value) <= _MAX_ID
+
 
 def validate_date_format(date: str) -> None:
-    """Проверяет формат даты (YYYY-MM-DD)"""
+    """
+    Проверяет формат даты (YYYY-MM-DD) и существование даты.
+    Крайние даты (0001-01-01 и 9999-12-31) не допускаются: границы суток в часовом поясе сайта
+    для них выходят за пределы допустимых значений datetime
+    """
     if not re.match(r'^\d{4}-\d{2}-\d{2}$', date):
         raise ValidationError({'detail': _('Задан неправильный формат даты')})
+    try:
+        day = datetime.date.fromisoformat(date)
+    except ValueError:
+        raise ValidationError({'detail': _('Задан неправильный формат даты')})
+    if not datetime.date.min < day < datetime.date.max:
+        raise ValidationError({'detail': _('Задан неправильный формат даты')})
+
+
+def validate_calendar_params(year: int, month: int | None = None) -> None:
+    """Проверяет, что год и месяц (если передан) календаря допустимы"""
+    if not datetime.MINYEAR <= year < datetime.MAXYEAR or month is not None and not 1 <= month <= 12:
+        raise ValidationError({'detail': _('Задан неправильный год или месяц календаря.')})
+
+
+def validate_filter_params(tags: list[str], category: str | None, date: str | None) -> None:
+    """Проверяет, что задан хотя бы один фильтр постов (tag, category, date), и формат даты"""
+    if not tags and not category and not date:
+        raise ValidationError({'detail': _('Укажите хотя бы один из параметров "tag", "category" или "date".')})
+    if date:
+        validate_date_format(date)
 
 
 def validate_q_param(q: str) -> None:
@@ -16,9 +56,37 @@ def validate_q_param(q: str) -> None:
         raise ValidationError({'detail': _('Пожалуйста, введите текст для поиска постов.')})
 
 
+def validate_search_mode_param(mode: str | None) -> None:
+    """Проверяет, что параметр mode не передан или является одним из дополнительных режимов поиска"""
+    if mode is not None and mode not in SEARCH_MODES:
+        modes = ', '.join(SEARCH_MODES)
+        raise ValidationError({'detail': _('Допустимые значения параметра "mode": %s.') % modes})
+
+
+def validate_period_param(period: str | None) -> None:
+    """Проверяет, что параметр period не передан или является одним из допустимых периодов"""
+    if period is not None and period not in TOP_POSTS_PERIODS:
+        periods = ', '.join(TOP_POSTS_PERIODS)
+        raise ValidationError({'detail': _('Допустимые значения параметра "period": %s.') % periods})
+
+
+def validate_mark_param(mark: str | int | None) -> None:
+    """Проверяет, что параметр mark передан и является положительным целым числом"""
+    if mark is None or mark == '':
+        raise ValidationError({'detail': _('Не указан параметр "mark".')})
+    if not _is_positive_id(mark):
+        raise ValidationError({'detail': _('"mark" должен быть положительным целым числом.')})
+
+
 def validate_post_id_param(post_id: str) -> None:
     """Проверяет, что параметр post_id передан и является положительным целым числом"""
     if not post_id:
         raise ValidationError({'detail': 'Не указан параметр запроса "post_id"'})
-    if not post_id.isdigit() or post_id == '0':
+    if not _is_positive_id(post_id):
         raise ValidationError({'detail': '"post_id" должен быть положительным целым числом.'})
+
+
+def validate_parent_id_param(parent_id: str | None) -> None:
+    """Проверяет, что параметр parent не передан или является положительным целым числом"""
+    if parent_id is not None and not _is_positive_id(parent_id):
+        raise ValidationError({'detail': _('"parent" должен быть положительным целым числом.')})
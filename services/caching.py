@@ -1,15 +1,364 @@
+import bisect
+import hashlib
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from functools import partial
+from typing import Any, Callable, NamedTuple
+
 from django.core.cache import cache
+from django.db import transaction
 from django.db.models import QuerySet
+from django.http import Http404, HttpResponse
+from rest_framework.request import Request
+from rest_framework.response import Response
 
 from blog_by_me_DRF import settings
 from services.queryset import qs_definition
 
+# Пространства имён (семейства данных) для версионирования ключей кэша.
+# Каждое пространство имеет собственную версию, которая увеличивается при изменении данных
+NAMESPACE_POSTS = 'posts'
+NAMESPACE_POST = 'post'  # отдельный пост (идентификатор - slug)
+NAMESPACE_AUTHORS = 'authors'
+NAMESPACE_AUTHOR = 'author'  # отдельный автор (идентификатор - pk)
+NAMESPACE_VIDEOS = 'videos'
+NAMESPACE_TAGS = 'tags'
+NAMESPACE_CALENDAR = 'calendar'  # отдельный месяц календаря (идентификатор - "год/месяц")
+NAMESPACE_CALENDAR_YEAR = 'calendar_year'  # битовая карта дней публикации за год (идентификатор - год)
+NAMESPACE_CATEGORIES = 'categories'
+NAMESPACE_RATINGS = 'ratings'
+NAMESPACE_ABOUT = 'about'
+NAMESPACE_COMMENTS = 'comments'  # комментарии отдельного поста (идентификатор - pk поста)
+NAMESPACE_POST_FILTERS = 'post_filters'  # индекс фильтрации постов в памяти процессов (категории, теги, даты)
+NAMESPACE_POST_TITLES = 'post_titles'  # индекс подсказок заголовков постов в памяти процессов
+
+# Ключи запросов, данные которых зависят от текущего времени (фильтрация постов по publish__lte=now)
+_SCHEDULE_DEPENDENT_KEYS = (
+    settings.KEY_POSTS_LIST,
+    settings.KEY_POST_DETAIL,
+    settings.KEY_VIDEOS_LIST,
+    settings.KEY_AUTHORS_LIST,
+    settings.KEY_AUTHOR_DETAIL,
+    settings.KEY_TOP_POSTS,
+    settings.KEY_LAST_POSTS,
+    settings.KEY_SEARCH_POSTS,
+    settings.KEY_FUZZY_SEARCH_POSTS,
+    settings.KEY_ALL_TAGS,
+    settings.KEY_POSTS_CALENDAR,
+    settings.KEY_DATE_POSTS,
+)
+
+# Маркер отсутствия данных в кэше (позволяет отличить промах от сохранённого пустого значения)
+_MISSING = object()
+
+
+def make_namespace(family: str, ident: str | int | None = None) -> str:
+    """Формирование имени пространства для семейства данных или отдельного объекта семейства"""
+    return family if ident is None else f'{family}:{ident}'
+
+
+def _get_version_key(namespace: str) -> str:
+    """Ключ, под которым в кэше хранится версия пространства имён"""
+    return f'{settings.CACHE_KEY}version:{namespace}'
+
+
+def _new_version() -> int:
+    """
+    Начальное значение версии пространства имён.
+
+    Используется текущее время в наносекундах, чтобы после вытеснения счётчика из кэша
+    новая версия не совпала с одной из ранее выданных и старые данные не стали снова доступными
+    """
+    return time.time_ns()
+
+
+def _get_namespaces(qs_key: str, **kwargs: str | int) -> tuple[str, ...]:
+    """
+    Пространства имён, от которых зависят данные ключа запроса.
+
+    Изменение версии любого из пространств делает недоступными все ранее сохранённые данные ключа
+    """
+    if qs_key == settings.KEY_POSTS_CALENDAR:
+        return (make_namespace(NAMESPACE_CALENDAR, f'{kwargs["year"]}/{kwargs["month"]}'),)
+    if qs_key == settings.KEY_DATE_POSTS:
+        # Посты за день изменяются только вместе с месяцем их публикации (см. blog.signals._get_post_namespaces())
+        year, month, _day = kwargs['day'].split('-')
+        return (make_namespace(NAMESPACE_CALENDAR, f'{int(year)}/{int(month)}'),)
+
+    dependencies = {
+        settings.KEY_POSTS_LIST: (NAMESPACE_POSTS,),
+        settings.KEY_POST_DETAIL: (NAMESPACE_POSTS, make_namespace(NAMESPACE_POST, kwargs.get('slug'))),
+        settings.KEY_CATEGORIES_LIST: (NAMESPACE_CATEGORIES,),
+        settings.KEY_VIDEOS_LIST: (NAMESPACE_POSTS, NAMESPACE_VIDEOS),
+        settings.KEY_ABOUT: (NAMESPACE_ABOUT,),
+        settings.KEY_AUTHORS_LIST: (NAMESPACE_POSTS, NAMESPACE_AUTHORS),
+        settings.KEY_AUTHOR_DETAIL: (NAMESPACE_POSTS, make_namespace(NAMESPACE_AUTHOR, kwargs.get('pk'))),
+        settings.KEY_TOP_POSTS: (NAMESPACE_POSTS, NAMESPACE_RATINGS),
+        settings.KEY_LAST_POSTS: (NAMESPACE_POSTS,),
+        settings.KEY_ALL_TAGS: (NAMESPACE_POSTS, NAMESPACE_TAGS),
+        settings.KEY_SEARCH_POSTS: (NAMESPACE_POSTS,),
+        settings.KEY_FUZZY_SEARCH_POSTS: (NAMESPACE_POSTS,),
+        settings.KEY_COMMENTS_LIST: (make_namespace(NAMESPACE_COMMENTS, kwargs.get('post_id')),),
+    }
+    return dependencies.get(qs_key, ())
+
+
+def _get_versions(namespaces: tuple[str, ...]) -> list[int]:
+    """
+    Получение текущих версий пространств имён одним запросом к кэшу.
+    Отсутствующие версии инициализируются (без ограничения времени хранения)
+    """
+    version_keys = [_get_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(version_keys)
+
+    for version_key in version_keys:
+        if version_key not in versions:
+            version = _new_version()
+            # Если версию параллельно успел создать другой процесс, используем её
+            if not cache.add(version_key, version, None):
+                version = cache.get(version_key, version)
+            versions[version_key] = version
+
+    return [versions[version_key] for version_key in version_keys]
+
+
+def get_cache_version(namespace: str) -> int:
+    """Текущая версия пространства имён (позволяет хранящим данные вне кэша определить, изменились ли они)"""
+    return _get_versions((namespace,))[0]
+
+
+def _get_publish_epoch() -> int:
+    """
+    Этап отложенной публикации: время (timestamp) ближайшей ещё не наступившей публикации поста
+    или 0, если отложенных постов нет.
+
+    Значение добавляется к ключам данных, зависящих от времени публикации постов (publish__lte=now),
+    поэтому в момент публикации отложенного поста эти данные сразу становятся недоступными,
+    и время их хранения не требуется ограничивать.
+    Список времени публикации хранится под версией пространства постов и обновляется при их изменении
+    """
+    posts_version = _get_versions((NAMESPACE_POSTS,))[0]
+    schedule_key = f'{settings.CACHE_KEY}{settings.KEY_SCHEDULED_POSTS}:{posts_version}'
+
+    schedule = cache.get(schedule_key)
+    if schedule is None:
+        schedule = [publish.timestamp() for publish in qs_definition(settings.KEY_SCHEDULED_POSTS)]
+        cache.set(schedule_key, schedule, _get_cache_time(settings.KEY_SCHEDULED_POSTS))
+
+    index = bisect.bisect_right(schedule, time.time())
+    return int(schedule[index]) if index < len(schedule) else 0
+
+
+def _get_key_versions(qs_key: str, **kwargs: str | int) -> str:
+    """Строка с версиями данных ключа запроса для добавления к ключу кэша"""
+    versions = _get_versions(_get_namespaces(qs_key, **kwargs))
+    if qs_key in _SCHEDULE_DEPENDENT_KEYS:
+        versions.append(_get_publish_epoch())
+    return '.'.join(str(version) for version in versions)
+
+
+def _bump_versions(namespaces: tuple[str, ...]) -> None:
+    """Увеличение версий пространств имён"""
+    for namespace in namespaces:
+        version_key = _get_version_key(namespace)
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            # Версия ещё не создавалась или была вытеснена из кэша
+            cache.set(version_key, _new_version(), None)
+
+
+def bump_cache_version(*namespaces: str) -> None:
+    """
+    Инвалидация кэша через увеличение версий пространств имён.
+
+    Данные, сохранённые под старыми версиями, становятся недоступными сразу (O(1) на пространство)
+    и удаляются из кэша по истечении времени хранения.
+    Версии увеличиваются после фиксации текущей транзакции, чтобы запросы, выполненные между изменением
+    данных и фиксацией, не сохранили в кэше старые данные под новой версией
+    """
+    transaction.on_commit(partial(_bump_versions, namespaces))
+
+
+def _get_calendar_cache_key(year: int) -> str:
+    """
+    Ключ кэша битовой карты дней публикации постов за год.
+    Включает версию карты года (см. _change_calendar_days()) и этап отложенной публикации,
+    поэтому в момент публикации отложенного поста карта строится заново
+    """
+    version = get_cache_version(make_namespace(NAMESPACE_CALENDAR_YEAR, year))
+    return f'{settings.CACHE_KEY}{settings.KEY_POSTS_CALENDAR_YEAR}{year}:{version}:{_get_publish_epoch()}'
+
+
+def _get_calendar_bitmap(year: int) -> int:
+    """
+    Битовая карта дней года с опубликованными постами (бит N установлен, если посты есть в N-й день от 1 января).
+
+    Если карты нет в кэше, она строится одним запросом к БД (дни публикации постов за год), далее
+    поддерживается обработчиками сигналов постов (см. change_calendar_days())
+    """
+    cache_key = _get_calendar_cache_key(year)
+    bitmap = cache.get(cache_key)
+    if bitmap is None:
+        first_day = date(year, 1, 1)
+        bitmap = 0
+        for day in qs_definition(settings.KEY_POSTS_CALENDAR_YEAR, year=year):
+            bitmap |= 1 << (day - first_day).days
+        cache.add(cache_key, bitmap, _get_cache_time(settings.KEY_POSTS_CALENDAR_YEAR))
+    return bitmap
+
+
+def get_calendar_year(year: int) -> dict[int, list[date]]:
+    """Дни публикации постов за год по месяцам (для всех двенадцати месяцев, включая месяцы без постов)"""
+    bitmap = _get_calendar_bitmap(year)
+    first_day = date(year, 1, 1)
+    months = {month: [] for month in range(1, 13)}
+    while bitmap:
+        lowest_bit = bitmap & -bitmap
+        day = first_day + timedelta(days=lowest_bit.bit_length() - 1)
+        months[day.month].append(day)
+        bitmap ^= lowest_bit
+    return months
+
+
+def _change_calendar_days(days: dict[date, bool]) -> None:
+    """
+    Изменение битов дней в битовых картах годов, уже сохранённых в кэше.
+
+    Бит дня, в который пост опубликован, устанавливается без запросов к БД; бит дня, из которого пост был убран
+    (снят с публикации, перенесён или удалён), снимается, только если в этот день не осталось других постов.
+
+    Если карту года одновременно изменяет другой процесс или карты нет в кэше, увеличивается версия карты года:
+    карта, которую другой процесс сохранит под прежним ключом (без этого изменения) или строит в этот момент
+    по данным из БД, становится недоступной, и карта будет построена заново при следующем обращении
+    """
+    days_by_year = defaultdict(dict)
+    for day, is_published in days.items():
+        days_by_year[day.year][day] = is_published
+
+    for year, year_days in days_by_year.items():
+        cache_key = _get_calendar_cache_key(year)
+        lock_key = f'{cache_key}:lock'
+        if not cache.add(lock_key, 1, settings.CACHE_REBUILD_LOCK_TIME):
+            _bump_versions((make_namespace(NAMESPACE_CALENDAR_YEAR, year),))
+            continue
+
+        try:
+            bitmap = cache.get(cache_key)
+            if bitmap is None:
+                # Карта ещё не строилась, была вытеснена из кэша или строится другим процессом
+                _bump_versions((make_namespace(NAMESPACE_CALENDAR_YEAR, year),))
+                continue
+
+            first_day = date(year, 1, 1)
+            for day, is_published in year_days.items():
+                bit = 1 << (day - first_day).days
+                if is_published:
+                    bitmap |= bit
+                elif not qs_definition(settings.KEY_DATE_POSTS, day=day.isoformat()):
+                    bitmap &= ~bit
+            cache.set(cache_key, bitmap, _get_cache_time(settings.KEY_POSTS_CALENDAR_YEAR))
+        finally:
+            cache.delete(lock_key)
+
+
+def change_calendar_days(days: dict[date, bool]) -> None:
+    """
+    Изменение битовых карт дней публикации (True - в день опубликован пост, False - пост убран из дня).
+    Выполняется после фиксации текущей транзакции, как и bump_cache_version()
+    """
+    if days:
+        transaction.on_commit(partial(_change_calendar_days, days))
+
+
+class _CacheEntry(NamedTuple):
+    """
+    Данные, сохраняемые в кэше, вместе с метаданными для раннего обновления
+
+    Атрибуты:
+    value: Сами данные (QuerySet или объект модели), либо текст ошибки, если объект не найден.
+    expires_at: Время (timestamp), после которого данные считаются устаревшими.
+    delta: Время (сек.), затраченное на формирование данных.
+    not_found: Признак отсутствия объекта (при получении из кэша вызывается Http404).
+    """
+
+    value: Any
+    expires_at: float
+    delta: float
+    not_found: bool = False
+
 
 def _get_cache_time(qs_key: str) -> int:
     """Получение времени кэширования в зависимости от типа данных"""
     return settings.CACHE_TIMES.get(qs_key, 300)
 
 
+def _get_value(entry: _CacheEntry) -> QuerySet | settings.ObjectModel:
+    """Получение данных из записи кэша (для отсутствующего объекта повторно вызывается Http404)"""
+    if entry.not_found:
+        raise Http404(entry.value)
+    return entry.value
+
+
+def _should_refresh(entry: _CacheEntry) -> bool:
+    """
+    Определение необходимости обновления данных до истечения их срока (алгоритм XFetch).
+
+    Чем ближе время истечения и чем дольше формируются данные, тем выше вероятность, что текущий процесс
+    обновит их заранее. Так перестроение "горячих" ключей распределяется во времени, а не приходится
+    на всех одновременно в момент истечения
+    """
+    early_refresh = entry.delta * settings.CACHE_EARLY_REFRESH_BETA * -math.log(1.0 - random.random())
+    return time.time() + early_refresh >= entry.expires_at
+
+
+def _rebuild(cache_key: str, qs_key: str, **kwargs: str | int) -> QuerySet | settings.ObjectModel:
+    """
+    Формирование данных и сохранение их в кэше вместе с метаданными.
+
+    Пустые результаты и отсутствующие объекты (Http404) также кэшируются, но на короткое время
+    CACHE_NEGATIVE_TIME, чтобы повторные запросы к пустым месяцам календаря или несуществующим slug
+    не обращались к БД каждый раз
+    """
+    started = time.time()
+
+    # Генерируем данные (QuerySet вычисляется сразу, чтобы замер времени включал запрос к БД)
+    try:
+        object_list_or_object = qs_definition(qs_key, **kwargs)
+        if isinstance(object_list_or_object, QuerySet):
+            len(object_list_or_object)
+    except Http404 as exc:
+        entry = _CacheEntry(str(exc), started + settings.CACHE_NEGATIVE_TIME, time.time() - started, True)
+        cache.set(cache_key, entry, settings.CACHE_NEGATIVE_TIME)
+        raise
+
+    # Получаем время кэширования (для пустого результата - сокращённое)
+    cache_time = _get_cache_time(qs_key)
+    if isinstance(object_list_or_object, (QuerySet, list)) and not object_list_or_object:
+        cache_time = min(cache_time, settings.CACHE_NEGATIVE_TIME)
+
+    # Сохраняем данные в кэше.
+    # Данные хранятся дольше времени кэширования, чтобы их можно было отдавать во время перестроения
+    entry = _CacheEntry(object_list_or_object, started + cache_time, time.time() - started)
+    cache.set(cache_key, entry, cache_time + settings.CACHE_STALE_TIME)
+
+    return object_list_or_object
+
+
+def _wait_for_rebuild(cache_key: str) -> _CacheEntry | None:
+    """Ожидание данных, которые формирует другой процесс"""
+    deadline = time.time() + settings.CACHE_REBUILD_WAIT_TIME
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(cache_key, _MISSING)
+        if entry is not _MISSING:
+            return entry
+    return None
+
+
 def get_cached_objects_or_queryset(qs_key: str, **kwargs: str | int) -> QuerySet | settings.ObjectModel:
     """
     Получения кэша или вызов QS
@@ -20,28 +369,120 @@ def get_cached_objects_or_queryset(qs_key: str, **kwargs: str | int) -> QuerySet
        (передаётся только вместе с ключом KEY_POST_DETAIL);
     3. Если передан 'pk', он используется как доп. ключ для данных автора
        (передаётся только вместе с ключом KEY_AUTHOR_DETAIL);
-    4. Если ключ запроса не KEY_POSTS_CALENDAR, а 'slug' и 'pk' не переданы, ключ остаётся пустой строкой
+    4. Если передан 'period', он используется как доп. ключ для популярных постов за период
+       (передаётся только вместе с ключом KEY_TOP_POSTS);
+    5. Если передан 'category', он используется как доп. ключ для популярных тегов категории
+       (передаётся только вместе с ключом KEY_ALL_TAGS);
+    6. Если ключ запроса - KEY_SEARCH_POSTS или KEY_FUZZY_SEARCH_POSTS, используем язык и хэш поискового запроса
+       (формат "язык:хэш");
+    7. Если ключ запроса - KEY_DATE_POSTS, используем дату (формат "YYYY-MM-DD");
+    8. Если ключ запроса не KEY_POSTS_CALENDAR, не KEY_DATE_POSTS и не ключ поиска,
+       а 'slug', 'pk', 'period' и 'category' не переданы, ключ остаётся пустой строкой
        (отсутствие этих условий подразумевает необходимость в получении общих данных, по типу списков объекта модели).
+
+    К ключу добавляются версии пространств имён, от которых зависят данные (см. _get_namespaces()),
+    поэтому после вызова bump_cache_version() для любого из них данные будут сформированы заново.
+    Для данных, зависящих от времени публикации постов, также добавляется этап отложенной публикации
+    (см. _get_publish_epoch()), поэтому отложенный пост появляется в данных точно в момент публикации.
+
+    Защита от одновременного перестроения данных несколькими процессами:
+    - данные обновляются заранее с вероятностью, растущей к моменту истечения (см. _should_refresh());
+    - перестроение выполняет только процесс, получивший блокировку ключа;
+    - остальные процессы в это время получают устаревшие данные, а если данных в кэше нет совсем -
+      ожидают их появления в течение CACHE_REBUILD_WAIT_TIME.
     """
 
     # Формируем init_key для кэша
     if qs_key == settings.KEY_POSTS_CALENDAR:
         init_key = f'{kwargs["year"]}/{kwargs["month"]}'
+    elif qs_key in (settings.KEY_SEARCH_POSTS, settings.KEY_FUZZY_SEARCH_POSTS):
+        init_key = f'{kwargs["language"]}:{hashlib.md5(kwargs["q"].encode()).hexdigest()}'
+    elif qs_key == settings.KEY_DATE_POSTS:
+        init_key = kwargs['day']
     else:
-        init_key = kwargs.get('slug') or kwargs.get('pk') or ''
+        init_key = kwargs.get('slug') or kwargs.get('pk') or kwargs.get('period') or kwargs.get('category') or ''
 
-    # Проверяем наличие данных в кэше
-    object_list_or_object = cache.get(f'{settings.CACHE_KEY}{qs_key}{init_key}')
+    # Формируем ключ с учётом текущих версий пространств имён и этапа отложенной публикации
+    cache_key = f'{settings.CACHE_KEY}{qs_key}{init_key}:{_get_key_versions(qs_key, **kwargs)}'
 
-    if not object_list_or_object:
+    # Проверяем наличие актуальных данных в кэше (включая пустые результаты и отсутствующие объекты)
+    entry = cache.get(cache_key, _MISSING)
+    if entry is _MISSING:
+        entry = None
+    elif not _should_refresh(entry):
+        return _get_value(entry)
 
-        # Генерируем данные, если их нет в кэше
-        object_list_or_object = qs_definition(qs_key, **kwargs)
+    # Перестраиваем данные, если удалось получить блокировку ключа
+    lock_key = f'{cache_key}:lock'
+    if cache.add(lock_key, 1, settings.CACHE_REBUILD_LOCK_TIME):
+        try:
+            return _rebuild(cache_key, qs_key, **kwargs)
+        finally:
+            cache.delete(lock_key)
 
-        # Получаем время кэширования
-        cache_time = _get_cache_time(qs_key)
+    # Данные перестраивает другой процесс: отдаём устаревшие данные или ожидаем новые
+    if entry is None:
+        entry = _wait_for_rebuild(cache_key)
+    if entry is not None:
+        return _get_value(entry)
 
-        # Сохраняем данные в кэше
-        cache.set(f'{settings.CACHE_KEY}{qs_key}{init_key}', object_list_or_object, cache_time)
+    # Не дождались данных от другого процесса - формируем их самостоятельно
+    return _rebuild(cache_key, qs_key, **kwargs)
 
-    return object_list_or_object
+
+class CachedResponseMixin:
+    """
+    Миксин для вьюсетов, кэширующий готовый JSON-ответ.
+
+    При попадании в кэш ответ возвращается в виде сохранённых байтов, без обращения к БД и сериализаторам.
+    Ключ ответа учитывает адрес и параметры запроса (включая параметры пагинации), язык и версии
+    пространств имён данных, поэтому инвалидация выполняется так же, как и для get_cached_objects_or_queryset().
+
+    Вьюсет определяет get_response_cache_dependencies() и оборачивает необходимые действия
+    в get_cached_response(), например:
+        def list(self, request, *args, **kwargs):
+            return self.get_cached_response(super().list, request, *args, **kwargs)
+    """
+
+    def get_response_cache_dependencies(self) -> tuple[str, dict[str, str | int]]:
+        """Возвращает ключ запроса и его параметры, от данных которого зависит ответ текущего действия"""
+        raise NotImplementedError('Метод get_response_cache_dependencies() должен быть переопределён.')
+
+    def _get_response_cache_key(self, request: Request) -> str:
+        """Формирование ключа кэша для ответа"""
+        qs_key, kwargs = self.get_response_cache_dependencies()
+        versions = _get_key_versions(qs_key, **kwargs)
+        # Учитываются все значения повторяющихся параметров (например, несколько тегов в фильтре постов)
+        query = '&'.join(
+            f'{param}={value}' for param, values in sorted(request.query_params.lists()) for value in values
+        )
+        # Схема и хост учитываются, т.к. ответ содержит абсолютные ссылки (next/previous пагинации)
+        request_hash = hashlib.md5(
+            f'{request.scheme}://{request.get_host()}{request.path}?{query}'.encode()
+        ).hexdigest()
+        return f'{settings.CACHE_KEY}response:{qs_key}:{versions}:{request.LANGUAGE_CODE}:{request_hash}'
+
+    def get_cached_response(self, handler: Callable, request: Request, *args, **kwargs) -> Response | HttpResponse:
+        """
+        Возвращает ответ из кэша или вызывает обработчик действия и сохраняет его результат.
+
+        Кэшируются только успешные ответы в формате JSON (ответы BrowsableAPI формируются как обычно)
+        """
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        cache_key = self._get_response_cache_key(request)
+        content = cache.get(cache_key)
+        if content is not None:
+            return HttpResponse(content, content_type=request.accepted_renderer.media_type)
+
+        response = handler(request, *args, **kwargs)
+
+        if response.status_code == 200:
+            content = request.accepted_renderer.render(
+                response.data, request.accepted_media_type, self.get_renderer_context()
+            )
+            qs_key, _ = self.get_response_cache_dependencies()
+            cache.set(cache_key, content, _get_cache_time(qs_key))
+
+        return response
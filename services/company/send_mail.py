@@ -1,15 +1,101 @@
-from django.core.mail import send_mail
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
-from blog_by_me_DRF.settings import EMAIL_HOST_USER
+from blog_by_me_DRF.settings import EMAIL_HOST_USER, MAIL_BATCH_SIZE, MAIL_MAX_ATTEMPTS, MAIL_RETRY_DELAY
+from company.models import Contact
+
+
+class OutboxResult(NamedTuple):
+    """Результат обработки очереди исходящих писем"""
 
+    sent: int  # количество отправленных писем
+    failed: int  # количество неудачных попыток отправки
+    errors: list[str]  # описания ошибок отправки
 
-def send(user_mail: str) -> None:
-    """Отправление электронного письма при получении обратной связи через форму"""
-    send_mail(
+
+def build_message(contact: Contact) -> EmailMessage:
+    """Электронное письмо пользователю, оставившему запрос через форму обратной связи"""
+    return EmailMessage(
         _('Запрос к администрации веб-приложения MAXFIELD.'),
         _('Ваш запрос зарегистрирован. Ожидайте обратную связь на данный адрес эл. почты. '),
         EMAIL_HOST_USER,
-        [user_mail],
-        fail_silently=False,
+        [contact.email],
     )
+
+
+def _get_retry_delay(attempts: int) -> timedelta:
+    """Задержка перед следующей попыткой отправки (экспоненциальное увеличение после каждой неудачной попытки)"""
+    return timedelta(seconds=MAIL_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def _send_messages(contacts: list[Contact]) -> dict[int, Exception]:
+    """
+    Отправление писем по запросам через одно соединение с SMTP-сервером.
+    Возвращает ошибки отправки по id запросов (при ошибке соединения - для всех запросов)
+    """
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        return {contact.id: error for contact in contacts}
+
+    send_errors = {}
+    try:
+        for contact in contacts:
+            try:
+                connection.send_messages([build_message(contact)])
+            except Exception as error:
+                send_errors[contact.id] = error
+    finally:
+        connection.close()
+    return send_errors
+
+
+def send_pending_mail(batch_size: int = MAIL_BATCH_SIZE) -> OutboxResult:
+    """
+    Отправление очередной партии писем из очереди исходящих писем (запросы обратной связи в статусе pending).
+
+    Логика:
+        - Выбираются не более batch_size запросов, время попытки отправки которых наступило.
+          Строки блокируются до конца транзакции с пропуском уже заблокированных (SKIP LOCKED),
+          поэтому несколько обработчиков очереди не отправят одно письмо дважды.
+        - Письма партии отправляются через одно соединение с SMTP-сервером.
+        - При ошибке отправки увеличивается количество попыток и назначается время следующей попытки
+          (см. _get_retry_delay()); после MAIL_MAX_ATTEMPTS попыток запрос получает статус failed.
+    """
+    sent, failed, errors = 0, 0, []
+    now = timezone.now()
+
+    with transaction.atomic():
+        contacts = list(
+            Contact.objects.select_for_update(skip_locked=True)
+            .filter(mail_status=Contact.MAIL_PENDING, mail_next_attempt__lte=now)
+            .order_by('mail_next_attempt', 'id')[:batch_size]
+        )
+        if not contacts:
+            return OutboxResult(sent, failed, errors)
+
+        send_errors = _send_messages(contacts)
+        for contact in contacts:
+            error = send_errors.get(contact.id)
+            if error is None:
+                contact.mail_status = Contact.MAIL_SENT
+                sent += 1
+                continue
+
+            contact.mail_attempts += 1
+            if contact.mail_attempts >= MAIL_MAX_ATTEMPTS:
+                contact.mail_status = Contact.MAIL_FAILED
+            else:
+                contact.mail_next_attempt = now + _get_retry_delay(contact.mail_attempts)
+            failed += 1
+            errors.append(f'{contact.email} (попытка {contact.mail_attempts}): {error}')
+
+        Contact.objects.bulk_update(contacts, ('mail_status', 'mail_attempts', 'mail_next_attempt'))
+
+    return OutboxResult(sent, failed, errors)
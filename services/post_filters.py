@@ -0,0 +1,200 @@
+import bisect
+import threading
+import time
+from array import array
+from collections import defaultdict
+from datetime import date
+from typing import NamedTuple
+
+from django.utils import timezone
+
+from blog_by_me_DRF.settings import KEY_POST_FILTERS
+from services.caching import NAMESPACE_POST_FILTERS, get_cache_version
+from services.queryset import qs_definition
+
+
+def _to_id_array(post_ids: list[int]) -> array:
+    """Компактное множество id постов: отсортированный массив 64-битных целых (8 байт на пост)"""
+    return array('q', sorted(post_ids))
+
+
+def _contains(post_ids: array, post_id: int) -> bool:
+    """Входит ли id поста в отсортированный массив (двоичный поиск)"""
+    position = bisect.bisect_left(post_ids, post_id)
+    return position < len(post_ids) and post_ids[position] == post_id
+
+
+def _intersect(id_arrays: list[array]) -> list[int]:
+    """
+    Пересечение отсортированных массивов id постов.
+
+    Перебираются только id самого короткого массива (длина результата не превышает его длину),
+    вхождение в остальные массивы проверяется двоичным поиском, начиная со следующего по длине
+    """
+    id_arrays = sorted(id_arrays, key=len)
+    post_ids = list(id_arrays[0])
+    for other_ids in id_arrays[1:]:
+        if not post_ids:
+            break
+        post_ids = [post_id for post_id in post_ids if _contains(other_ids, post_id)]
+    return post_ids
+
+
+def _replace_id(id_arrays: dict, old_keys: set, new_keys: set, post_id: int) -> dict:
+    """Копия массивов id, в которой id поста перенесён из массивов old_keys в массивы new_keys"""
+    id_arrays = dict(id_arrays)
+    for key in old_keys - new_keys:
+        post_ids = array('q', id_arrays[key])
+        del post_ids[bisect.bisect_left(post_ids, post_id)]
+        if post_ids:
+            id_arrays[key] = post_ids
+        else:
+            del id_arrays[key]
+    for key in new_keys - old_keys:
+        post_ids = array('q', id_arrays.get(key, ()))
+        bisect.insort(post_ids, post_id)
+        id_arrays[key] = post_ids
+    return id_arrays
+
+
+class _Entry(NamedTuple):
+    """Данные поста, необходимые для фильтрации и сортировки результатов"""
+
+    publish: float  # время публикации (timestamp)
+    category: str | None  # url категории
+    day: date  # день публикации в часовом поясе сайта
+    tags: frozenset[str]  # slug тегов
+
+    @classmethod
+    def from_values(cls, publish, category__url: str | None, tag_slugs: list[str]) -> '_Entry':
+        return cls(publish.timestamp(), category__url, timezone.localdate(publish), frozenset(tag_slugs))
+
+    def get_keys(self) -> tuple[set[str], set[str], set[date]]:
+        """Ключи массивов id (теги, категории, дни публикации), в которые входит пост"""
+        return set(self.tags), {self.category} - {None}, {self.day}
+
+
+class _State(NamedTuple):
+    """Неизменяемый снимок индекса (заменяется целиком, поэтому чтение не требует блокировки)"""
+
+    version: int  # версия пространства имён индекса фильтрации, которой соответствует индекс
+    entries: dict[int, _Entry]
+    tags: dict[str, array]  # отсортированные массивы id постов по slug тегов
+    categories: dict[str, array]  # отсортированные массивы id постов по url категорий
+    days: dict[date, array]  # отсортированные массивы id постов по дням публикации
+
+
+class PostFilterIndex:
+    """
+    Инвертированный индекс постов в памяти процесса для фильтрации по тегам, категории и дню публикации.
+
+    Каждому тегу, категории и дню публикации соответствует отсортированный массив id постов
+    (память пропорциональна количеству постов с ключом, а не наибольшему id), поэтому пересечение
+    нескольких фильтров вычисляется по самому короткому массиву без запросов к БД,
+    а из БД (или кэша) загружается только страница найденных постов (см. search.SearchResult).
+
+    Индекс строится одним запросом к БД при первом обращении и обновляется:
+    - точечно после фиксации изменения или удаления поста и его тегов (refresh_post());
+    - полностью, если версия пространства имён индекса в кэше изменилась не только этим процессом
+      (изменения, выполненные другими процессами, изменение категорий и самих тегов).
+    При фильтрации выполняется только чтение версии из кэша
+    """
+
+    def __init__(self) -> None:
+        self._state: _State | None = None
+        self._lock = threading.Lock()
+
+    def filter_post_ids(
+        self, tags: tuple[str, ...] = (), category: str | None = None, day: date | None = None
+    ) -> list[int]:
+        """
+        id опубликованных постов, имеющих все заданные теги, категорию и день публикации,
+        в порядке вывода списка постов (-publish, -id)
+        """
+        state = self._get_actual_state()
+
+        id_arrays = [state.tags.get(tag, ()) for tag in tags]
+        if category is not None:
+            id_arrays.append(state.categories.get(category, ()))
+        if day is not None:
+            id_arrays.append(state.days.get(day, ()))
+        if not id_arrays:
+            return []
+
+        now = time.time()
+        entries = state.entries
+        post_ids = [post_id for post_id in _intersect(id_arrays) if entries[post_id].publish <= now]
+        post_ids.sort(key=lambda post_id: (entries[post_id].publish, post_id), reverse=True)
+        return post_ids
+
+    def refresh_post(self, post_id: int) -> None:
+        """
+        Точечное обновление данных поста в индексе после фиксации изменения поста или его тегов
+        (пост, не найденный среди не черновых, удаляется из индекса).
+
+        Если после изменения версия пространства имён индекса увеличилась ровно на единицу
+        (только изменением этого поста), индекс считается актуальным, иначе он будет полностью перестроен
+        при следующем обращении
+        """
+        if self._state is None:
+            return
+
+        post = next(iter(qs_definition(KEY_POST_FILTERS, post_id=post_id)), None)
+        entry = _Entry.from_values(**{key: value for key, value in post.items() if key != 'id'}) if post else None
+
+        with self._lock:
+            state = self._state
+            if state is None:
+                return
+
+            entries = dict(state.entries)
+            old_entry = entries.pop(post_id, None)
+            if entry is not None:
+                entries[post_id] = entry
+
+            old_keys = old_entry.get_keys() if old_entry else (set(), set(), set())
+            new_keys = entry.get_keys() if entry else (set(), set(), set())
+            tags, categories, days = (
+                _replace_id(id_arrays, old, new, post_id)
+                for id_arrays, old, new in zip((state.tags, state.categories, state.days), old_keys, new_keys)
+            )
+
+            version = get_cache_version(NAMESPACE_POST_FILTERS)
+            version = version if version == state.version + 1 else state.version
+            self._state = _State(version, entries, tags, categories, days)
+
+    def _get_actual_state(self) -> _State:
+        """Снимок индекса, соответствующий текущей версии его пространства имён (перестраивается при её изменении)"""
+        version = get_cache_version(NAMESPACE_POST_FILTERS)
+        state = self._state
+        if state is None or state.version != version:
+            with self._lock:
+                state = self._state
+                if state is None or state.version != version:
+                    state = self._state = self._build(version)
+        return state
+
+    @staticmethod
+    def _build(version: int) -> _State:
+        """Построение индекса по всем не черновым постам"""
+        entries = {post.pop('id'): _Entry.from_values(**post) for post in qs_definition(KEY_POST_FILTERS)}
+
+        post_ids = (defaultdict(list), defaultdict(list), defaultdict(list))
+        for post_id, entry in entries.items():
+            for keys, key_post_ids in zip(entry.get_keys(), post_ids):
+                for key in keys:
+                    key_post_ids[key].append(post_id)
+
+        tags, categories, days = (
+            {key: _to_id_array(ids) for key, ids in key_post_ids.items()} for key_post_ids in post_ids
+        )
+        return _State(version, entries, tags, categories, days)
+
+
+# Индекс фильтрации постов текущего процесса
+post_filter_index = PostFilterIndex()
+
+
+def filter_post_ids(tags: tuple[str, ...] = (), category: str | None = None, day: date | None = None) -> list[int]:
+    """id опубликованных постов по тегам, категории и дню публикации (по индексу фильтрации текущего процесса)"""
+    return post_filter_index.filter_post_ids(tags, category, day)
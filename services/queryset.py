@@ -1,21 +1,38 @@
+from collections import Counter
+from datetime import date, datetime, time, timedelta
 from typing import Any, NoReturn, Union
 
-from django.db.models import Count, Prefetch, Q, QuerySet, Sum
-from django.db.models.functions import Coalesce
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Prefetch, Q, QuerySet, Value, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
-from django.utils.translation import gettext as _
-from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from taggit.models import Tag, TaggedItem
 
-from blog.models import Category, Comment, Mark, Post, Rating, Video
+from blog.models import Category, Comment, Post, Rating, TagCounter, Video
 from blog_by_me_DRF import settings
 from company.models import About
 from users.models import User
 
+# Поля комментариев, выбираемые для вывода списка комментариев
+COMMENT_FIELDS = ('id', 'post_id', 'parent_id', 'name', 'text', 'created', 'updated')
 
-def _qs_simple_post_list():
-    return Post.objects.filter(draft=False, publish__lte=timezone.now()).only('id', 'url')
+
+def _get_local_range(first_day: date, next_day: date) -> tuple[datetime, datetime]:
+    """
+    Полуинтервал [начало first_day, начало next_day) в часовом поясе сайта для фильтрации по полю publish.
+
+    Условие по диапазону значений поля (в отличие от publish__date, publish__year и т.п., которые преобразуются
+    в вызовы функций над полем с AT TIME ZONE) позволяет использовать индекс publish_id_idx.
+    Границы вычисляются для каждого дня отдельно, поэтому переходы на летнее время учитываются
+    """
+    return (
+        timezone.make_aware(datetime.combine(first_day, time.min)),
+        timezone.make_aware(datetime.combine(next_day, time.min)),
+    )
 
 
 def _qs_post_list() -> QuerySet:
@@ -27,8 +44,7 @@ def _qs_post_list() -> QuerySet:
             Prefetch('tagged_items', queryset=TaggedItem.objects.select_related('tag'), to_attr='prefetched_tags'),
             Prefetch('author', User.objects.only('id', 'username')),
         )
-        .defer('video', 'created', 'updated', 'draft')
-        .annotate(ncomments=Count('comments'))
+        .defer('video', 'created', 'updated', 'draft', 'search_vector_ru', 'search_vector_en')
         .order_by('-publish', '-id')
     )
 
@@ -40,10 +56,7 @@ def _qs_post_detail(slug: str) -> Post:
         .prefetch_related(
             Prefetch('author', User.objects.only('id', 'username')),
         )
-        .defer('draft')
-        .annotate(
-            ncomments=Count('comments'),
-        ),
+        .defer('draft', 'search_vector_ru', 'search_vector_en'),
         url=slug,
     )
 
@@ -55,23 +68,12 @@ def _qs_rating_detail(ip: str, post_slug: str) -> Rating | None:
     post = get_object_or_404(Post.objects.filter(draft=False, publish__lte=timezone.now()).only('id'), url=post_slug)
 
     try:
-        rating = Rating.objects.get(ip=ip, post=post)
+        rating = Rating.objects.select_related('mark').get(ip=ip, post=post)
     except Rating.DoesNotExist:
         rating = None
     return rating
 
 
-def _qs_mark_detail(pk: int) -> Mark:
-    """
-    Возвращает объект оценки (Mark) по указанному ID.
-    Если оценка не найдена, вызывает исключение ValidationError
-    """
-    try:
-        return Mark.objects.get(id=pk)
-    except Mark.DoesNotExist:
-        raise ValidationError({'detail': _('Оценка с указанным id не найдена.')})
-
-
 def _qs_categories_list() -> QuerySet:
     """QS со списком категорий"""
     return Category.objects.all()
@@ -91,9 +93,7 @@ def _qs_videos_list() -> QuerySet:
                 to_attr='prefetched_tags',
             ),
         )
-        .annotate(
-            ncomments=Count('post_video__comments'),
-        )
+        .defer('post_video__search_vector_ru', 'post_video__search_vector_en')
         .order_by('-create_at')
     )
 
@@ -105,9 +105,26 @@ def _qs_about() -> About:
     return get_object_or_404(About)
 
 
+def _prefetch_last_posts(post_list: QuerySet) -> Prefetch:
+    """
+    Предвыборка последних опубликованных постов авторов (атрибут last_posts, не более AUTHOR_LAST_POSTS_LIMIT).
+
+    Срез выборки в Prefetch выполняется для всех авторов одним запросом с оконной функцией
+    ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY publish DESC, id DESC), поэтому количество запросов
+    не зависит от количества авторов. В post_list должно быть загружено поле author
+    """
+    post_list = post_list.filter(draft=False, publish__lte=timezone.now()).order_by('-publish', '-id')
+    limit = settings.AUTHOR_LAST_POSTS_LIMIT
+    return Prefetch('post_author', post_list[:limit], to_attr='last_posts')
+
+
 def _qs_author_list() -> QuerySet:
-    """QS со всеми пользователями"""
-    return User.objects.all().only('id', 'username', 'image', 'description')
+    """QS со всеми пользователями и их последними постами"""
+    return (
+        User.objects.all()
+        .only('id', 'username', 'image', 'description')
+        .prefetch_related(_prefetch_last_posts(Post.objects.only('title', 'url', 'publish', 'author')))
+    )
 
 
 def _qs_author_detail(pk: int) -> User:
@@ -117,15 +134,12 @@ def _qs_author_detail(pk: int) -> User:
             nposts=Count('post_author', filter=Q(post_author__draft=False, post_author__publish__lte=timezone.now()))
         )
         .prefetch_related(
-            Prefetch(
-                'post_author',
-                Post.objects.filter(draft=False, publish__lte=timezone.now())
-                .order_by('-publish', '-id')
-                .select_related('category')
+            _prefetch_last_posts(
+                Post.objects.select_related('category')
+                .defer('search_vector_ru', 'search_vector_en')
                 .prefetch_related(
                     Prefetch('tagged_items', TaggedItem.objects.select_related('tag'), to_attr='prefetched_tags')
-                )[:3],
-                to_attr='last_3_posts',
+                )
             )
         )
         .defer('password', 'last_login', 'is_active', 'is_staff'),
@@ -133,26 +147,16 @@ def _qs_author_detail(pk: int) -> User:
     )
 
 
-def _qs_author_detail_strict(post_slug: str) -> User:
+def _qs_top_posts(period: str | None = None) -> QuerySet:
     """
-    Возвращает объект автора (User) по указанному post_slug.
-    Используется для получения упрощённого набора данных автора при изменении его рейтинга (user_rating).
-    Если автор не найден, вызывает исключение ValidationError.
+    QS с тремя самыми популярными постами (по хранимому рейтингу поста).
+    Если передан период (week, month), выбираются только посты, опубликованные за это время
     """
-    try:
-        return User.objects.get(post_author__url=post_slug)
-    except User.DoesNotExist:
-        raise ValidationError({'detail': _('Пользователь, связанный с указанным slug поста, не найден.')})
-
-
-def _qs_top_posts() -> QuerySet:
-    """QS с тремя самыми популярными постами"""
-    return (
-        Post.objects.filter(draft=False, publish__lte=timezone.now())
-        .only('title', 'body', 'url')
-        .alias(total_likes=Coalesce(Sum('rating_post__mark__value'), 0))
-        .order_by('-total_likes')[:3]
-    )
+    time_now = timezone.now()
+    posts = Post.objects.filter(draft=False, publish__lte=time_now)
+    if period:
+        posts = posts.filter(publish__gte=time_now - timedelta(days=settings.TOP_POSTS_PERIODS[period]))
+    return posts.only('title', 'body', 'url').order_by('-score', '-id')[:3]
 
 
 def _qs_last_posts() -> QuerySet:
@@ -164,28 +168,173 @@ def _qs_last_posts() -> QuerySet:
     )
 
 
-def _qs_top_tags() -> QuerySet:
-    """QS с десятью популярными тегами по количеству использования"""
-    return Tag.objects.annotate(
-        npost=Count('post_tags', filter=Q(post_tags__draft=False, post_tags__publish__lte=timezone.now()))
-    ).order_by('-npost')[:10]
+def _qs_top_tags(category: str | None = None) -> list[Tag]:
+    """
+    Популярные теги по количеству опубликованных постов (всего или в категории с url category).
+
+    Количество берётся из счётчиков TagCounter (первые строки индекса category_posts_count_idx), которые учитывают
+    и отложенные посты, поэтому из них вычитается количество отложенных постов с тегом (таких постов немного).
+    Уменьшиться могут только счётчики тегов отложенных постов, поэтому для точного результата достаточно выбрать
+    на столько счётчиков больше, сколько таких тегов
+    """
+    scheduled_posts = Post.objects.filter(draft=False, publish__gt=timezone.now())
+    counters = TagCounter.objects.filter(category=None)
+    if category:
+        scheduled_posts = scheduled_posts.filter(category__url=category)
+        counters = TagCounter.objects.filter(category__url=category)
+
+    scheduled_counts = Counter(
+        TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Post), object_id__in=scheduled_posts.values('id')
+        ).values_list('tag_id', flat=True)
+    )
+
+    tags, limit = [], settings.TOP_TAGS_LIMIT
+    for counter in counters.select_related('tag').order_by('-posts_count', 'tag_id')[: limit + len(scheduled_counts)]:
+        counter.tag.npost = counter.posts_count - scheduled_counts[counter.tag_id]
+        if counter.tag.npost:
+            tags.append(counter.tag)
+    tags.sort(key=lambda tag: -tag.npost)
+    return tags[:limit]
 
 
 def _qs_days_posts_in_current_month(year: int, month: int) -> QuerySet:
-    """Дни публикаций в заданном месяце для календаря"""
-    return Post.objects.filter(
-        draft=False, publish__lte=timezone.now(), publish__year=year, publish__month=month
-    ).dates('publish', 'day')
+    """Дни публикаций в заданном месяце для календаря (выборка по диапазону времени публикации)"""
+    start, end = _get_local_range(date(year, month, 1), date(year + month // 12, month % 12 + 1, 1))
+    post_list = Post.objects.filter(draft=False, publish__lte=timezone.now(), publish__gte=start, publish__lt=end)
+    return post_list.dates('publish', 'day')
+
+
+def _qs_publish_days_in_year(year: int) -> QuerySet:
+    """Дни публикаций постов за год (одним запросом с группировкой по дню публикации в часовом поясе сайта)"""
+    start, end = _get_local_range(date(year, 1, 1), date(year + 1, 1, 1))
+    post_list = Post.objects.filter(draft=False, publish__lte=timezone.now(), publish__gte=start, publish__lt=end)
+    return post_list.dates('publish', 'day')
+
+
+def _qs_date_post_ids(day: str) -> list[int]:
+    """
+    Список id опубликованных постов за день (дата в формате YYYY-MM-DD в часовом поясе сайта)
+    в порядке вывода списка постов. Выборка по диапазону времени публикации использует индекс publish_id_idx
+    """
+    first_day = datetime.strptime(day, '%Y-%m-%d').date()
+    start, end = _get_local_range(first_day, first_day + timedelta(days=1))
+    return list(
+        Post.objects.filter(draft=False, publish__lte=timezone.now(), publish__gte=start, publish__lt=end)
+        .order_by('-publish', '-id')
+        .values_list('id', flat=True)
+    )
+
+
+def _qs_comments_list(post_id: str, parent_id: str | None = None) -> QuerySet:
+    """
+    QS с комментариями первого уровня заданного поста (ответы получаются отдельно, см. _qs_comment_replies()),
+    либо с ответами на комментарий parent_id, если он передан.
+    Комментарии выбираются словарями (без создания объектов модели)
+    """
+    comments = Comment.objects.filter(post_id=post_id).values(*COMMENT_FIELDS)
+    if parent_id:
+        return comments.filter(parent_id=parent_id)
+    return comments.filter(parent=None)
 
 
-def _qs_comments_list(post_id: str) -> QuerySet:
-    """QS с комментариями заданного поста"""
+def _qs_comment_replies(parent_ids: list[int]) -> QuerySet:
+    """
+    QS с первыми ответами (не более COMMENT_REPLIES_LIMIT + 1, лишний ответ означает, что выведены не все ответы)
+    на каждый из заданных комментариев, упорядоченными по комментариям и времени создания.
+    Ответы ограничиваются в одном запросе оконной функцией ROW_NUMBER()
+    """
     return (
-        Comment.objects.filter(post_id=post_id, parent=None)
-        .prefetch_related(
-            Prefetch('children', Comment.objects.defer('email', 'active'), to_attr='prefetched_comments2')
+        Comment.objects.filter(parent_id__in=parent_ids)
+        .annotate(
+            position=Window(RowNumber(), partition_by=F('parent_id'), order_by=(F('created').asc(), F('id').asc()))
         )
-        .defer('email', 'active')
+        .filter(position__lte=settings.COMMENT_REPLIES_LIMIT + 1)
+        .order_by('parent_id', 'created', 'id')
+        .values(*COMMENT_FIELDS)
+    )
+
+
+def _qs_scheduled_posts() -> QuerySet:
+    """Время публикации отложенных постов (по возрастанию)"""
+    return (
+        Post.objects.filter(draft=False, publish__gt=timezone.now())
+        .order_by('publish')
+        .values_list('publish', flat=True)
+    )
+
+
+def _qs_search_post_ids(q: str, language: str) -> list[int]:
+    """
+    Список id опубликованных постов, найденных по запросу, в порядке релевантности.
+    Используются хранимые поисковые векторы заданного языка (search_vector_ru, search_vector_en)
+    """
+    search_vector_field = f'search_vector_{language}'
+    search_query = SearchQuery(q, config=settings.SEARCH_CONFIGS[language])
+    return list(
+        Post.objects.filter(draft=False, publish__lte=timezone.now(), **{search_vector_field: search_query})
+        .annotate(rank=SearchRank(F(search_vector_field), search_query))
+        .order_by('-rank', '-publish', '-id')
+        .values_list('id', flat=True)
+    )
+
+
+def _qs_fuzzy_search_post_ids(q: str, language: str) -> list[int]:
+    """
+    Список id опубликованных постов, в заголовке (на заданном языке) или тегах которых есть слова,
+    похожие на запрос (сходство триграмм pg_trgm не ниже FUZZY_SEARCH_SIMILARITY, используются GIN индексы триграмм).
+    Посты сортируются по наибольшему сходству, количество постов ограничено FUZZY_SEARCH_LIMIT
+    """
+    title_field = f'title_{language}'
+    post_list = Post.objects.filter(draft=False, publish__lte=timezone.now())
+
+    by_title = (
+        post_list.filter(**{f'{title_field}__trigram_word_similar': q})
+        .annotate(similarity=TrigramWordSimilarity(q, title_field))
+        .order_by('-similarity', '-id')
+        .values_list('id', 'similarity')[: settings.FUZZY_SEARCH_LIMIT]
+    )
+    by_tags = (
+        post_list.filter(tags__name__trigram_word_similar=q)
+        .values('id')
+        .annotate(similarity=Max(TrigramWordSimilarity(q, 'tags__name')))
+        .order_by('-similarity', '-id')
+        .values_list('id', 'similarity')[: settings.FUZZY_SEARCH_LIMIT]
+    )
+
+    # Порог сходства оператора %> устанавливается только для запросов текущей транзакции
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL pg_trgm.word_similarity_threshold = %s', [settings.FUZZY_SEARCH_SIMILARITY])
+        by_title, by_tags = list(by_title), list(by_tags)
+
+    similarities = dict(by_tags)
+    for post_id, similarity in by_title:
+        similarities[post_id] = max(similarity, similarities.get(post_id, 0))
+    return sorted(similarities, key=lambda post_id: (-similarities[post_id], -post_id))[: settings.FUZZY_SEARCH_LIMIT]
+
+
+def _qs_suggest_posts() -> QuerySet:
+    """
+    Заголовки всех не черновых постов (включая отложенные) для индекса подсказок.
+    Время публикации проверяется при поиске подсказок, поэтому отложенные посты появляются в них без перестроения
+    """
+    return Post.objects.filter(draft=False).values('id', 'url', 'publish', 'title_ru', 'title_en')
+
+
+def _qs_post_filters(post_id: int | None = None) -> QuerySet:
+    """
+    Данные всех не черновых постов (включая отложенные) или отдельного поста для индекса фильтрации:
+    время публикации, категория и slug тегов (одним запросом с агрегацией тегов в массив).
+    Время публикации проверяется при фильтрации, поэтому отложенные посты появляются в результатах без перестроения
+    """
+    post_list = Post.objects.filter(draft=False)
+    if post_id is not None:
+        post_list = post_list.filter(id=post_id)
+    return (
+        post_list.values('id', 'publish', 'category__url')
+        .annotate(tag_slugs=ArrayAgg('tags__slug', filter=Q(tags__isnull=False), distinct=True, default=Value([])))
+        .order_by()
     )
 
 
@@ -197,22 +346,27 @@ def not_definite_qs(**kwargs: Any) -> NoReturn:
 def qs_definition(qs_key: str, **kwargs: str | int) -> Union[QuerySet, settings.ObjectModel, NoReturn]:
     """Определение необходимого запроса в БД по ключу"""
     qs_keys = {
-        settings.KEY_SIMPLE_POSTS_LIST: _qs_simple_post_list,
         settings.KEY_POSTS_LIST: _qs_post_list,
         settings.KEY_POST_DETAIL: _qs_post_detail,
         settings.KEY_RATING_DETAIL: _qs_rating_detail,
-        settings.KEY_MARK_DETAIL: _qs_mark_detail,
         settings.KEY_CATEGORIES_LIST: _qs_categories_list,
         settings.KEY_VIDEOS_LIST: _qs_videos_list,
         settings.KEY_ABOUT: _qs_about,
         settings.KEY_AUTHORS_LIST: _qs_author_list,
         settings.KEY_AUTHOR_DETAIL: _qs_author_detail,
-        settings.KEY_AUTHOR_DETAIL_STRICT: _qs_author_detail_strict,
         settings.KEY_TOP_POSTS: _qs_top_posts,
         settings.KEY_LAST_POSTS: _qs_last_posts,
         settings.KEY_ALL_TAGS: _qs_top_tags,
         settings.KEY_POSTS_CALENDAR: _qs_days_posts_in_current_month,
+        settings.KEY_POSTS_CALENDAR_YEAR: _qs_publish_days_in_year,
+        settings.KEY_DATE_POSTS: _qs_date_post_ids,
         settings.KEY_COMMENTS_LIST: _qs_comments_list,
+        settings.KEY_COMMENT_REPLIES: _qs_comment_replies,
+        settings.KEY_SCHEDULED_POSTS: _qs_scheduled_posts,
+        settings.KEY_SEARCH_POSTS: _qs_search_post_ids,
+        settings.KEY_FUZZY_SEARCH_POSTS: _qs_fuzzy_search_post_ids,
+        settings.KEY_SUGGEST_POSTS: _qs_suggest_posts,
+        settings.KEY_POST_FILTERS: _qs_post_filters,
     }
     definite_qs = qs_keys.get(qs_key, not_definite_qs)
     return definite_qs(**kwargs) if kwargs else definite_qs()
@@ -1,18 +1,182 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, Exists, F, IntegerField, Model, OuterRef, Q, Value, When
+from django.utils import timezone
 from django.utils.translation import gettext as _
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 
-from blog.models import Rating
-from blog_by_me_DRF.settings import KEY_AUTHOR_DETAIL_STRICT, KEY_MARK_DETAIL, KEY_RATING_DETAIL
+from blog.models import Mark, Post, Rating
+from blog_by_me_DRF.settings import (
+    CACHE_KEY,
+    KEY_RATING_DETAIL,
+    RATING_FLUSH_BATCH_SIZE,
+    RATING_FLUSH_LOCK_TIME,
+    RATING_WRITE_BEHIND,
+)
+from services.caching import NAMESPACE_AUTHOR, NAMESPACE_RATINGS, bump_cache_version, make_namespace
 from services.queryset import qs_definition
+from users.models import User
+
+# Создание или обновление рейтинга одним запросом.
+# Все подзапросы WITH видят одно состояние базы данных, поэтому old_mark содержит оценку до изменения.
+# Разница значений оценок (delta) сразу применяется к рейтингу поста (score) и рейтингу автора (user_rating).
+# xmax = 0 только у вставленной строки, что позволяет отличить создание рейтинга от обновления
+_UPSERT_RATING_SQL = f'''
+    WITH new_mark AS (
+        SELECT value FROM {Mark._meta.db_table} WHERE id = %(mark_id)s
+    ),
+    old_mark AS (
+        SELECT mark.value
+        FROM {Rating._meta.db_table} AS rating
+        JOIN {Mark._meta.db_table} AS mark ON mark.id = rating.mark_id
+        WHERE rating.ip = %(ip)s AND rating.post_id = %(post_id)s
+    ),
+    delta AS (
+        SELECT new_mark.value - COALESCE((SELECT value FROM old_mark), 0) AS value FROM new_mark
+    ),
+    upsert AS (
+        INSERT INTO {Rating._meta.db_table} (ip, mark_id, post_id)
+        SELECT %(ip)s, %(mark_id)s, %(post_id)s FROM new_mark
+        ON CONFLICT (ip, post_id) DO UPDATE SET mark_id = EXCLUDED.mark_id
+        RETURNING (xmax = 0) AS created
+    ),
+    post_update AS (
+        UPDATE {Post._meta.db_table} SET score = score + delta.value
+        FROM delta WHERE id = %(post_id)s AND delta.value <> 0
+    ),
+    author_update AS (
+        UPDATE {User._meta.db_table} SET user_rating = user_rating + delta.value
+        FROM delta WHERE id = %(author_id)s AND delta.value <> 0
+    )
+    SELECT upsert.created, delta.value FROM upsert, delta
+'''
+
+
+# Буфер оценок в режиме отложенной записи (RATING_WRITE_BEHIND):
+# список оценок "id поста:id оценки:ip" в порядке поступления и хеш пар "id поста:ip",
+# оценки которых поступили, но ещё не записаны в БД
+_VOTES_KEY = f'{CACHE_KEY}rating_votes'
+_PENDING_VOTES_KEY = f'{CACHE_KEY}rating_votes_pending'
+_FLUSH_LOCK_KEY = f'{CACHE_KEY}rating_votes_flush_lock'
+
+
+def _get_redis():
+    """Клиент Redis кэша по умолчанию (для буфера оценок используются списки и хеши, недоступные через API кэша)"""
+    return cache._cache.get_client(write=True)
+
+
+def _add_deltas(model: type[Model], field: str, deltas: dict[int, int]) -> None:
+    """Изменение значения поля объектов модели на заданные разности (по id объектов) одним запросом UPDATE"""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if deltas:
+        whens = [When(id=pk, then=Value(delta)) for pk, delta in deltas.items()]
+        model.objects.filter(id__in=deltas).update(**{field: F(field) + Case(*whens, output_field=IntegerField())})
+
+
+def apply_rating_votes(votes: dict[tuple[int, str], int]) -> None:
+    """
+    Запись оценок из буфера в БД (votes - id оценки для каждой пары "id поста, ip").
+
+    Логика:
+        - Оценки несуществующих постов и несуществующие оценки пропускаются.
+        - Прежние оценки пар блокируются (SELECT ... FOR UPDATE) до конца транзакции.
+        - Рейтинги создаются или обновляются одним запросом INSERT ... ON CONFLICT DO UPDATE.
+        - Разности значений оценок суммируются по постам и авторам и применяются
+          одним запросом UPDATE для рейтингов постов (score) и одним - для рейтингов авторов (user_rating).
+    """
+    with transaction.atomic():
+        mark_values = dict(Mark.objects.filter(id__in=set(votes.values())).values_list('id', 'value'))
+        post_authors = dict(
+            Post.objects.filter(id__in={post_id for post_id, ip in votes}).values_list('id', 'author_id')
+        )
+        votes = {key: mark_id for key, mark_id in votes.items() if mark_id in mark_values and key[0] in post_authors}
+        if not votes:
+            return
+
+        old_ratings = (
+            Rating.objects.select_for_update(of=('self',))
+            .filter(reduce(or_, (Q(post_id=post_id, ip=ip) for post_id, ip in votes)))
+            .values_list('post_id', 'ip', 'mark__value')
+        )
+        old_values = {(post_id, ip): value for post_id, ip, value in old_ratings}
+
+        Rating.objects.bulk_create(
+            [Rating(ip=ip, post_id=post_id, mark_id=mark_id) for (post_id, ip), mark_id in votes.items()],
+            update_conflicts=True,
+            unique_fields=('ip', 'post'),
+            update_fields=('mark',),
+        )
+
+        post_deltas, author_deltas = defaultdict(int), defaultdict(int)
+        for (post_id, ip), mark_id in votes.items():
+            delta = mark_values[mark_id] - old_values.get((post_id, ip), 0)
+            post_deltas[post_id] += delta
+            if post_authors[post_id]:
+                author_deltas[post_authors[post_id]] += delta
+        _add_deltas(Post, 'score', post_deltas)
+        _add_deltas(User, 'user_rating', author_deltas)
+
+        # Запросы не вызывают сигналы моделей, поэтому зависящие от рейтинга данные удаляются из кэша здесь
+        namespaces = [
+            make_namespace(NAMESPACE_AUTHOR, author_id) for author_id, delta in author_deltas.items() if delta
+        ]
+        bump_cache_version(NAMESPACE_RATINGS, *namespaces)
+
+
+def flush_rating_votes(batch_size: int = RATING_FLUSH_BATCH_SIZE) -> int:
+    """
+    Запись в БД очередной партии оценок из буфера (режим отложенной записи).
+    Возвращает количество извлечённых из буфера оценок.
+
+    Логика:
+        - Запись выполняется только одним процессом одновременно (блокировка в кэше).
+        - Партия извлекается из начала списка атомарно (MULTI: LRANGE + LTRIM);
+          из нескольких оценок одной пары учитывается последняя.
+        - При ошибке записи партия возвращается в начало списка в исходном порядке.
+        - После фиксации записи пары партии удаляются из хеша оценок, ещё не записанных в БД.
+    """
+    if not cache.add(_FLUSH_LOCK_KEY, 1, RATING_FLUSH_LOCK_TIME):
+        return 0
+
+    try:
+        client = _get_redis()
+        pipeline = client.pipeline()
+        pipeline.lrange(_VOTES_KEY, 0, batch_size - 1)
+        pipeline.ltrim(_VOTES_KEY, batch_size, -1)
+        raw_votes = pipeline.execute()[0]
+        if not raw_votes:
+            return 0
+
+        votes = {}
+        for raw_vote in raw_votes:
+            post_id, mark_id, ip = raw_vote.decode().split(':', 2)
+            votes[(int(post_id), ip)] = int(mark_id)
+
+        try:
+            apply_rating_votes(votes)
+        except Exception:
+            client.lpush(_VOTES_KEY, *reversed(raw_votes))
+            raise
+
+        client.hdel(_PENDING_VOTES_KEY, *(f'{post_id}:{ip}' for post_id, ip in votes))
+        return len(raw_votes)
+    finally:
+        cache.delete(_FLUSH_LOCK_KEY)
 
 
 class ServiceUserRating:
     """
-    Класс для управления рейтингом автора user_rating на основе оценки (Mark) для поста.
+    Класс для управления рейтингом пользователя к посту и рейтингом автора user_rating на основе оценки (Mark).
 
     Взаимодействие с объектом класса осуществляется через:
     - existing_rating
-    - update_author_rating()
+    - save_rating()
     - get_message()
     - get_status_code()
     """
@@ -20,37 +184,33 @@ class ServiceUserRating:
     RATING_UPDATE_MESSAGE = _('Рейтинг успешно обновлен.')
     RATING_CREATE_MESSAGE = _('Рейтинг успешно создан.')
 
-    def __init__(self, ip: str, post_slug: str, mark_id: int) -> None:
+    def __init__(self, ip: str, post_slug: str) -> None:
         """
         Инициализация
 
         Атрибуты объекта:
         self.ip: Сохраняет IP-адрес оценивающего пользователя.
         self.post_slug: Сохраняет идентификатор поста.
-        self.mark_id: Сохраняет идентификатор оценки.
         self._existing_rating: Внутренний атрибут, который может иметь три значения:
             - False: Запрос к базе данных на получение рейтинга ещё не выполнялся.
             - Rating: Экземпляр модели Rating, если рейтинг найден в базе данных.
             - None: Если рейтинг в базе данных не найден.
+        self._created: Внутренний атрибут, который устанавливается в методе save_rating():
+            - True: Рейтинг создан.
+            - False: Существующий рейтинг обновлён.
         """
         self.ip = ip
         self.post_slug = post_slug
-        self.mark_id = mark_id
 
         self._existing_rating = False
+        self._created = False
 
     @property
     def existing_rating(self) -> Rating | None:
         """
         Применяется как атрибут (используйте .existing_rating).
 
-        Возвращает текущий рейтинг пользователя к посту.
-
-        Особенности использования:
-            1. Может быть вызван отдельно в представлении для проверки наличия существующего
-               рейтинга или подтверждения его отсутствия (определение первичного оценивания),
-               с последующей передачей в сериализатор.
-            2. Вызывается автоматически внутри метода update_author_rating()
+        Возвращает текущий рейтинг пользователя к посту (используется для вывода существующего рейтинга).
 
         Логика работы:
             - Если запрос ещё не выполнялся (_existing_rating == False),
@@ -61,53 +221,100 @@ class ServiceUserRating:
             self._existing_rating = qs_definition(KEY_RATING_DETAIL, ip=self.ip, post_slug=self.post_slug)
         return self._existing_rating
 
-    def update_author_rating(self) -> None:
+    def save_rating(self, mark_id: int) -> None:
         """
-        Обновляет рейтинг автора на основе выбранной оценки (Mark) к его посту.
+        Создаёт или обновляет рейтинг пользователя к посту и изменяет рейтинг поста и автора.
 
         Логика:
-            - Если существует ранее присвоенная оценка (проверяется через existing_rating),
-              старое значение рейтинга вычитается.
-            - Добавляется новое значение рейтинга, соответствующее выбранной оценке (Mark), и сохраняется в базе данных.
+            - Опубликованный пост блокируется (SELECT ... FOR UPDATE) до конца транзакции,
+              чтобы одновременные оценки одного поста выполнялись последовательно
+              и разница значений оценок вычислялась по актуальным данным.
+              Если пост не существует или недоступен для просмотра, вызывается ошибка 404.
+            - Рейтинг сохраняется одним запросом INSERT ... ON CONFLICT DO UPDATE (уникальная пара ip и пост),
+              в этом же запросе изменяются рейтинг поста (score) и рейтинг автора (user_rating).
+            - Если оценка с указанным id не найдена, вызывается исключение ValidationError.
+            - В режиме отложенной записи (RATING_WRITE_BEHIND) оценка сохраняется в буфер (см. _buffer_rating()).
+        """
+        if RATING_WRITE_BEHIND:
+            self._buffer_rating(mark_id)
+            return
+
+        with transaction.atomic():
+            post = get_object_or_404(
+                Post.objects.select_for_update()
+                .filter(draft=False, publish__lte=timezone.now())
+                .only('id', 'author_id'),
+                url=self.post_slug,
+            )
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    _UPSERT_RATING_SQL,
+                    {'ip': self.ip, 'mark_id': mark_id, 'post_id': post.id, 'author_id': post.author_id},
+                )
+                row = cursor.fetchone()
+
+        if row is None:
+            raise ValidationError({'detail': _('Оценка с указанным id не найдена.')})
+
+        self._created, delta = row
+
+        # Запрос не вызывает сигналы моделей, поэтому зависящие от рейтинга данные удаляются из кэша здесь
+        if delta:
+            namespaces = [NAMESPACE_RATINGS]
+            if post.author_id:
+                namespaces.append(make_namespace(NAMESPACE_AUTHOR, post.author_id))
+            bump_cache_version(*namespaces)
+
+    def _buffer_rating(self, mark_id: int) -> None:
         """
+        Сохранение оценки в буфер оценок (режим отложенной записи, см. flush_rating_votes()).
 
-        mark = qs_definition(KEY_MARK_DETAIL, pk=self.mark_id)
-        author = qs_definition(KEY_AUTHOR_DETAIL_STRICT, post_slug=self.post_slug)
+        Логика:
+            - Пост и оценка проверяются одним запросом к БД (ошибка 404 или ValidationError, как и при записи в БД).
+            - Оценка добавляется в список буфера, пара "пост:ip" - в хеш оценок, ещё не записанных в БД.
+            - Если пара уже была в хеше, рейтинг обновлён. Иначе рейтинг создан, если его нет в БД:
+              хеш очищается только после фиксации записи буфера, поэтому оценка, извлечённая из буфера,
+              но ещё не записанная, всегда учитывается либо хешем, либо БД.
+        """
+        post = get_object_or_404(
+            Post.objects.filter(draft=False, publish__lte=timezone.now())
+            .annotate(mark_exists=Exists(Mark.objects.filter(id=mark_id)))
+            .only('id'),
+            url=self.post_slug,
+        )
+        if not post.mark_exists:
+            raise ValidationError({'detail': _('Оценка с указанным id не найдена.')})
 
-        if self.existing_rating:
-            author.user_rating -= self.existing_rating.mark.value
+        pipeline = _get_redis().pipeline()
+        pipeline.hset(_PENDING_VOTES_KEY, f'{post.id}:{self.ip}', mark_id)
+        pipeline.rpush(_VOTES_KEY, f'{post.id}:{mark_id}:{self.ip}')
+        is_new_vote = pipeline.execute()[0]
 
-        author.user_rating += mark.value
-        author.save()
+        self._created = bool(is_new_vote) and not Rating.objects.filter(ip=self.ip, post_id=post.id).exists()
 
     def get_message(self) -> tuple[str, int]:
         """
         Возвращает сообщение в зависимости от действия с рейтингом.
 
         Логика:
-            - Если _existing_rating содержит объект Rating, возвращается сообщение,
-            означающее обновление оценки к посту.
-            - Если _existing_rating равно None, возвращается сообщение, означающее добавление оценки к посту.
+            - Если _created равно False, возвращается сообщение, означающее обновление оценки к посту.
+            - Если _created равно True, возвращается сообщение, означающее добавление оценки к посту.
 
-        _existing_rating обновляется в методе existing_rating после выполнения запроса к базе данных, и может
+        _created обновляется в методе save_rating() по результату запроса к базе данных, и может
         служить индикатором для определения необходимого сообщения.
         """
-        return (
-            ServiceUserRating.RATING_UPDATE_MESSAGE
-            if self._existing_rating
-            else ServiceUserRating.RATING_CREATE_MESSAGE
-        )
+        return ServiceUserRating.RATING_CREATE_MESSAGE if self._created else ServiceUserRating.RATING_UPDATE_MESSAGE
 
     def get_status_code(self) -> tuple[str, int]:
         """
         Возвращает статусный код в зависимости от действия с рейтингом.
 
         Логика:
-            - Если _existing_rating содержит объект Rating, возвращается код,
-            означающий обновление оценки к посту.
-            - Если _existing_rating равно None, возвращается код, означающий добавление оценки к посту.
+            - Если _created равно False, возвращается код, означающий обновление оценки к посту.
+            - Если _created равно True, возвращается код, означающий добавление оценки к посту.
 
-        _existing_rating обновляется в методе existing_rating после выполнения запроса к базе данных, и может
+        _created обновляется в методе save_rating() по результату запроса к базе данных, и может
         служить индикатором для определения необходимого HTTP-статуса.
         """
-        return status.HTTP_200_OK if self._existing_rating else status.HTTP_201_CREATED
+        return status.HTTP_201_CREATED if self._created else status.HTTP_200_OK
@@ -1,53 +1,134 @@
 import datetime
+from collections.abc import Iterator, Sequence
+from typing import Any
 
-from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.contrib.postgres.search import CombinedSearchVector, SearchVector
 from django.db.models import QuerySet
 from django.utils.translation import gettext as _
 
-from blog_by_me_DRF.settings import LANGUAGES
+from blog_by_me_DRF.settings import KEY_DATE_POSTS, KEY_FUZZY_SEARCH_POSTS, KEY_SEARCH_POSTS, LANGUAGES, SEARCH_CONFIGS
+from services import caching, post_filters
 from services.exceptions import NoContent
 
 
-def search_by_tag(object_list: QuerySet, tag_slug: str) -> QuerySet | NoContent:
+def get_search_vector(language: str) -> CombinedSearchVector:
+    """
+    Поисковый вектор поста для заданного языка.
+    Заголовок имеет больший вес (A), чем содержание (B), поэтому совпадения в заголовке выше в результатах поиска
+    """
+    config = SEARCH_CONFIGS[language]
+    return SearchVector(f'title_{language}', weight='A', config=config) + SearchVector(
+        f'body_{language}', weight='B', config=config
+    )
+
+
+def update_search_vectors(post_list: QuerySet) -> int:
+    """Обновление хранимых поисковых векторов постов для всех языков одним запросом UPDATE"""
+    return post_list.update(
+        **{f'search_vector_{language}': get_search_vector(language) for language, _name in LANGUAGES}
+    )
+
+
+def _filter_by_index(object_list: QuerySet, no_content_message: str, **filters: Any) -> 'SearchResult':
+    """
+    Фильтрация записей по индексу фильтрации постов в памяти процесса (см. post_filters.PostFilterIndex):
+    соединения с таблицами тегов и категорий не выполняются, из object_list загружается только страница постов
+    """
+    post_ids = post_filters.filter_post_ids(**filters)
+    if not post_ids:
+        raise NoContent(no_content_message)
+    return SearchResult(post_ids, object_list)
+
+
+def search_by_tag(object_list: QuerySet, tag_slug: str) -> 'SearchResult':
     """Функция фильтрует записи по тегу"""
+    return _filter_by_index(object_list, _('Посты с заданным тегом не найдены'), tags=(tag_slug,))
 
-    post_list = object_list.filter(tags__slug=tag_slug)
 
-    if not post_list.exists():
-        raise NoContent(_('Посты с заданным тегом не найдены'))
-    return post_list
+def search_by_category(object_list: QuerySet, category_slug: str) -> 'SearchResult':
+    """Функция фильтрует записи по категории"""
+    return _filter_by_index(object_list, _('Посты в заданной категории не найдены'), category=category_slug)
 
 
-def search_by_date(object_list: QuerySet, date: str) -> QuerySet | NoContent:
-    """Функция фильтрует записи по дате"""
+def search_by_filters(
+    object_list: QuerySet, tags: list[str], category: str | None = None, date: str | None = None
+) -> 'SearchResult':
+    """Функция фильтрует записи по пересечению фильтров: всем заданным тегам, категории и дате публикации"""
+    day = datetime.datetime.strptime(date, '%Y-%m-%d').date() if date else None
+    return _filter_by_index(
+        object_list, _('Посты по заданным фильтрам не найдены'), tags=tuple(tags), category=category, day=day
+    )
 
-    format_date = datetime.datetime.strptime(date, '%Y-%m-%d').date()
-    post_list = object_list.filter(created__date=format_date)
 
-    if not post_list.exists():
+def search_by_date(object_list: QuerySet, date: str) -> 'SearchResult':
+    """
+    Функция фильтрует записи по дате публикации (в часовом поясе сайта).
+    Список id постов за день кэшируется и инвалидируется только при изменении постов месяца его публикации
+    """
+    post_ids = caching.get_cached_objects_or_queryset(KEY_DATE_POSTS, day=date)
+    if not post_ids:
         raise NoContent(_('Посты с датой "{date}" не найдены').format(date=date))
-    return post_list
+    return SearchResult(post_ids, object_list)
 
 
-def search_by_q(q: str, object_list: QuerySet, current_language: str) -> QuerySet | NoContent:
+class SearchResult(Sequence):
+    """
+    Результаты поиска постов для пагинации.
+
+    Хранит ранжированный список id постов, а сами посты загружает только для запрошенного среза
+    (одним запросом к object_list с сохранением порядка релевантности).
+    Для курсорной пагинации order_by() возвращает QuerySet с найденными постами
+    """
+
+    def __init__(self, post_ids: list[int], object_list: QuerySet) -> None:
+        self.post_ids = post_ids
+        self.object_list = object_list
+
+    def __len__(self) -> int:
+        return len(self.post_ids)
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            post_ids = self.post_ids[index]
+            posts = {post.id: post for post in self.object_list.filter(id__in=post_ids)}
+            return [posts[post_id] for post_id in post_ids if post_id in posts]
+        return self.object_list.get(id=self.post_ids[index])
+
+    def __iter__(self) -> Iterator:
+        return iter(self[:])
+
+    def order_by(self, *field_names: str) -> QuerySet:
+        return self.object_list.filter(id__in=self.post_ids).order_by(*field_names)
+
+
+def normalize_search_query(q: str) -> str:
+    """Приведение поискового запроса к единому виду (нижний регистр, одиночные пробелы)"""
+    return ' '.join(q.lower().split())
+
+
+def search_by_q(q: str, object_list: QuerySet, current_language: str, mode: str | None = None) -> SearchResult:
     """
     Поиск по названию и содержанию в зависимости от выбранного языка,
-    сортировка результатов поиска с использованием специальных классов для PostgreSQL
+    сортировка результатов поиска с использованием специальных классов для PostgreSQL.
+
+    В режиме "fuzzy", если полнотекстовый поиск ничего не нашёл (например, из-за опечатки в запросе),
+    выполняется нечёткий поиск по сходству триграмм в заголовках и тегах постов.
+
+    Ранжированный список id найденных постов кэшируется по нормализованному запросу и языку
+    и инвалидируется при изменении постов, поэтому повторные запросы и следующие страницы результатов
+    не выполняют полнотекстовый поиск заново
     """
 
     if current_language == LANGUAGES[0][0]:  # наличие русского языка в запросе
-        search_vector = SearchVector('title_ru', 'body_ru')
+        language = LANGUAGES[0][0]
     else:
-        search_vector = SearchVector('title_en', 'body_en')
-
-    search_query = SearchQuery(q)
+        language = LANGUAGES[1][0]
 
-    post_list = (
-        object_list.annotate(search=search_vector, rank=SearchRank(search_vector, search_query))
-        .filter(search=search_query)
-        .order_by('-rank')
-    )
+    normalized_q = normalize_search_query(q)
+    post_ids = caching.get_cached_objects_or_queryset(KEY_SEARCH_POSTS, q=normalized_q, language=language)
+    if not post_ids and mode == 'fuzzy':
+        post_ids = caching.get_cached_objects_or_queryset(KEY_FUZZY_SEARCH_POSTS, q=normalized_q, language=language)
 
-    if not post_list.exists():
+    if not post_ids:
         raise NoContent(_('Посты по запросу "{q}" не найдены').format(q=q))
-    return post_list
+    return SearchResult(post_ids, object_list)
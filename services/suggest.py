@@ -0,0 +1,192 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import NamedTuple
+
+from blog.models import Post
+from blog_by_me_DRF.settings import KEY_SUGGEST_POSTS, LANGUAGES, SUGGEST_POSTS_LIMIT
+from services.caching import NAMESPACE_POST_TITLES, get_cache_version
+from services.queryset import qs_definition
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _split_words(text: str) -> list[str]:
+    """Разбиение текста на слова в нижнем регистре (буква "ё" приводится к "е")"""
+    return _WORD_RE.findall(text.lower().replace('ё', 'е'))
+
+
+def _starts_with(title_words: list[str], words: list[str]) -> bool:
+    """Начинается ли заголовок со слов запроса (последнее слово запроса может быть введено не полностью)"""
+    if len(title_words) < len(words):
+        return False
+    return title_words[: len(words) - 1] == words[:-1] and title_words[len(words) - 1].startswith(words[-1])
+
+
+class _Entry(NamedTuple):
+    """Заголовки и данные поста, необходимые для вывода подсказки"""
+
+    url: str
+    publish: float  # время публикации (timestamp)
+    titles: dict[str, str]  # заголовки поста по языкам
+    words: dict[str, list[str]]  # слова заголовков поста по языкам
+
+    @classmethod
+    def from_values(cls, url: str, publish, title_ru: str | None, title_en: str | None) -> '_Entry':
+        # Если перевод заголовка отсутствует, используется заголовок на языке по умолчанию
+        default_title = title_ru or ''
+        titles = {'ru': default_title, 'en': title_en or default_title}
+        words = {language: _split_words(title) for language, title in titles.items()}
+        return cls(url, publish.timestamp(), titles, words)
+
+
+class _State(NamedTuple):
+    """Неизменяемый снимок индекса (заменяется целиком, поэтому чтение не требует блокировки)"""
+
+    version: int  # версия пространства имён индекса подсказок, которой соответствует индекс
+    entries: dict[int, _Entry]
+    words: dict[str, list[str]]  # отсортированные слова заголовков по языкам (для поиска по префиксу)
+    post_ids: dict[str, dict[str, frozenset[int]]]  # id постов, в заголовках которых есть слово, по языкам
+
+
+class PostTitleIndex:
+    """
+    Префиксный индекс заголовков постов в памяти процесса для подсказок при поиске по мере ввода.
+
+    Индекс строится одним запросом к БД при первом обращении и обновляется:
+    - точечно обработчиками сигналов изменения и удаления постов (update_post(), remove_post());
+    - полностью, если версия пространства имён индекса подсказок в кэше изменилась не только этим процессом
+      (изменения постов, выполненные другими процессами).
+    Версия пространства индекса увеличивается только при изменении и удалении постов, поэтому комментарии,
+    оценки и изменения тегов и категорий не приводят к перестроению индекса
+    При поиске подсказок выполняется только чтение версии из кэша, запросы к БД не выполняются
+    """
+
+    def __init__(self) -> None:
+        self._state: _State | None = None
+        self._lock = threading.Lock()
+
+    def suggest(self, q: str, language: str, limit: int = SUGGEST_POSTS_LIMIT) -> list[dict[str, str]]:
+        """
+        Подсказки заголовков опубликованных постов, слова которых начинаются со слов запроса.
+
+        Сначала выводятся посты, заголовок которых начинается с запроса, затем более новые посты
+        """
+        words = _split_words(q)
+        if not words:
+            return []
+
+        state = self._get_actual_state()
+
+        post_ids = None
+        for word in words:
+            found_ids = self._find_by_prefix(state, language, word)
+            post_ids = found_ids if post_ids is None else post_ids & found_ids
+            if not post_ids:
+                return []
+
+        now = time.time()
+        entries = ((post_id, state.entries[post_id]) for post_id in post_ids)
+        best_entries = heapq.nsmallest(
+            limit,
+            ((post_id, entry) for post_id, entry in entries if entry.publish <= now),
+            key=lambda item: (not _starts_with(item[1].words[language], words), -item[1].publish, -item[0]),
+        )
+        return [{'title': entry.titles[language], 'url': entry.url} for _, entry in best_entries]
+
+    def update_post(self, post_id: int, entry: _Entry | None) -> None:
+        """
+        Точечное изменение индекса после фиксации изменения поста (entry=None - удаление поста из индекса).
+
+        Если после изменения версия пространства индекса увеличилась ровно на единицу (только изменением этого поста),
+        индекс считается актуальным, иначе он будет полностью перестроен при следующем обращении
+        """
+        with self._lock:
+            state = self._state
+            if state is None:
+                return
+
+            entries = dict(state.entries)
+            old_entry = entries.pop(post_id, None)
+            if entry is not None:
+                entries[post_id] = entry
+
+            words, post_ids = {}, {}
+            for language in state.words:
+                words[language], post_ids[language] = list(state.words[language]), dict(state.post_ids[language])
+                old_words = set(old_entry.words[language]) if old_entry else set()
+                new_words = set(entry.words[language]) if entry else set()
+
+                for word in old_words - new_words:
+                    post_ids[language][word] = post_ids[language][word] - {post_id}
+                    if not post_ids[language][word]:
+                        del post_ids[language][word]
+                        del words[language][bisect.bisect_left(words[language], word)]
+                for word in new_words - old_words:
+                    if word not in post_ids[language]:
+                        bisect.insort(words[language], word)
+                    post_ids[language][word] = post_ids[language].get(word, frozenset()) | {post_id}
+
+            version = get_cache_version(NAMESPACE_POST_TITLES)
+            self._state = _State(version if version == state.version + 1 else state.version, entries, words, post_ids)
+
+    def remove_post(self, post_id: int) -> None:
+        """Удаление поста из индекса после фиксации удаления"""
+        self.update_post(post_id, None)
+
+    def _get_actual_state(self) -> _State:
+        """Снимок индекса, соответствующий текущей версии его пространства имён (перестраивается при её изменении)"""
+        version = get_cache_version(NAMESPACE_POST_TITLES)
+        state = self._state
+        if state is None or state.version != version:
+            with self._lock:
+                state = self._state
+                if state is None or state.version != version:
+                    state = self._state = self._build(version)
+        return state
+
+    @staticmethod
+    def _build(version: int) -> _State:
+        """Построение индекса по заголовкам всех не черновых постов"""
+        entries = {post.pop('id'): _Entry.from_values(**post) for post in qs_definition(KEY_SUGGEST_POSTS)}
+
+        words, post_ids = {}, {}
+        for language, _ in LANGUAGES:
+            language_post_ids = defaultdict(set)
+            for post_id, entry in entries.items():
+                for word in entry.words[language]:
+                    language_post_ids[word].add(post_id)
+            post_ids[language] = {word: frozenset(ids) for word, ids in language_post_ids.items()}
+            words[language] = sorted(post_ids[language])
+        return _State(version, entries, words, post_ids)
+
+    @staticmethod
+    def _find_by_prefix(state: _State, language: str, prefix: str) -> set[int]:
+        """id постов, в заголовках которых есть слово, начинающееся с prefix (бинарный поиск по списку слов)"""
+        words = state.words[language]
+        post_ids = set()
+        for position in range(bisect.bisect_left(words, prefix), len(words)):
+            if not words[position].startswith(prefix):
+                break
+            post_ids.update(state.post_ids[language][words[position]])
+        return post_ids
+
+
+# Индекс заголовков постов текущего процесса
+post_title_index = PostTitleIndex()
+
+
+def get_post_entry(post: Post) -> _Entry | None:
+    """Данные поста для индекса подсказок (None для черновиков, которые в подсказки не попадают)"""
+    if post.draft:
+        return None
+    return _Entry.from_values(post.url, post.publish, post.title_ru, post.title_en)
+
+
+def suggest_titles(q: str, current_language: str) -> list[dict[str, str]]:
+    """Подсказки заголовков постов на текущем языке для поиска по мере ввода"""
+    language = LANGUAGES[0][0] if current_language == LANGUAGES[0][0] else LANGUAGES[1][0]
+    return post_title_index.suggest(q, language)
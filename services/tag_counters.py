@@ -0,0 +1,68 @@
+from collections import Counter
+from collections.abc import Iterable
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count
+from taggit.models import Tag
+
+from blog.models import Post, TagCounter
+from services.caching import NAMESPACE_TAGS, bump_cache_version
+
+
+def _count_posts(tag_ids: list[int]) -> Counter:
+    """
+    Количество не черновых постов с тегами: всего (ключ (id тега, None)) и по категориям (ключ (id тега, id категории)).
+    Выполняется одним запросом с группировкой по тегу и категории
+    """
+    counts = Counter()
+    rows = (
+        Post.objects.filter(draft=False, tags__id__in=tag_ids)
+        .values_list('tags__id', 'category_id')
+        .annotate(posts_count=Count('id'))
+        .order_by()
+    )
+    for tag_id, category_id, posts_count in rows:
+        counts[tag_id, None] += posts_count
+        if category_id is not None:
+            counts[tag_id, category_id] += posts_count
+    return counts
+
+
+def refresh_tag_counters(tag_ids: Iterable[int]) -> None:
+    """
+    Пересчёт счётчиков заданных тегов (всего и по категориям) по зафиксированным данным.
+
+    Счётчики учитывают не черновые посты, включая отложенные: отложенные посты вычитаются при выводе популярных тегов
+    (см. queryset._qs_top_tags()), поэтому в момент публикации поста пересчёт не требуется.
+    Строки тегов блокируются до конца транзакции, поэтому одновременные пересчёты одного тега выполняются по очереди
+    """
+    tag_ids = set(tag_ids)
+    if not tag_ids:
+        return
+
+    with transaction.atomic():
+        tags = Tag.objects.select_for_update().filter(id__in=tag_ids).order_by('id')
+        tag_ids = list(tags.values_list('id', flat=True))
+        counts = _count_posts(tag_ids)
+        TagCounter.objects.filter(tag_id__in=tag_ids).delete()
+        TagCounter.objects.bulk_create(
+            TagCounter(tag_id=tag_id, category_id=category_id, posts_count=posts_count)
+            for (tag_id, category_id), posts_count in counts.items()
+        )
+        # Популярные теги, сохранённые в кэше до пересчёта, становятся недоступными
+        bump_cache_version(NAMESPACE_TAGS)
+
+
+def refresh_tag_counters_on_commit(tag_ids: Iterable[int]) -> None:
+    """Пересчёт счётчиков заданных тегов после фиксации текущей транзакции (см. refresh_tag_counters())"""
+    tag_ids = tuple(tag_ids)
+    if tag_ids:
+        transaction.on_commit(partial(refresh_tag_counters, tag_ids))
+
+
+def rebuild_tag_counters() -> int:
+    """Пересчёт счётчиков всех тегов. Возвращает количество тегов"""
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+    refresh_tag_counters(tag_ids)
+    return len(tag_ids)
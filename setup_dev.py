@@ -13,7 +13,6 @@ ARCHIVE_NAME = "media.tar.gz"
 UNPACK_DIR = "./media"
 VARIABLES_WITH_RANDOM_VALUES = (
     'CACHE_KEY',
-    'KEY_SIMPLE_POSTS_LIST',
     'KEY_POSTS_LIST',
     'KEY_POST_DETAIL',
     'KEY_CATEGORIES_LIST',
@@ -21,14 +20,20 @@ VARIABLES_WITH_RANDOM_VALUES = (
     'KEY_ABOUT',
     'KEY_AUTHORS_LIST',
     'KEY_AUTHOR_DETAIL',
-    'KEY_AUTHOR_DETAIL_STRICT',
     'KEY_TOP_POSTS',
     'KEY_LAST_POSTS',
     'KEY_ALL_TAGS',
     'KEY_RATING_DETAIL',
-    'KEY_MARK_DETAIL',
     'KEY_POSTS_CALENDAR',
+    'KEY_POSTS_CALENDAR_YEAR',
+    'KEY_DATE_POSTS',
     'KEY_COMMENTS_LIST',
+    'KEY_COMMENT_REPLIES',
+    'KEY_SCHEDULED_POSTS',
+    'KEY_SEARCH_POSTS',
+    'KEY_FUZZY_SEARCH_POSTS',
+    'KEY_SUGGEST_POSTS',
+    'KEY_POST_FILTERS',
 )
 DATABASE_NAME = 'blog_by_me_DRF'
 VARIABLES_WITH_SET_VALUES = (
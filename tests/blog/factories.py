@@ -2,7 +2,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from factory import Sequence, SubFactory
 from factory.django import DjangoModelFactory
 
-from blog.models import Category, Mark, Post, Rating, Video
+from blog.models import Category, Comment, Mark, Post, Rating, Video
 from blog_by_me_DRF.settings import TITLE_LIKE_MARK
 from tests.users.factories import UserFactory
 
@@ -52,3 +52,13 @@ class RatingFactory(DjangoModelFactory):
     ip = '127.0.0.1'
     mark = SubFactory(MarkFactory)
     post = SubFactory(PostFactory)
+
+
+class CommentFactory(DjangoModelFactory):
+    class Meta:
+        model = Comment
+
+    post = SubFactory(PostFactory)
+    name = 'Читатель'
+    email = 'reader@example.com'
+    text = 'Интересный пост'
@@ -1,5 +1,6 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import FileExtensionValidator
 from django.db import models
 from django.utils import timezone
@@ -281,6 +282,31 @@ class PostModelTest:
         expected_verbose_name = 'Черновик'
         assert fact_verbose_name == expected_verbose_name
 
+    def test_comments_count_default(self):
+        fact_default = Post._meta.get_field('comments_count').default
+        expected_default = 0
+        assert fact_default == expected_default
+
+    def test_comments_count_not_editable(self):
+        fact_editable = Post._meta.get_field('comments_count').editable
+        expected_editable = False
+        assert fact_editable is expected_editable
+
+    def test_comments_count_verbose_name(self):
+        fact_verbose_name = Post._meta.get_field('comments_count').verbose_name
+        expected_verbose_name = 'Количество комментариев'
+        assert fact_verbose_name == expected_verbose_name
+
+    def test_score_default(self):
+        fact_default = Post._meta.get_field('score').default
+        expected_default = 0
+        assert fact_default == expected_default
+
+    def test_score_verbose_name(self):
+        fact_verbose_name = Post._meta.get_field('score').verbose_name
+        expected_verbose_name = 'Рейтинг поста'
+        assert fact_verbose_name == expected_verbose_name
+
     @pytest.mark.django_db
     def test_object_name_is_title(self, post):
         fact_object_name = str(post)
@@ -301,6 +327,11 @@ class PostModelTest:
         fact_indexes = Post._meta.indexes
         expected_indexes = [
             models.Index(fields=('-publish', '-id'), name='publish_id_idx'),
+            models.Index(fields=('-score', '-id'), name='score_id_idx'),
+            GinIndex(fields=('search_vector_ru',), name='search_vector_ru_idx'),
+            GinIndex(fields=('search_vector_en',), name='search_vector_en_idx'),
+            GinIndex(fields=('title_ru',), opclasses=('gin_trgm_ops',), name='title_ru_trgm_idx'),
+            GinIndex(fields=('title_en',), opclasses=('gin_trgm_ops',), name='title_en_trgm_idx'),
         ]
         assert fact_indexes == expected_indexes
 
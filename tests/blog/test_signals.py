@@ -0,0 +1,159 @@
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+
+from blog.models import Post, TagCounter
+from services import tag_counters
+from tests.blog.factories import CategoryFactory, CommentFactory, PostFactory, RatingFactory
+
+pytestmark = pytest.mark.django_db
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@pytest.fixture
+def locmem_cache():
+    with override_settings(CACHES=LOCMEM_CACHES):
+        cache.clear()
+        yield
+        cache.clear()
+
+
+@pytest.fixture
+def tagged_post(locmem_cache, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        post = PostFactory()
+        post.tags.add('fishing')
+    return post
+
+
+def _get_tag_counts(slug):
+    return dict(TagCounter.objects.filter(tag__slug=slug).values_list('category_id', 'posts_count'))
+
+
+def _get_comments_count(post):
+    return Post.objects.values_list('comments_count', flat=True).get(id=post.id)
+
+
+class CommentsCountSignalsTest:
+    """Тестирование обновления количества комментариев поста обработчиками сигналов модели Comment"""
+
+    def test_comment_created(self, post):
+        CommentFactory.create_batch(2, post=post)
+        assert _get_comments_count(post) == 2
+
+    def test_inactive_comment_created(self, post):
+        CommentFactory(post=post, active=False)
+        assert _get_comments_count(post) == 0
+
+    def test_comment_deactivated_and_activated(self, post):
+        comment = CommentFactory(post=post)
+        comment.active = False
+        comment.save()
+        assert _get_comments_count(post) == 0
+        comment.active = True
+        comment.save()
+        assert _get_comments_count(post) == 1
+
+    def test_comment_resaved(self, post):
+        comment = CommentFactory(post=post)
+        comment.text = 'Изменённый комментарий'
+        comment.save()
+        assert _get_comments_count(post) == 1
+
+    def test_comment_moved_to_other_post(self, post):
+        other_post = PostFactory()
+        comment = CommentFactory(post=post)
+        comment.post = other_post
+        comment.save()
+        assert _get_comments_count(post) == 0
+        assert _get_comments_count(other_post) == 1
+
+    def test_comment_deleted(self, post):
+        comment = CommentFactory(post=post)
+        CommentFactory(post=post, active=False).delete()
+        assert _get_comments_count(post) == 1
+        comment.delete()
+        assert _get_comments_count(post) == 0
+
+
+class UpdatePostCountersCommandTest:
+    """Тестирование команды update_post_counters"""
+
+    def test_comments_count_recalculated(self, post):
+        CommentFactory.create_batch(2, post=post)
+        CommentFactory(post=post, active=False)
+        empty_post = PostFactory()
+        Post.objects.update(comments_count=10)
+
+        call_command('update_post_counters', stdout=StringIO())
+
+        assert _get_comments_count(post) == 2
+        assert _get_comments_count(empty_post) == 0
+
+    def test_score_recalculated(self, post, marks):
+        RatingFactory(ip='127.0.0.1', mark=marks['Лайк'], post=post)
+        RatingFactory(ip='127.0.0.2', mark=marks['Лайк'], post=post)
+        RatingFactory(ip='127.0.0.3', mark=marks['Дизлайк'], post=post)
+        Post.objects.update(score=10)
+
+        call_command('update_post_counters', stdout=StringIO())
+
+        post.refresh_from_db(fields=('score',))
+        assert post.score == 1
+
+
+class TagCountersSignalsTest:
+    """Тестирование счётчиков количества постов по тегам, пересчитываемых обработчиками сигналов"""
+
+    def test_post_tagged_and_untagged(self, tagged_post, django_capture_on_commit_callbacks):
+        assert _get_tag_counts('fishing') == {None: 1, tagged_post.category_id: 1}
+        with django_capture_on_commit_callbacks(execute=True):
+            other_post = PostFactory(category=tagged_post.category)
+            other_post.tags.add('fishing')
+        assert _get_tag_counts('fishing') == {None: 2, tagged_post.category_id: 2}
+        with django_capture_on_commit_callbacks(execute=True):
+            tagged_post.tags.remove('fishing')
+        assert _get_tag_counts('fishing') == {None: 1, tagged_post.category_id: 1}
+
+    def test_draft_post_tagged(self, locmem_cache, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            PostFactory(draft=True).tags.add('fishing')
+        assert _get_tag_counts('fishing') == {}
+
+    def test_post_unpublished_and_published(self, tagged_post, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            tagged_post.draft = True
+            tagged_post.save()
+        assert _get_tag_counts('fishing') == {}
+        with django_capture_on_commit_callbacks(execute=True):
+            tagged_post.draft = False
+            tagged_post.save()
+        assert _get_tag_counts('fishing') == {None: 1, tagged_post.category_id: 1}
+
+    def test_post_moved_to_other_category(self, tagged_post, django_capture_on_commit_callbacks):
+        category = CategoryFactory()
+        with django_capture_on_commit_callbacks(execute=True):
+            tagged_post.category = category
+            tagged_post.save()
+        assert _get_tag_counts('fishing') == {None: 1, category.id: 1}
+
+    def test_post_resaved(self, tagged_post, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            tagged_post.title = 'Новый заголовок'
+            tagged_post.save()
+        assert all(getattr(callback, 'func', None) is not tag_counters.refresh_tag_counters for callback in callbacks)
+        assert _get_tag_counts('fishing') == {None: 1, tagged_post.category_id: 1}
+
+    def test_post_deleted(self, tagged_post, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            tagged_post.delete()
+        assert _get_tag_counts('fishing') == {}
+
+    def test_counters_recalculated_by_command(self, tagged_post):
+        TagCounter.objects.all().delete()
+        call_command('update_post_counters', stdout=StringIO())
+        assert _get_tag_counts('fishing') == {None: 1, tagged_post.category_id: 1}
@@ -1,7 +1,7 @@
 from factory import Faker
 from factory.django import DjangoModelFactory
 
-from company.models import About
+from company.models import About, Contact
 
 
 class AboutFactory(DjangoModelFactory):
@@ -15,3 +15,13 @@ class AboutFactory(DjangoModelFactory):
     address = 'Адрес компании'
     latitude = '51.532065'
     longitude = '46.032558'
+
+
+class ContactFactory(DjangoModelFactory):
+    class Meta:
+        model = Contact
+
+    name = 'Пользователь'
+    email = Faker('email')
+    phone = '+79999999999'
+    message = 'Сообщение администрации'
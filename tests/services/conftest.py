@@ -0,0 +1,10 @@
+import pytest
+from django.core.management import call_command
+
+from blog.models import Mark
+
+
+@pytest.fixture
+def marks():
+    call_command('create_mark_models')
+    return {'Лайк': Mark.objects.get(nomination='Лайк'), 'Дизлайк': Mark.objects.get(nomination='Дизлайк')}
@@ -0,0 +1,396 @@
+import time
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.http import Http404
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from blog_by_me_DRF.settings import KEY_AUTHOR_DETAIL, KEY_POST_DETAIL, KEY_POSTS_CALENDAR, KEY_POSTS_LIST
+from services import caching
+from tests.blog.factories import CommentFactory, PostFactory
+
+pytestmark = pytest.mark.django_db
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache():
+    with override_settings(CACHES=LOCMEM_CACHES):
+        cache.clear()
+        yield
+        cache.clear()
+
+
+@pytest.fixture
+def on_commit(django_capture_on_commit_callbacks):
+    """Выполнение обработчиков фиксации транзакции (в них увеличиваются версии пространств имён)"""
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+class GetNamespacesTest:
+    """Тестирование функции _get_namespaces()"""
+
+    def test_posts_list(self):
+        fact_namespaces = caching._get_namespaces(KEY_POSTS_LIST)
+        expected_namespaces = (caching.NAMESPACE_POSTS,)
+        assert fact_namespaces == expected_namespaces
+
+    def test_post_detail(self):
+        fact_namespaces = caching._get_namespaces(KEY_POST_DETAIL, slug='post-slug')
+        expected_namespaces = (caching.NAMESPACE_POSTS, 'post:post-slug')
+        assert fact_namespaces == expected_namespaces
+
+    def test_author_detail(self):
+        fact_namespaces = caching._get_namespaces(KEY_AUTHOR_DETAIL, pk=1)
+        expected_namespaces = (caching.NAMESPACE_POSTS, 'author:1')
+        assert fact_namespaces == expected_namespaces
+
+    def test_posts_calendar(self):
+        fact_namespaces = caching._get_namespaces(KEY_POSTS_CALENDAR, year=2024, month=5)
+        expected_namespaces = ('calendar:2024/5',)
+        assert fact_namespaces == expected_namespaces
+
+    def test_unknown_key(self):
+        assert caching._get_namespaces('unknown_key') == ()
+
+
+class BumpCacheVersionTest:
+    """Тестирование функции bump_cache_version()"""
+
+    def test_bump_existing_version(self, on_commit):
+        version_before = caching._get_versions((caching.NAMESPACE_POSTS,))[0]
+        with on_commit():
+            caching.bump_cache_version(caching.NAMESPACE_POSTS)
+        version_after = caching._get_versions((caching.NAMESPACE_POSTS,))[0]
+        assert version_after == version_before + 1
+
+    def test_bump_missing_version(self, on_commit):
+        with on_commit():
+            caching.bump_cache_version(caching.NAMESPACE_TAGS)
+        assert cache.get(caching._get_version_key(caching.NAMESPACE_TAGS)) is not None
+
+    def test_bump_does_not_affect_other_namespaces(self, on_commit):
+        version_before = caching._get_versions((caching.NAMESPACE_VIDEOS,))[0]
+        with on_commit():
+            caching.bump_cache_version(caching.NAMESPACE_POSTS)
+        version_after = caching._get_versions((caching.NAMESPACE_VIDEOS,))[0]
+        assert version_after == version_before
+
+    def test_bump_deferred_until_commit(self, django_capture_on_commit_callbacks):
+        version_before = caching._get_versions((caching.NAMESPACE_POSTS,))[0]
+        with django_capture_on_commit_callbacks() as callbacks:
+            caching.bump_cache_version(caching.NAMESPACE_POSTS)
+        fact_version = caching._get_versions((caching.NAMESPACE_POSTS,))[0]
+        assert fact_version == version_before
+        assert len(callbacks) == 1
+
+
+@mock.patch('services.caching._get_publish_epoch', mock.Mock(return_value=0))
+class GetCachedObjectsOrQuerysetTest:
+    """Тестирование функции get_cached_objects_or_queryset()"""
+
+    @mock.patch('services.caching.qs_definition')
+    def test_cache_hit(self, mock_qs_definition):
+        mock_qs_definition.return_value = ['post']
+        caching.get_cached_objects_or_queryset(KEY_POSTS_LIST)
+        caching.get_cached_objects_or_queryset(KEY_POSTS_LIST)
+        mock_qs_definition.assert_called_once_with(KEY_POSTS_LIST)
+
+    @mock.patch('services.caching.qs_definition')
+    def test_cache_invalidated_after_bump(self, mock_qs_definition, on_commit):
+        mock_qs_definition.return_value = ['post']
+        caching.get_cached_objects_or_queryset(KEY_POSTS_LIST)
+        with on_commit():
+            caching.bump_cache_version(caching.NAMESPACE_POSTS)
+        caching.get_cached_objects_or_queryset(KEY_POSTS_LIST)
+        assert mock_qs_definition.call_count == 2
+
+    @mock.patch('services.caching.qs_definition')
+    def test_cache_not_invalidated_after_bump_other_post(self, mock_qs_definition, on_commit):
+        mock_qs_definition.return_value = 'post'
+        caching.get_cached_objects_or_queryset(KEY_POST_DETAIL, slug='first')
+        with on_commit():
+            caching.bump_cache_version(caching.make_namespace(caching.NAMESPACE_POST, 'second'))
+        caching.get_cached_objects_or_queryset(KEY_POST_DETAIL, slug='first')
+        mock_qs_definition.assert_called_once_with(KEY_POST_DETAIL, slug='first')
+
+    @mock.patch('services.caching.qs_definition')
+    def test_cache_invalidated_after_post_save(self, mock_qs_definition, on_commit):
+        mock_qs_definition.return_value = ['post']
+        caching.get_cached_objects_or_queryset(KEY_POSTS_LIST)
+        with on_commit():
+            PostFactory()
+        caching.get_cached_objects_or_queryset(KEY_POSTS_LIST)
+        assert mock_qs_definition.call_count == 2
+
+    @mock.patch('services.caching.qs_definition')
+    def test_calendar_invalidated_after_post_moved(self, mock_qs_definition, on_commit):
+        mock_qs_definition.return_value = ['day']
+        post = PostFactory()
+        old_publish = timezone.localtime(post.publish)
+        caching.get_cached_objects_or_queryset(KEY_POSTS_CALENDAR, year=old_publish.year, month=old_publish.month)
+        post.publish = old_publish.replace(year=old_publish.year + 1)
+        with on_commit():
+            post.save()
+        caching.get_cached_objects_or_queryset(KEY_POSTS_CALENDAR, year=old_publish.year, month=old_publish.month)
+        assert mock_qs_definition.call_count == 2
+
+
+class ScheduledPublishTest:
+    """Тестирование учёта отложенной публикации постов в ключах кэша"""
+
+    def test_publish_epoch_without_scheduled_posts(self):
+        PostFactory()
+        assert caching._get_publish_epoch() == 0
+
+    def test_publish_epoch_is_nearest_publish_time(self):
+        publish = timezone.now() + timedelta(hours=1)
+        PostFactory(publish=publish + timedelta(hours=1))
+        PostFactory(publish=publish)
+        assert caching._get_publish_epoch() == int(publish.timestamp())
+
+    def test_publish_epoch_changes_at_publish_time(self):
+        publish = timezone.now() + timedelta(hours=1)
+        PostFactory(publish=publish)
+        caching._get_publish_epoch()
+        with mock.patch('services.caching.time.time', return_value=publish.timestamp() + 1):
+            assert caching._get_publish_epoch() == 0
+
+    def test_scheduled_post_appears_at_publish_time(self, on_commit):
+        publish = timezone.now() + timedelta(hours=1)
+        with on_commit():
+            post = PostFactory(publish=publish)
+        assert list(caching.get_cached_objects_or_queryset(KEY_POSTS_LIST)) == []
+
+        with (
+            mock.patch('services.caching.time.time', return_value=publish.timestamp() + 1),
+            mock.patch('services.queryset.timezone.now', return_value=publish + timedelta(seconds=1)),
+        ):
+            fact_posts = list(caching.get_cached_objects_or_queryset(KEY_POSTS_LIST))
+        assert fact_posts == [post]
+
+
+@mock.patch('services.caching._get_publish_epoch', mock.Mock(return_value=0))
+class StampedeProtectionTest:
+    """Тестирование защиты от одновременного перестроения кэша в get_cached_objects_or_queryset()"""
+
+    def _get_cache_key(self):
+        return f'{caching.settings.CACHE_KEY}{KEY_POSTS_LIST}:{caching._get_key_versions(KEY_POSTS_LIST)}'
+
+    def test_should_refresh_expired_entry(self):
+        entry = caching._CacheEntry(['post'], time.time() - 1, 0.0)
+        assert caching._should_refresh(entry) is True
+
+    def test_should_not_refresh_fresh_entry(self):
+        entry = caching._CacheEntry(['post'], time.time() + 300, 0.0)
+        assert caching._should_refresh(entry) is False
+
+    @mock.patch('services.caching.qs_definition')
+    def test_stale_value_served_while_locked(self, mock_qs_definition):
+        cache_key = self._get_cache_key()
+        cache.set(cache_key, caching._CacheEntry(['stale'], time.time() - 1, 0.0))
+        cache.add(f'{cache_key}:lock', 1)
+
+        fact_value = caching.get_cached_objects_or_queryset(KEY_POSTS_LIST)
+        assert fact_value == ['stale']
+        mock_qs_definition.assert_not_called()
+
+    @mock.patch('services.caching.qs_definition')
+    def test_expired_value_rebuilt_without_lock(self, mock_qs_definition):
+        mock_qs_definition.return_value = ['fresh']
+        cache_key = self._get_cache_key()
+        cache.set(cache_key, caching._CacheEntry(['stale'], time.time() - 1, 0.0))
+
+        fact_value = caching.get_cached_objects_or_queryset(KEY_POSTS_LIST)
+        assert fact_value == ['fresh']
+        assert cache.get(f'{cache_key}:lock') is None
+
+    @mock.patch('services.caching.settings.CACHE_REBUILD_WAIT_TIME', 0)
+    @mock.patch('services.caching.qs_definition')
+    def test_rebuild_after_waiting_for_other_process(self, mock_qs_definition):
+        mock_qs_definition.return_value = ['fresh']
+        cache.add(f'{self._get_cache_key()}:lock', 1)
+
+        fact_value = caching.get_cached_objects_or_queryset(KEY_POSTS_LIST)
+        assert fact_value == ['fresh']
+
+
+class NegativeCachingTest:
+    """Тестирование кэширования пустых результатов и отсутствующих объектов в get_cached_objects_or_queryset()"""
+
+    def test_not_found_cached(self, django_assert_num_queries):
+        with pytest.raises(Http404):
+            caching.get_cached_objects_or_queryset(KEY_POST_DETAIL, slug='not-exist')
+        with django_assert_num_queries(0), pytest.raises(Http404):
+            caching.get_cached_objects_or_queryset(KEY_POST_DETAIL, slug='not-exist')
+
+    def test_not_found_invalidated_after_post_created(self, on_commit):
+        with pytest.raises(Http404):
+            caching.get_cached_objects_or_queryset(KEY_POST_DETAIL, slug='new-post')
+        with on_commit():
+            post = PostFactory(url='new-post')
+        fact_post = caching.get_cached_objects_or_queryset(KEY_POST_DETAIL, slug='new-post')
+        assert fact_post == post
+
+    def test_empty_result_cached(self, django_assert_num_queries):
+        caching.get_cached_objects_or_queryset(KEY_POSTS_CALENDAR, year=2000, month=1)
+        with django_assert_num_queries(0):
+            fact_days = caching.get_cached_objects_or_queryset(KEY_POSTS_CALENDAR, year=2000, month=1)
+        assert list(fact_days) == []
+
+    @mock.patch('services.caching.cache.set')
+    def test_empty_result_cache_time(self, mock_cache_set):
+        caching.get_cached_objects_or_queryset(KEY_POSTS_CALENDAR, year=2000, month=1)
+        fact_cache_time = mock_cache_set.call_args.args[2]
+        expected_cache_time = caching.settings.CACHE_NEGATIVE_TIME + caching.settings.CACHE_STALE_TIME
+        assert fact_cache_time == expected_cache_time
+
+
+class CachedResponseMixinTest:
+    """Тестирование миксина CachedResponseMixin"""
+
+    def test_response_cached(self, django_assert_num_queries):
+        PostFactory()
+        first_response = APIClient().get('/api/v1/categories/')
+        with django_assert_num_queries(0):
+            second_response = APIClient().get('/api/v1/categories/')
+        assert second_response.status_code == 200
+        assert second_response.content == first_response.content
+        assert second_response['Content-Type'] == 'application/json'
+
+    def test_response_cache_depends_on_query_params(self):
+        PostFactory.create_batch(2)
+        first_page = APIClient().get('/api/v1/posts/', {'pagination': 'page', 'page_size': 1})
+        second_page = APIClient().get('/api/v1/posts/', {'pagination': 'page', 'page_size': 1, 'page': 2})
+        assert first_page.content != second_page.content
+
+    @override_settings(ALLOWED_HOSTS=['first.example', 'second.example'])
+    def test_response_cache_depends_on_host_and_scheme(self):
+        PostFactory.create_batch(2)
+        APIClient().get('/api/v1/posts/', {'page_size': 1}, HTTP_HOST='first.example')
+        other_host = APIClient().get('/api/v1/posts/', {'page_size': 1}, HTTP_HOST='second.example').json()
+        secure = APIClient().get('/api/v1/posts/', {'page_size': 1}, HTTP_HOST='second.example', secure=True).json()
+        assert other_host['next'].startswith('http://second.example/')
+        assert secure['next'].startswith('https://second.example/')
+
+    def test_response_cache_invalidated_after_post_save(self, on_commit):
+        post = PostFactory()
+        APIClient().get(f'/api/v1/posts/{post.url}/')
+        post.title = 'Новый заголовок'
+        with on_commit():
+            post.save()
+        response = APIClient().get(f'/api/v1/posts/{post.url}/')
+        assert response.json()['title'] == 'Новый заголовок'
+
+    def test_comments_cache_invalidated_after_comment_create(self, on_commit):
+        post = PostFactory()
+        APIClient().get('/api/v1/comments/', {'post_id': post.id})
+        with on_commit():
+            CommentFactory(post=post)
+        response = APIClient().get('/api/v1/comments/', {'post_id': post.id})
+        assert len(response.json()['results']) == 1
+
+    def test_browsable_api_not_cached(self):
+        PostFactory()
+        APIClient().get('/api/v1/categories/', HTTP_ACCEPT='text/html')
+        response = APIClient().get('/api/v1/categories/', HTTP_ACCEPT='text/html')
+        assert hasattr(response, 'data')
+
+
+def _local_datetime(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class CalendarYearTest:
+    """Тестирование битовых карт дней публикации постов за год"""
+
+    def test_days_by_month(self):
+        PostFactory(publish=_local_datetime(2000, 1, 1, 2, 0))
+        PostFactory(publish=_local_datetime(2000, 1, 1, 12, 0))
+        PostFactory(publish=_local_datetime(2000, 12, 31, 23, 59))
+        PostFactory(publish=_local_datetime(2001, 1, 1, 0, 0))
+        PostFactory(publish=_local_datetime(2000, 5, 5, 12, 0), draft=True)
+        fact_months = caching.get_calendar_year(2000)
+        assert list(fact_months) == list(range(1, 13))
+        assert fact_months[1] == [date(2000, 1, 1)]
+        assert fact_months[5] == []
+        assert fact_months[12] == [date(2000, 12, 31)]
+
+    def test_leap_day(self):
+        PostFactory(publish=_local_datetime(2000, 2, 29, 12, 0))
+        PostFactory(publish=_local_datetime(2000, 3, 1, 12, 0))
+        fact_months = caching.get_calendar_year(2000)
+        assert (fact_months[2], fact_months[3]) == ([date(2000, 2, 29)], [date(2000, 3, 1)])
+
+    def test_bitmap_cached(self, django_assert_num_queries):
+        PostFactory(publish=_local_datetime(2000, 1, 1, 12, 0))
+        caching.get_calendar_year(2000)
+        with django_assert_num_queries(0):
+            assert caching.get_calendar_year(2000)[1] == [date(2000, 1, 1)]
+
+    def test_patched_on_publish_and_draft(self, on_commit, django_assert_num_queries):
+        post = PostFactory(publish=_local_datetime(2000, 1, 1, 12, 0))
+        caching.get_calendar_year(2000)
+        with on_commit():
+            PostFactory(publish=_local_datetime(2000, 2, 1, 12, 0))
+        with django_assert_num_queries(0):
+            assert caching.get_calendar_year(2000)[2] == [date(2000, 2, 1)]
+        with on_commit():
+            post.draft = True
+            post.save()
+        with django_assert_num_queries(0):
+            assert caching.get_calendar_year(2000)[1] == []
+
+    def test_patched_on_move(self, on_commit):
+        post = PostFactory(publish=_local_datetime(2000, 1, 1, 12, 0))
+        PostFactory(publish=_local_datetime(2000, 1, 1, 18, 0))
+        caching.get_calendar_year(2000)
+        caching.get_calendar_year(2001)
+        with on_commit():
+            post.publish = _local_datetime(2001, 3, 1, 12, 0)
+            post.save()
+        # В прежний день остался другой пост, поэтому день остаётся отмеченным
+        assert caching.get_calendar_year(2000)[1] == [date(2000, 1, 1)]
+        assert caching.get_calendar_year(2001)[3] == [date(2001, 3, 1)]
+
+    def test_patched_on_delete(self, on_commit):
+        post = PostFactory(publish=_local_datetime(2000, 1, 1, 12, 0))
+        caching.get_calendar_year(2000)
+        with on_commit():
+            post.delete()
+        assert caching.get_calendar_year(2000)[1] == []
+
+    def test_dropped_when_locked_by_other_process(self, on_commit):
+        caching.get_calendar_year(2000)
+        cache_key = caching._get_calendar_cache_key(2000)
+        cache.add(f'{cache_key}:lock', 1)
+        with on_commit():
+            PostFactory(publish=_local_datetime(2000, 1, 1, 12, 0))
+        # Процесс, удерживающий блокировку, сохраняет карту без этого изменения под прежним ключом
+        cache.set(cache_key, 0)
+        assert caching._get_calendar_cache_key(2000) != cache_key
+        assert caching.get_calendar_year(2000)[1] == [date(2000, 1, 1)]
+
+    def test_build_in_progress_dropped_on_change(self, on_commit):
+        cache_key = caching._get_calendar_cache_key(2000)
+        with on_commit():
+            PostFactory(publish=_local_datetime(2000, 1, 1, 12, 0))
+        # Другой процесс сохраняет карту, построенную до фиксации изменения
+        cache.add(cache_key, 0)
+        assert caching.get_calendar_year(2000)[1] == [date(2000, 1, 1)]
+
+    def test_year_view(self):
+        PostFactory(publish=_local_datetime(2000, 1, 1, 12, 0))
+        response = APIClient().get('/api/v1/calendar/2000/')
+        assert response.status_code == 200
+        assert len(response.json()) == 12
+        assert response.json()['1'] == ['2000-01-01']
+
+    def test_year_view_wrong_year(self):
+        response = APIClient().get('/api/v1/calendar/0/')
+        assert response.status_code == 400
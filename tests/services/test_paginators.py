@@ -0,0 +1,242 @@
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from blog.models import Comment, Post
+from blog_by_me_DRF.settings import COMMENT_REPLIES_LIMIT
+from services import caching
+from services.blog.paginators import WindowCountPaginator, estimate_count
+from tests.blog.factories import CommentFactory, PostFactory, VideoFactory
+
+pytestmark = pytest.mark.django_db
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@pytest.fixture
+def locmem_cache():
+    with override_settings(CACHES=LOCMEM_CACHES):
+        cache.clear()
+        yield
+        cache.clear()
+
+
+class WindowCountPaginatorTest:
+    """Тестирование пагинатора с подсчётом количества объектов оконной функцией"""
+
+    def test_page_and_count_in_one_query(self, django_assert_num_queries):
+        PostFactory.create_batch(5)
+        paginator = WindowCountPaginator(Post.objects.all(), 2)
+        with django_assert_num_queries(1):
+            page = paginator.page(2)
+            fact_count, fact_num_pages, fact_len = paginator.count, paginator.num_pages, len(page)
+        assert (fact_count, fact_num_pages, fact_len) == (5, 3, 2)
+        assert page.has_next()
+
+    def test_empty_first_page(self):
+        paginator = WindowCountPaginator(Post.objects.all(), 2)
+        page = paginator.page(1)
+        assert paginator.count == 0
+        assert len(page) == 0
+
+    def test_page_out_of_range(self):
+        PostFactory.create_batch(2)
+        paginator = WindowCountPaginator(Post.objects.all(), 2)
+        with pytest.raises(EmptyPage):
+            paginator.page(3)
+
+    def test_evaluated_queryset_without_queries(self, django_assert_num_queries):
+        PostFactory.create_batch(3)
+        post_list = Post.objects.all()
+        len(post_list)
+        paginator = WindowCountPaginator(post_list, 2)
+        with django_assert_num_queries(0):
+            page = paginator.page(2)
+            fact_count, fact_len = paginator.count, len(page)
+        assert (fact_count, fact_len) == (3, 1)
+
+
+class NoContentPaginationTest:
+    """Тестирование ответа 204 на пустые результаты фильтрации постов без отдельного запроса exists()"""
+
+    def test_filter_by_tag(self, locmem_cache):
+        post = PostFactory()
+        post.tags.add('fishing')
+        PostFactory()
+        APIClient().get('/api/v1/posts/tag/fishing/', {'pagination': 'page', 'page_size': 2})
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get('/api/v1/posts/tag/fishing/', {'pagination': 'page'})
+        fact_queries = [query['sql'] for query in queries.captured_queries]
+        assert response.status_code == 200
+        assert response.json()['count'] == 1
+        assert not any('COUNT(' in sql or 'SELECT 1 AS "a"' in sql for sql in fact_queries)
+
+    def test_filter_by_tag_no_content(self):
+        PostFactory()
+        response = APIClient().get('/api/v1/posts/tag/fishing/')
+        assert response.status_code == 204
+
+    def test_filter_by_tag_no_content_cursor(self):
+        PostFactory()
+        response = APIClient().get('/api/v1/posts/tag/fishing/')
+        assert response.status_code == 204
+
+    def test_filter_by_tag_no_content_page_out_of_range(self):
+        response = APIClient().get('/api/v1/posts/tag/fishing/', {'pagination': 'page', 'page': 2})
+        assert response.status_code == 204
+
+    def test_filter_by_tag_page_out_of_range(self):
+        post = PostFactory()
+        post.tags.add('fishing')
+        response = APIClient().get('/api/v1/posts/tag/fishing/', {'pagination': 'page', 'page': 2})
+        assert response.status_code == 404
+
+    def test_filter_by_date_no_content(self):
+        PostFactory()
+        response = APIClient().get('/api/v1/posts/date/2000-01-01/')
+        assert response.status_code == 204
+
+
+class KeysetPaginationTest:
+    """Тестирование пагинации по ключу (по умолчанию для списков постов, видеозаписей и комментариев)"""
+
+    def test_posts_pages(self):
+        posts = PostFactory.create_batch(3)
+        first_page = APIClient().get('/api/v1/posts/', {'page_size': 2}).json()
+        second_page = APIClient().get(first_page['next']).json()
+        assert 'count' not in first_page
+        assert [post['url'] for post in first_page['results'] + second_page['results']] == [
+            post.url for post in reversed(posts)
+        ]
+        assert second_page['next'] is None
+
+    def test_posts_page_without_count_query(self):
+        PostFactory.create_batch(3)
+        with CaptureQueriesContext(connection) as queries:
+            APIClient().get('/api/v1/posts/', {'page_size': 2})
+        assert not any('COUNT(' in query['sql'] for query in queries.captured_queries)
+
+    @pytest.mark.parametrize('url', ['/api/v1/posts/', '/api/v1/videos/'])
+    def test_cached_list_not_loaded(self, url, locmem_cache):
+        PostFactory(video=VideoFactory())
+        with mock.patch.object(
+            caching, 'get_cached_objects_or_queryset', wraps=caching.get_cached_objects_or_queryset
+        ) as get_cached:
+            response = APIClient().get(url)
+        assert len(response.json()['results']) == 1
+        get_cached.assert_not_called()
+
+    @pytest.mark.parametrize('url, pagination', [('/api/v1/posts/', 'page'), ('/api/v1/videos/', 'offset')])
+    def test_cached_list_used_by_page_pagination(self, url, pagination, locmem_cache, django_assert_num_queries):
+        PostFactory(video=VideoFactory())
+        APIClient().get(url, {'pagination': pagination})
+        # Ответ для другого размера страницы строится по выборке из кэша без запросов к БД
+        with django_assert_num_queries(0):
+            response = APIClient().get(url, {'pagination': pagination, 'page_size': 5, 'limit': 5})
+        assert len(response.json()['results']) == 1
+
+    def test_approximate_count(self):
+        PostFactory.create_batch(3)
+        response = APIClient().get('/api/v1/posts/', {'count': 'true'})
+        assert isinstance(response.json()['count'], int)
+
+    def test_estimate_count(self):
+        assert estimate_count(Post.objects.filter(draft=False)) >= 0
+
+    def test_search_paginated_by_page(self):
+        PostFactory(title_ru='Рыбалка')
+        response = APIClient().get('/api/v1/posts/search/', {'q': 'рыбалка'})
+        assert response.json()['count'] == 1
+
+    @pytest.mark.parametrize('url', ['/api/v1/posts/top-posts/', '/api/v1/posts/last-posts/'])
+    @pytest.mark.parametrize('params', [{}, {'period': 'week'}, {'pagination': 'cursor'}])
+    def test_fixed_lists_paginated_by_page(self, url, params):
+        PostFactory.create_batch(4)
+        response = APIClient().get(url, params)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 3
+
+    @pytest.mark.parametrize('url', ['/api/v1/posts/top-posts/', '/api/v1/posts/last-posts/'])
+    def test_fixed_lists_from_cache(self, url, locmem_cache):
+        PostFactory.create_batch(4)
+        APIClient().get(url, {'page_size': 3})
+        response = APIClient().get(url)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 3
+
+    def test_videos_pages(self):
+        for _ in range(4):
+            PostFactory(video=VideoFactory())
+        first_page = APIClient().get('/api/v1/videos/').json()
+        second_page = APIClient().get(first_page['next']).json()
+        assert len(first_page['results']) == 3
+        assert len(second_page['results']) == 1
+
+    def test_videos_offset_pagination(self):
+        PostFactory(video=VideoFactory())
+        response = APIClient().get('/api/v1/videos/', {'pagination': 'offset'})
+        assert response.json()['count'] == 1
+
+    def test_comments_pages(self):
+        post = PostFactory()
+        comments = CommentFactory.create_batch(3, post=post)
+        first_page = APIClient().get('/api/v1/comments/', {'post_id': post.id, 'page_size': 2}).json()
+        second_page = APIClient().get(first_page['next']).json()
+        assert [comment['id'] for comment in first_page['results'] + second_page['results']] == [
+            comment.id for comment in comments
+        ]
+
+
+class CommentTreeTest:
+    """Тестирование списка комментариев с ограниченным количеством ответов и ссылкой на остальные ответы"""
+
+    def test_replies_limited(self):
+        comment = CommentFactory()
+        replies = CommentFactory.create_batch(COMMENT_REPLIES_LIMIT + 2, post=comment.post, parent=comment)
+        response = APIClient().get('/api/v1/comments/', {'post_id': comment.post_id}).json()
+        children = response['results'][0]['children']
+        assert [reply['id'] for reply in children] == [reply.id for reply in replies[:COMMENT_REPLIES_LIMIT]]
+
+    def test_more_replies_link(self):
+        comment = CommentFactory()
+        replies = CommentFactory.create_batch(COMMENT_REPLIES_LIMIT + 2, post=comment.post, parent=comment)
+        response = APIClient().get('/api/v1/comments/', {'post_id': comment.post_id}).json()
+        more_replies = APIClient().get(response['results'][0]['more_replies']).json()
+        assert [reply['id'] for reply in more_replies['results']] == [
+            reply.id for reply in replies[COMMENT_REPLIES_LIMIT:]
+        ]
+
+    def test_more_replies_link_with_same_created(self):
+        comment = CommentFactory()
+        replies = CommentFactory.create_batch(COMMENT_REPLIES_LIMIT + 2, post=comment.post, parent=comment)
+        Comment.objects.filter(parent=comment).update(created=comment.created)
+        response = APIClient().get('/api/v1/comments/', {'post_id': comment.post_id}).json()
+        more_replies = APIClient().get(response['results'][0]['more_replies']).json()
+        assert [reply['id'] for reply in more_replies['results']] == [
+            reply.id for reply in replies[COMMENT_REPLIES_LIMIT:]
+        ]
+
+    def test_no_more_replies_link(self):
+        comment = CommentFactory()
+        CommentFactory.create_batch(COMMENT_REPLIES_LIMIT, post=comment.post, parent=comment)
+        response = APIClient().get('/api/v1/comments/', {'post_id': comment.post_id}).json()
+        assert response['results'][0]['more_replies'] is None
+
+    def test_replies_prefetched_in_one_query(self, django_assert_num_queries):
+        post = PostFactory()
+        for comment in CommentFactory.create_batch(3, post=post):
+            CommentFactory.create_batch(COMMENT_REPLIES_LIMIT + 2, post=post, parent=comment)
+        with django_assert_num_queries(2):
+            response = APIClient().get('/api/v1/comments/', {'post_id': post.id})
+        assert len(response.json()['results']) == 3
+
+    def test_invalid_parent_param(self):
+        post = PostFactory()
+        response = APIClient().get('/api/v1/comments/', {'post_id': post.id, 'parent': 'abc'})
+        assert response.status_code == 400
@@ -0,0 +1,192 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from blog.models import Post
+from services import post_filters
+from services.caching import NAMESPACE_POST_FILTERS, bump_cache_version
+from tests.blog.factories import CategoryFactory, PostFactory
+
+pytestmark = pytest.mark.django_db
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@pytest.fixture
+def locmem_cache():
+    with override_settings(CACHES=LOCMEM_CACHES):
+        cache.clear()
+        yield
+        cache.clear()
+
+
+@pytest.fixture
+def filter_index(monkeypatch):
+    index = post_filters.PostFilterIndex()
+    monkeypatch.setattr(post_filters, 'post_filter_index', index)
+    return index
+
+
+class IdArrayTest:
+    """Тестирование операций с отсортированными массивами id постов"""
+
+    def test_intersect(self):
+        id_arrays = [post_filters._to_id_array(ids) for ids in ([8, 1, 64, 1000], [1000, 7, 8], [1, 8, 1000, 5000])]
+        assert post_filters._intersect(id_arrays) == [8, 1000]
+
+    def test_intersect_with_empty(self):
+        assert post_filters._intersect([post_filters._to_id_array([1, 2]), ()]) == []
+
+    def test_replace_id(self):
+        id_arrays = {'fishing': post_filters._to_id_array([1, 5]), 'hiking': post_filters._to_id_array([3, 5])}
+        new_arrays = post_filters._replace_id(id_arrays, {'hiking'}, {'fishing', 'winter'}, 3)
+        expected_arrays = {'fishing': [1, 3, 5], 'hiking': [5], 'winter': [3]}
+        assert {key: list(ids) for key, ids in new_arrays.items()} == expected_arrays
+        new_arrays = post_filters._replace_id(new_arrays, {'hiking', 'fishing'}, set(), 5)
+        assert {key: list(ids) for key, ids in new_arrays.items()} == {'fishing': [1, 3], 'winter': [3]}
+        # Исходные массивы не изменяются (снимок индекса читается без блокировки)
+        assert list(id_arrays['fishing']) == [1, 5]
+
+
+class PostFilterIndexTest:
+    """Тестирование индекса фильтрации постов по тегам, категории и дню публикации"""
+
+    def test_filter_by_tag(self, filter_index):
+        post = PostFactory()
+        post.tags.add('fishing')
+        PostFactory().tags.add('hiking')
+        assert filter_index.filter_post_ids(tags=('fishing',)) == [post.id]
+        assert filter_index.filter_post_ids(tags=('diving',)) == []
+
+    def test_filter_by_category(self, filter_index):
+        post = PostFactory()
+        PostFactory()
+        assert filter_index.filter_post_ids(category=post.category.url) == [post.id]
+
+    def test_filter_by_day(self, filter_index):
+        post = PostFactory(publish=timezone.now() - timedelta(days=1))
+        PostFactory()
+        assert filter_index.filter_post_ids(day=timezone.localdate(post.publish)) == [post.id]
+
+    def test_intersection(self, filter_index):
+        category = CategoryFactory()
+        post = PostFactory(category=category)
+        post.tags.add('fishing', 'winter')
+        PostFactory(category=category).tags.add('fishing')
+        PostFactory().tags.add('fishing', 'winter')
+        assert filter_index.filter_post_ids(tags=('fishing', 'winter'), category=category.url) == [post.id]
+
+    def test_order_by_publish(self, filter_index):
+        category = CategoryFactory()
+        old_post = PostFactory(category=category, publish=timezone.now() - timedelta(days=1))
+        new_post = PostFactory(category=category)
+        assert filter_index.filter_post_ids(category=category.url) == [new_post.id, old_post.id]
+
+    def test_only_published_posts(self, filter_index):
+        category = CategoryFactory()
+        PostFactory(category=category, draft=True)
+        PostFactory(category=category, publish=timezone.now() + timedelta(days=1))
+        assert filter_index.filter_post_ids(category=category.url) == []
+
+    def test_without_filters(self, filter_index):
+        PostFactory()
+        assert filter_index.filter_post_ids() == []
+
+    def test_no_queries_after_build(self, filter_index, locmem_cache, django_assert_num_queries):
+        post = PostFactory()
+        filter_index.filter_post_ids(category=post.category.url)
+        with django_assert_num_queries(0):
+            assert filter_index.filter_post_ids(category=post.category.url) == [post.id]
+
+    def test_incremental_update(
+        self, filter_index, locmem_cache, django_capture_on_commit_callbacks, django_assert_num_queries
+    ):
+        post = PostFactory()
+        filter_index.filter_post_ids(category=post.category.url)
+        with django_capture_on_commit_callbacks(execute=True):
+            new_post = PostFactory(author=post.author, category=post.category)
+        with django_capture_on_commit_callbacks(execute=True):
+            post.draft = True
+            post.save()
+        with django_assert_num_queries(0):
+            assert filter_index.filter_post_ids(category=post.category.url) == [new_post.id]
+
+    def test_removed_on_delete(self, filter_index, locmem_cache, django_capture_on_commit_callbacks):
+        post = PostFactory()
+        filter_index.filter_post_ids(category=post.category.url)
+        with django_capture_on_commit_callbacks(execute=True):
+            post.delete()
+        assert filter_index.filter_post_ids(category=post.category.url) == []
+
+    def test_updated_on_tags_change(self, filter_index, locmem_cache, django_capture_on_commit_callbacks):
+        post = PostFactory()
+        filter_index.filter_post_ids(tags=('fishing',))
+        with django_capture_on_commit_callbacks(execute=True):
+            post.tags.add('fishing')
+        assert filter_index.filter_post_ids(tags=('fishing',)) == [post.id]
+        with django_capture_on_commit_callbacks(execute=True):
+            post.tags.remove('fishing')
+        assert filter_index.filter_post_ids(tags=('fishing',)) == []
+
+    def test_rebuild_after_change_in_other_process(
+        self, filter_index, locmem_cache, django_capture_on_commit_callbacks
+    ):
+        post = PostFactory()
+        filter_index.filter_post_ids(category=post.category.url)
+        # Изменение без сигналов этого процесса: меняется только версия пространства имён индекса
+        Post.objects.filter(id=post.id).update(draft=True)
+        with django_capture_on_commit_callbacks(execute=True):
+            bump_cache_version(NAMESPACE_POST_FILTERS)
+        assert filter_index.filter_post_ids(category=post.category.url) == []
+
+
+class FilterViewTest:
+    """Тестирование эндпоинтов фильтрации постов по категории и по пересечению фильтров"""
+
+    def test_filter_by_category(self, filter_index):
+        post = PostFactory()
+        PostFactory()
+        response = APIClient().get(f'/api/v1/posts/category/{post.category.url}/')
+        assert response.status_code == 200
+        assert [item['url'] for item in response.json()['results']] == [post.url]
+
+    def test_filter_by_category_no_content(self, filter_index):
+        response = APIClient().get('/api/v1/posts/category/unknown/')
+        assert response.status_code == 204
+
+    def test_filter_by_tags_and_date(self, filter_index):
+        post = PostFactory()
+        post.tags.add('fishing', 'winter')
+        PostFactory().tags.add('fishing')
+        params = {'tag': ['fishing', 'winter'], 'date': timezone.localdate(post.publish).isoformat()}
+        response = APIClient().get('/api/v1/posts/filter/', params)
+        assert response.status_code == 200
+        assert [item['url'] for item in response.json()['results']] == [post.url]
+
+    def test_filter_pages(self, filter_index):
+        category = CategoryFactory()
+        posts = PostFactory.create_batch(3, category=category)
+        params = {'category': category.url, 'pagination': 'page', 'page_size': 2}
+        response = APIClient().get('/api/v1/posts/filter/', {**params, 'page': 2})
+        assert response.json()['count'] == 3
+        assert [item['url'] for item in response.json()['results']] == [posts[0].url]
+
+    def test_cached_response_depends_on_all_tags(self, filter_index, locmem_cache):
+        post = PostFactory()
+        post.tags.add('fishing', 'winter')
+        PostFactory().tags.add('winter')
+        APIClient().get('/api/v1/posts/filter/', {'tag': 'winter'})
+        response = APIClient().get('/api/v1/posts/filter/', {'tag': ['fishing', 'winter']})
+        assert len(response.json()['results']) == 1
+
+    def test_filter_without_params(self, filter_index):
+        response = APIClient().get('/api/v1/posts/filter/')
+        assert response.status_code == 400
+
+    def test_filter_wrong_date(self, filter_index):
+        response = APIClient().get('/api/v1/posts/filter/', {'date': '01.01.2000'})
+        assert response.status_code == 400
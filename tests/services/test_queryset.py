@@ -0,0 +1,176 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from services import queryset, tag_counters
+from tests.blog.factories import CategoryFactory, PostFactory
+from tests.users.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class QsTopPostsTest:
+    """Тестирование функции _qs_top_posts()"""
+
+    def test_ordered_by_score(self):
+        third_post = PostFactory(score=1)
+        first_post = PostFactory(score=5)
+        PostFactory(score=-2)
+        second_post = PostFactory(score=3)
+
+        fact_posts = list(queryset._qs_top_posts())
+        expected_posts = [first_post, second_post, third_post]
+        assert fact_posts == expected_posts
+
+    def test_unpublished_posts_excluded(self):
+        PostFactory(score=10, draft=True)
+        PostFactory(score=10, publish=timezone.now() + timedelta(days=1))
+        post = PostFactory(score=1)
+        assert list(queryset._qs_top_posts()) == [post]
+
+    def test_period(self):
+        PostFactory(score=10, publish=timezone.now() - timedelta(days=10))
+        week_post = PostFactory(score=1, publish=timezone.now() - timedelta(days=3))
+        assert list(queryset._qs_top_posts(period='week')) == [week_post]
+
+    def test_period_month(self):
+        PostFactory(score=10, publish=timezone.now() - timedelta(days=40))
+        month_post = PostFactory(score=1, publish=timezone.now() - timedelta(days=10))
+        assert list(queryset._qs_top_posts(period='month')) == [month_post]
+
+
+class QsAuthorLastPostsTest:
+    """Тестирование предвыборки последних постов авторов в _qs_author_list() и _qs_author_detail()"""
+
+    def test_last_posts_of_each_author(self):
+        authors = UserFactory.create_batch(2)
+        posts = {
+            author.id: [PostFactory(author=author, publish=timezone.now() - timedelta(days=day)) for day in range(4)]
+            for author in authors
+        }
+        PostFactory(author=authors[0], draft=True)
+        PostFactory(author=authors[0], publish=timezone.now() + timedelta(days=1))
+        fact_posts = {author.id: author.last_posts for author in queryset._qs_author_list()}
+        assert fact_posts == {author_id: author_posts[:3] for author_id, author_posts in posts.items()}
+
+    def test_one_query_for_all_authors(self, django_assert_num_queries):
+        for author in UserFactory.create_batch(3):
+            PostFactory.create_batch(4, author=author)
+        with django_assert_num_queries(2) as queries:
+            authors = list(queryset._qs_author_list())
+            [post.title for author in authors for post in author.last_posts]
+        assert 'ROW_NUMBER() OVER (PARTITION BY "blog_post"."author_id"' in queries.captured_queries[1]['sql']
+
+    def test_author_detail(self):
+        author = UserFactory()
+        posts = [PostFactory(author=author, publish=timezone.now() - timedelta(days=day)) for day in range(4)]
+        assert queryset._qs_author_detail(author.id).last_posts == posts[:3]
+
+    def test_author_list_endpoint(self):
+        post = PostFactory()
+        response = APIClient().get('/api/v1/authors/')
+        assert response.json()[0]['last_posts'][0]['url'] == post.url
+
+
+def _create_tagged_posts(count, *tags, **kwargs):
+    for post in PostFactory.create_batch(count, **kwargs):
+        post.tags.add(*tags)
+
+
+class QsTopTagsTest:
+    """Тестирование функции _qs_top_tags()"""
+
+    def test_ordered_by_posts_count(self):
+        _create_tagged_posts(1, 'hiking')
+        _create_tagged_posts(2, 'fishing', 'winter')
+        _create_tagged_posts(1, 'fishing')
+        tag_counters.rebuild_tag_counters()
+        assert [(tag.name, tag.npost) for tag in queryset._qs_top_tags()] == [
+            ('fishing', 3),
+            ('winter', 2),
+            ('hiking', 1),
+        ]
+
+    def test_unpublished_posts_excluded(self):
+        _create_tagged_posts(1, 'fishing')
+        _create_tagged_posts(2, 'hiking', draft=True)
+        _create_tagged_posts(2, 'winter', publish=timezone.now() + timedelta(days=1))
+        tag_counters.rebuild_tag_counters()
+        assert [(tag.name, tag.npost) for tag in queryset._qs_top_tags()] == [('fishing', 1)]
+
+    def test_scheduled_posts_subtracted_before_limit(self, monkeypatch):
+        monkeypatch.setattr(queryset.settings, 'TOP_TAGS_LIMIT', 2)
+        _create_tagged_posts(3, 'fishing', publish=timezone.now() + timedelta(days=1))
+        _create_tagged_posts(1, 'fishing')
+        _create_tagged_posts(3, 'hiking')
+        _create_tagged_posts(2, 'winter')
+        tag_counters.rebuild_tag_counters()
+        assert [(tag.name, tag.npost) for tag in queryset._qs_top_tags()] == [('hiking', 3), ('winter', 2)]
+
+    def test_category(self):
+        category = CategoryFactory()
+        _create_tagged_posts(2, 'fishing', category=category)
+        _create_tagged_posts(3, 'hiking')
+        tag_counters.rebuild_tag_counters()
+        assert [(tag.name, tag.npost) for tag in queryset._qs_top_tags(category.url)] == [('fishing', 2)]
+        assert queryset._qs_top_tags('unknown') == []
+
+    def test_endpoint_with_category(self):
+        category = CategoryFactory()
+        _create_tagged_posts(1, 'fishing', category=category)
+        _create_tagged_posts(2, 'hiking')
+        tag_counters.rebuild_tag_counters()
+        response = APIClient().get('/api/v1/top-tags/', {'category': category.url})
+        assert [(tag['name'], tag['npost']) for tag in response.json()] == [('fishing', 1)]
+
+
+def _local_datetime(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class QsDatePostIdsTest:
+    """Тестирование функции _qs_date_post_ids()"""
+
+    def test_day_in_site_timezone(self):
+        # 02:00 по времени сайта - ещё предыдущий день в UTC
+        early_post = PostFactory(publish=_local_datetime(2000, 1, 1, 2, 0))
+        late_post = PostFactory(publish=_local_datetime(2000, 1, 1, 23, 59))
+        PostFactory(publish=_local_datetime(2000, 1, 2, 0, 0))
+        assert queryset._qs_date_post_ids('2000-01-01') == [late_post.id, early_post.id]
+
+    def test_unpublished_posts_excluded(self):
+        day = timezone.localdate() + timedelta(days=1)
+        PostFactory(publish=timezone.now() + timedelta(days=1))
+        PostFactory(draft=True)
+        assert queryset._qs_date_post_ids(day.isoformat()) == []
+        assert queryset._qs_date_post_ids(timezone.localdate().isoformat()) == []
+
+    def test_range_condition_on_publish(self, django_assert_num_queries):
+        with django_assert_num_queries(1) as queries:
+            queryset._qs_date_post_ids('2000-01-01')
+        sql = queries.captured_queries[0]['sql']
+        assert 'AT TIME ZONE' not in sql
+        assert '"blog_post"."publish" >=' in sql and '"blog_post"."publish" <' in sql
+
+
+class QsDaysPostsInCurrentMonthTest:
+    """Тестирование функции _qs_days_posts_in_current_month()"""
+
+    def test_month_in_site_timezone(self):
+        PostFactory(publish=_local_datetime(2000, 1, 1, 2, 0))
+        PostFactory(publish=_local_datetime(2000, 1, 31, 23, 59))
+        PostFactory(publish=_local_datetime(2000, 2, 1, 0, 0))
+        PostFactory(publish=_local_datetime(1999, 12, 31, 23, 59))
+        fact_days = list(queryset._qs_days_posts_in_current_month(2000, 1))
+        assert fact_days == [date(2000, 1, 1), date(2000, 1, 31)]
+
+    def test_december(self):
+        PostFactory(publish=_local_datetime(1999, 12, 31, 23, 59))
+        PostFactory(publish=_local_datetime(2000, 1, 1, 0, 0))
+        assert list(queryset._qs_days_posts_in_current_month(1999, 12)) == [date(1999, 12, 31)]
+
+    def test_wrong_month(self):
+        response = APIClient().get('/api/v1/calendar/2000/13/')
+        assert response.status_code == 400
@@ -0,0 +1,266 @@
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from blog.models import Rating
+from services.rating import ServiceUserRating, apply_rating_votes, flush_rating_votes
+from tests.blog.factories import PostFactory, RatingFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _get_author_rating(post):
+    post.author.refresh_from_db(fields=('user_rating',))
+    return post.author.user_rating
+
+
+def _get_post_score(post):
+    post.refresh_from_db(fields=('score',))
+    return post.score
+
+
+class ServiceUserRatingTest:
+    """Тестирование класса ServiceUserRating"""
+
+    def test_save_rating_created(self, marks):
+        post = PostFactory()
+        service = ServiceUserRating(ip='127.0.0.1', post_slug=post.url)
+        service.save_rating(marks['Лайк'].id)
+
+        assert Rating.objects.get(ip='127.0.0.1', post=post).mark == marks['Лайк']
+        assert _get_post_score(post) == marks['Лайк'].value
+        assert _get_author_rating(post) == marks['Лайк'].value
+        assert service.get_status_code() == 201
+        assert service.get_message() == ServiceUserRating.RATING_CREATE_MESSAGE
+
+    def test_save_rating_updated(self, marks):
+        post = PostFactory()
+        ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(marks['Лайк'].id)
+        service = ServiceUserRating(ip='127.0.0.1', post_slug=post.url)
+        service.save_rating(marks['Дизлайк'].id)
+
+        assert Rating.objects.filter(ip='127.0.0.1', post=post).count() == 1
+        assert Rating.objects.get(ip='127.0.0.1', post=post).mark == marks['Дизлайк']
+        assert _get_post_score(post) == marks['Дизлайк'].value
+        assert _get_author_rating(post) == marks['Дизлайк'].value
+        assert service.get_status_code() == 200
+        assert service.get_message() == ServiceUserRating.RATING_UPDATE_MESSAGE
+
+    def test_save_rating_same_mark(self, marks):
+        post = PostFactory()
+        ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(marks['Лайк'].id)
+        ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(marks['Лайк'].id)
+
+        assert _get_post_score(post) == marks['Лайк'].value
+        assert _get_author_rating(post) == marks['Лайк'].value
+
+    def test_save_rating_different_ip(self, marks):
+        post = PostFactory()
+        ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(marks['Лайк'].id)
+        ServiceUserRating(ip='127.0.0.2', post_slug=post.url).save_rating(marks['Лайк'].id)
+
+        assert Rating.objects.filter(post=post).count() == 2
+        assert _get_post_score(post) == 2 * marks['Лайк'].value
+
+    def test_save_rating_queries(self, marks):
+        post = PostFactory()
+        service = ServiceUserRating(ip='127.0.0.1', post_slug=post.url)
+        with CaptureQueriesContext(connection) as captured:
+            service.save_rating(marks['Лайк'].id)
+        # Блокировка поста и запрос сохранения рейтинга (без учёта запросов точек сохранения транзакции)
+        queries = [query['sql'] for query in captured.captured_queries if 'SAVEPOINT' not in query['sql']]
+        assert len(queries) == 2
+
+    def test_save_rating_mark_not_found(self, marks):
+        post = PostFactory()
+        with pytest.raises(ValidationError):
+            ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(100)
+        assert _get_post_score(post) == 0
+
+    def test_save_rating_post_not_found(self, marks):
+        with pytest.raises(Http404):
+            ServiceUserRating(ip='127.0.0.1', post_slug='not-exist').save_rating(marks['Лайк'].id)
+
+    def test_save_rating_draft_post(self, marks):
+        post = PostFactory(draft=True)
+        with pytest.raises(Http404):
+            ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(marks['Лайк'].id)
+
+    def test_existing_rating(self, marks):
+        post = PostFactory()
+        rating = RatingFactory(ip='127.0.0.1', mark=marks['Лайк'], post=post)
+        assert ServiceUserRating(ip='127.0.0.1', post_slug=post.url).existing_rating == rating
+
+
+class RatingViewSetTest:
+    """Тестирование создания/обновления рейтинга через RatingViewSet"""
+
+    def test_create_and_update_rating(self, marks):
+        post = PostFactory()
+        url = f'/api/v1/posts/{post.url}/rating/'
+
+        response = APIClient().post(url, {'mark': marks['Лайк'].id}, format='json')
+        assert response.status_code == 201
+        assert _get_author_rating(post) == marks['Лайк'].value
+
+        response = APIClient().post(url, {'mark': marks['Дизлайк'].id})
+        assert response.status_code == 200
+        assert _get_author_rating(post) == marks['Дизлайк'].value
+        assert Rating.objects.get(post=post).mark == marks['Дизлайк']
+
+    def test_retrieve_rating(self, marks):
+        post = PostFactory()
+        RatingFactory(ip='127.0.0.1', mark=marks['Лайк'], post=post)
+        response = APIClient().get(f'/api/v1/posts/{post.url}/rating/', REMOTE_ADDR='127.0.0.1')
+        assert response.json() == {'mark': marks['Лайк'].id}
+
+    @pytest.mark.parametrize('mark', [None, '', 'like', '0', '-1', '²', '1.5', '99999999999999999999'])
+    def test_invalid_mark_param(self, mark):
+        post = PostFactory()
+        data = {} if mark is None else {'mark': mark}
+        response = APIClient().post(f'/api/v1/posts/{post.url}/rating/', data)
+        assert response.status_code == 400
+
+
+class FakeRedis:
+    """Клиент Redis в памяти с командами, используемыми буфером оценок (списки, хеши, конвейер команд)"""
+
+    def __init__(self):
+        self.lists, self.hashes = {}, {}
+
+    def pipeline(self):
+        return FakeRedisPipeline(self)
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(str(value).encode() for value in values)
+        return len(self.lists[key])
+
+    def lpush(self, key, *values):
+        for value in values:
+            self.lists.setdefault(key, []).insert(0, value)
+        return len(self.lists[key])
+
+    def lrange(self, key, start, end):
+        stop = end + 1
+        return self.lists.get(key, [])[start:stop]
+
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lists.get(key, [])[start:]
+        return True
+
+    def hset(self, key, field, value):
+        is_new = field not in self.hashes.setdefault(key, {})
+        self.hashes[key][field] = value
+        return int(is_new)
+
+    def hdel(self, key, *fields):
+        return sum(self.hashes.get(key, {}).pop(field, None) is not None for field in fields)
+
+
+class FakeRedisPipeline:
+    def __init__(self, client):
+        self.client, self.commands = client, []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((getattr(self.client, name), args))
+
+    def execute(self):
+        return [command(*args) for command, args in self.commands]
+
+
+@pytest.fixture
+def write_behind():
+    """Режим отложенной записи оценок с буфером в памяти"""
+    redis = FakeRedis()
+    with (
+        mock.patch('services.rating.RATING_WRITE_BEHIND', True),
+        mock.patch('services.rating._get_redis', return_value=redis),
+    ):
+        yield redis
+
+
+class RatingWriteBehindTest:
+    """Тестирование режима отложенной записи оценок (буфер оценок и его запись в БД)"""
+
+    def test_vote_buffered(self, marks, write_behind):
+        post = PostFactory()
+        service = ServiceUserRating(ip='127.0.0.1', post_slug=post.url)
+        service.save_rating(marks['Лайк'].id)
+        assert service.get_status_code() == 201
+        assert not Rating.objects.exists()
+        assert _get_post_score(post) == 0
+
+    def test_repeated_vote_before_flush_updated(self, marks, write_behind):
+        post = PostFactory()
+        ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(marks['Лайк'].id)
+        service = ServiceUserRating(ip='127.0.0.1', post_slug=post.url)
+        service.save_rating(marks['Дизлайк'].id)
+        assert service.get_status_code() == 200
+
+    def test_vote_after_flush_updated(self, marks, write_behind):
+        post = PostFactory()
+        ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(marks['Лайк'].id)
+        flush_rating_votes()
+        service = ServiceUserRating(ip='127.0.0.1', post_slug=post.url)
+        service.save_rating(marks['Дизлайк'].id)
+        assert service.get_status_code() == 200
+
+    def test_flush_applies_last_vote(self, marks, write_behind):
+        post = PostFactory()
+        ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(marks['Лайк'].id)
+        ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(marks['Дизлайк'].id)
+        ServiceUserRating(ip='127.0.0.2', post_slug=post.url).save_rating(marks['Лайк'].id)
+        assert flush_rating_votes() == 3
+        assert Rating.objects.get(ip='127.0.0.1', post=post).mark == marks['Дизлайк']
+        assert _get_post_score(post) == marks['Дизлайк'].value + marks['Лайк'].value
+        assert _get_author_rating(post) == marks['Дизлайк'].value + marks['Лайк'].value
+        assert write_behind.hashes[next(iter(write_behind.hashes))] == {}
+
+    def test_flush_batch_size(self, marks, write_behind):
+        post = PostFactory()
+        for ip in ('127.0.0.1', '127.0.0.2', '127.0.0.3'):
+            ServiceUserRating(ip=ip, post_slug=post.url).save_rating(marks['Лайк'].id)
+        assert flush_rating_votes(batch_size=2) == 2
+        assert Rating.objects.count() == 2
+        assert flush_rating_votes(batch_size=2) == 1
+
+    def test_flush_error_returns_votes(self, marks, write_behind):
+        post = PostFactory()
+        ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(marks['Лайк'].id)
+        with mock.patch('services.rating.apply_rating_votes', side_effect=RuntimeError):
+            with pytest.raises(RuntimeError):
+                flush_rating_votes()
+        assert flush_rating_votes() == 1
+        assert Rating.objects.get(post=post).mark == marks['Лайк']
+
+    def test_invalid_vote_not_buffered(self, marks, write_behind):
+        post = PostFactory()
+        with pytest.raises(ValidationError):
+            ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(999999)
+        assert write_behind.lists == {}
+
+    def test_apply_updates_scores_with_one_query_each(self, marks):
+        posts = PostFactory.create_batch(3)
+        RatingFactory(ip='127.0.0.1', mark=marks['Лайк'], post=posts[0])
+        votes = {(post.id, ip): marks['Дизлайк'].id for post in posts for ip in ('127.0.0.1', '127.0.0.2')}
+
+        with CaptureQueriesContext(connection) as queries:
+            apply_rating_votes(votes)
+
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        assert len(updates) == 2
+        assert _get_post_score(posts[0]) == marks['Дизлайк'].value * 2 - marks['Лайк'].value
+        assert _get_post_score(posts[1]) == marks['Дизлайк'].value * 2
+
+    def test_command_once(self, marks, write_behind):
+        post = PostFactory()
+        ServiceUserRating(ip='127.0.0.1', post_slug=post.url).save_rating(marks['Лайк'].id)
+        call_command('flush_rating_votes', once=True, stdout=StringIO())
+        assert Rating.objects.get(post=post).mark == marks['Лайк']
@@ -0,0 +1,256 @@
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from blog.models import Post
+from services import search
+from services.exceptions import NoContent
+from tests.blog.factories import PostFactory
+
+pytestmark = pytest.mark.django_db
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@pytest.fixture
+def locmem_cache():
+    with override_settings(CACHES=LOCMEM_CACHES):
+        cache.clear()
+        yield
+        cache.clear()
+
+
+class UpdateSearchVectorsTest:
+    """Тестирование обновления хранимых поисковых векторов постов"""
+
+    def test_vectors_filled_on_create(self):
+        post = PostFactory(title_ru='Рыбалка на озере', title_en='Fishing on the lake')
+        post_vectors = Post.objects.values('search_vector_ru', 'search_vector_en').get(id=post.id)
+        assert "'рыбалк':1A" in post_vectors['search_vector_ru']
+        assert "'fish':1A" in post_vectors['search_vector_en']
+
+    def test_vectors_updated_on_change(self):
+        post = PostFactory(title_ru='Рыбалка')
+        post.title_ru = 'Путешествие'
+        post.save()
+        fact_posts = search.search_by_q('путешествие', Post.objects.all(), 'ru')
+        assert list(fact_posts) == [post]
+
+    @mock.patch('blog.signals.search.update_search_vectors')
+    def test_vectors_not_updated_without_text_fields(self, mock_update_search_vectors):
+        post = PostFactory()
+        mock_update_search_vectors.reset_mock()
+        post.draft = True
+        post.save(update_fields=('draft',))
+        mock_update_search_vectors.assert_not_called()
+
+    def test_command(self):
+        post = PostFactory(title_ru='Рыбалка')
+        Post.objects.update(search_vector_ru=None, search_vector_en=None)
+        call_command('update_search_vectors', stdout=StringIO())
+        assert list(search.search_by_q('рыбалка', Post.objects.all(), 'ru')) == [post]
+
+
+class SearchByQTest:
+    """Тестирование функции search_by_q()"""
+
+    def test_title_ranked_above_body(self):
+        body_post = PostFactory(title_ru='Отпуск', body_ru='Рыбалка и отдых')
+        title_post = PostFactory(title_ru='Рыбалка', body_ru='Отдых на озере')
+        fact_posts = list(search.search_by_q('рыбалка', Post.objects.all(), 'ru'))
+        assert fact_posts == [title_post, body_post]
+
+    def test_russian_stemming(self):
+        post = PostFactory(title_ru='Рыбалка на озере')
+        assert list(search.search_by_q('озеро', Post.objects.all(), 'ru')) == [post]
+
+    def test_english_language(self):
+        post = PostFactory(title_ru='Рыбалка', title_en='Fishing')
+        assert list(search.search_by_q('fish', Post.objects.all(), 'en')) == [post]
+
+    def test_not_found(self):
+        PostFactory(title_ru='Рыбалка')
+        with pytest.raises(NoContent):
+            search.search_by_q('путешествие', Post.objects.all(), 'ru')
+
+
+class FuzzySearchTest:
+    """Тестирование нечёткого поиска (режим "fuzzy" функции search_by_q())"""
+
+    def test_typo_in_title(self):
+        post = PostFactory(title_ru='Зимняя рыбалка на озере')
+        with pytest.raises(NoContent):
+            search.search_by_q('рибалка', Post.objects.all(), 'ru')
+        assert list(search.search_by_q('рибалка', Post.objects.all(), 'ru', 'fuzzy')) == [post]
+
+    def test_typo_in_tag(self):
+        post = PostFactory(title_ru='Отпуск')
+        post.tags.add('путешествия')
+        assert list(search.search_by_q('путишествия', Post.objects.all(), 'ru', 'fuzzy')) == [post]
+
+    def test_most_similar_first(self):
+        far_post = PostFactory(title_ru='Рыбалка')
+        near_post = PostFactory(title_ru='Рибалочка')
+        assert list(search.search_by_q('рибалка', Post.objects.all(), 'ru', 'fuzzy')) == [near_post, far_post]
+
+    def test_full_text_results_first(self):
+        post = PostFactory(title_ru='Рыбалка')
+        PostFactory(title_ru='Рибалка')
+        assert list(search.search_by_q('рыбалка', Post.objects.all(), 'ru', 'fuzzy')) == [post]
+
+    def test_english_language(self):
+        post = PostFactory(title_ru='Рыбалка', title_en='Winter fishing')
+        assert list(search.search_by_q('fishng', Post.objects.all(), 'en', 'fuzzy')) == [post]
+        with pytest.raises(NoContent):
+            search.search_by_q('рибалка', Post.objects.all(), 'en', 'fuzzy')
+
+    def test_only_published_posts(self):
+        PostFactory(title_ru='Рыбалка', draft=True)
+        with pytest.raises(NoContent):
+            search.search_by_q('рибалка', Post.objects.all(), 'ru', 'fuzzy')
+
+    def test_limit(self):
+        PostFactory.create_batch(3, title_ru='Рыбалка')
+        with mock.patch('services.queryset.settings.FUZZY_SEARCH_LIMIT', 2):
+            assert len(search.search_by_q('рибалка', Post.objects.all(), 'ru', 'fuzzy')) == 2
+
+    def test_search_mode_param(self):
+        post = PostFactory(title_ru='Рыбалка')
+        response = APIClient().get('/api/v1/posts/search/', {'q': 'рибалка', 'mode': 'fuzzy'})
+        assert response.status_code == 200
+        assert [item['url'] for item in response.json()['results']] == [post.url]
+        assert APIClient().get('/api/v1/posts/search/', {'q': 'рибалка', 'mode': 'other'}).status_code == 400
+
+
+class NormalizeSearchQueryTest:
+    """Тестирование функции normalize_search_query()"""
+
+    def test_normalize(self):
+        assert search.normalize_search_query('  Рыбалка   НА озере ') == 'рыбалка на озере'
+
+
+class SearchResultTest:
+    """Тестирование класса SearchResult"""
+
+    def test_slice_keeps_ranking_order(self):
+        posts = PostFactory.create_batch(3)
+        result = search.SearchResult([posts[2].id, posts[0].id, posts[1].id], Post.objects.all())
+        assert result[:2] == [posts[2], posts[0]]
+        assert result[2] == posts[1]
+        assert len(result) == 3
+
+    def test_slice_loads_only_requested_posts(self, django_assert_num_queries):
+        posts = PostFactory.create_batch(3)
+        result = search.SearchResult([post.id for post in posts], Post.objects.all())
+        with django_assert_num_queries(1) as captured:
+            result[1:2]
+        assert f'IN ({posts[1].id})' in captured.captured_queries[0]['sql']
+
+    def test_order_by(self):
+        posts = PostFactory.create_batch(2)
+        PostFactory()
+        result = search.SearchResult([post.id for post in posts], Post.objects.all())
+        assert list(result.order_by('-id')) == [posts[1], posts[0]]
+
+
+class SearchCachingTest:
+    """Тестирование кэширования результатов поиска"""
+
+    def test_post_ids_cached_by_normalized_query(self, locmem_cache, django_assert_num_queries):
+        PostFactory(title_ru='Рыбалка')
+        search.search_by_q('рыбалка', Post.objects.all(), 'ru')
+        with django_assert_num_queries(0):
+            result = search.search_by_q(' РЫБАЛКА ', Post.objects.all(), 'ru')
+        assert len(result) == 1
+
+    def test_post_ids_cached_by_language(self, locmem_cache):
+        PostFactory(title_ru='Рыбалка', title_en='Fishing')
+        search.search_by_q('fishing', Post.objects.all(), 'en')
+        with pytest.raises(NoContent):
+            search.search_by_q('fishing', Post.objects.all(), 'ru')
+
+    def test_post_ids_invalidated_after_post_change(self, locmem_cache, django_capture_on_commit_callbacks):
+        post = PostFactory(title_ru='Рыбалка')
+        search.search_by_q('рыбалка', Post.objects.all(), 'ru')
+        with django_capture_on_commit_callbacks(execute=True):
+            new_post = PostFactory(title_ru='Рыбалка на озере')
+        result = search.search_by_q('рыбалка', Post.objects.all(), 'ru')
+        assert set(result) == {post, new_post}
+
+    def test_search_pages(self, locmem_cache):
+        PostFactory.create_batch(4, title_ru='Рыбалка')
+        first_page = APIClient().get('/api/v1/posts/search/', {'q': 'рыбалка', 'page_size': 3})
+        second_page = APIClient().get('/api/v1/posts/search/', {'q': 'рыбалка', 'page_size': 3, 'page': 2})
+        assert first_page.json()['count'] == 4
+        assert len(first_page.json()['results']) == 3
+        assert len(second_page.json()['results']) == 1
+
+
+class SearchByDateTest:
+    """Тестирование фильтрации постов по дате публикации"""
+
+    def test_filter_by_publish_date(self):
+        post = PostFactory(publish=timezone.make_aware(datetime(2000, 1, 1, 2, 0)))
+        PostFactory()
+        result = search.search_by_date(Post.objects.all(), '2000-01-01')
+        assert list(result) == [post]
+
+    def test_not_found(self):
+        PostFactory()
+        with pytest.raises(NoContent):
+            search.search_by_date(Post.objects.all(), '2000-01-01')
+
+    def test_post_ids_cached(self, locmem_cache, django_assert_num_queries):
+        PostFactory(publish=timezone.make_aware(datetime(2000, 1, 1, 12, 0)))
+        search.search_by_date(Post.objects.all(), '2000-01-01')
+        with django_assert_num_queries(0):
+            result = search.search_by_date(Post.objects.all(), '2000-01-01')
+        assert len(result) == 1
+
+    def test_post_ids_invalidated_after_change_in_month(self, locmem_cache, django_capture_on_commit_callbacks):
+        post = PostFactory(publish=timezone.make_aware(datetime(2000, 1, 1, 12, 0)))
+        search.search_by_date(Post.objects.all(), '2000-01-01')
+        with django_capture_on_commit_callbacks(execute=True):
+            new_post = PostFactory(publish=timezone.make_aware(datetime(2000, 1, 1, 18, 0)))
+        assert list(search.search_by_date(Post.objects.all(), '2000-01-01')) == [new_post, post]
+
+    def test_post_ids_kept_after_change_in_other_month(
+        self, locmem_cache, django_capture_on_commit_callbacks, django_assert_max_num_queries
+    ):
+        PostFactory(publish=timezone.make_aware(datetime(2000, 1, 1, 12, 0)))
+        search.search_by_date(Post.objects.all(), '2000-01-01')
+        with django_capture_on_commit_callbacks(execute=True):
+            PostFactory(publish=timezone.make_aware(datetime(2000, 2, 1, 12, 0)))
+        # Заново может считываться только время отложенных публикаций (изменилась версия пространства постов)
+        with django_assert_max_num_queries(1) as queries:
+            search.search_by_date(Post.objects.all(), '2000-01-01')
+        assert not any('"blog_post"."publish" <' in query['sql'] for query in queries.captured_queries)
+
+    def test_post_moved_to_other_day(self, locmem_cache, django_capture_on_commit_callbacks):
+        post = PostFactory(publish=timezone.make_aware(datetime(2000, 1, 1, 12, 0)))
+        search.search_by_date(Post.objects.all(), '2000-01-01')
+        with django_capture_on_commit_callbacks(execute=True):
+            post.publish = timezone.make_aware(datetime(2000, 2, 1, 12, 0))
+            post.save()
+        with pytest.raises(NoContent):
+            search.search_by_date(Post.objects.all(), '2000-01-01')
+
+    def test_wrong_date(self):
+        response = APIClient().get('/api/v1/posts/date/2000-02-31/')
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize('date', ['0001-01-01', '9999-12-31'])
+    def test_date_out_of_range(self, date):
+        response = APIClient().get(f'/api/v1/posts/date/{date}/')
+        assert response.status_code == 400
+
+    def test_date_near_range_limits(self):
+        for date in ('0001-01-02', '9999-12-30'):
+            assert APIClient().get(f'/api/v1/posts/date/{date}/').status_code == 204
@@ -0,0 +1,84 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from blog_by_me_DRF.settings import MAIL_MAX_ATTEMPTS, MAIL_RETRY_DELAY
+from company.models import Contact
+from services.company.send_mail import send_pending_mail
+from tests.company.factories import ContactFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class ContactOutboxTest:
+    """Тестирование очереди исходящих писем для запросов обратной связи"""
+
+    def test_contact_request_does_not_send_mail(self):
+        data = {'name': 'Пользователь', 'email': 'user@example.com', 'phone': '+79999999999', 'message': 'Вопрос'}
+        response = APIClient().post('/api/v1/company/contact/', data)
+        assert response.status_code == 201
+        assert mail.outbox == []
+        assert Contact.objects.get().mail_status == Contact.MAIL_PENDING
+
+    def test_pending_mail_sent(self):
+        contacts = ContactFactory.create_batch(3)
+        result = send_pending_mail()
+        assert (result.sent, result.failed) == (3, 0)
+        assert sorted(message.to[0] for message in mail.outbox) == sorted(contact.email for contact in contacts)
+        assert set(Contact.objects.values_list('mail_status', flat=True)) == {Contact.MAIL_SENT}
+
+    def test_sent_mail_not_sent_again(self):
+        ContactFactory()
+        send_pending_mail()
+        result = send_pending_mail()
+        assert (result.sent, len(mail.outbox)) == (0, 1)
+
+    def test_batch_size(self):
+        ContactFactory.create_batch(3)
+        result = send_pending_mail(batch_size=2)
+        assert result.sent == 2
+        assert Contact.objects.filter(mail_status=Contact.MAIL_PENDING).count() == 1
+
+    def test_messages_sent_over_one_connection(self):
+        ContactFactory.create_batch(3)
+        with mock.patch('services.company.send_mail.get_connection', wraps=mail.get_connection) as get_connection:
+            send_pending_mail()
+        get_connection.assert_called_once()
+
+    @mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('SMTP error'))
+    def test_retry_with_backoff(self, mock_send_messages):
+        contact = ContactFactory()
+        result = send_pending_mail()
+        contact.refresh_from_db()
+        assert (result.sent, result.failed) == (0, 1)
+        assert (contact.mail_status, contact.mail_attempts) == (Contact.MAIL_PENDING, 1)
+        assert contact.mail_next_attempt >= timezone.now() + timedelta(seconds=MAIL_RETRY_DELAY - 5)
+
+        # Время следующей попытки ещё не наступило
+        assert send_pending_mail().failed == 0
+
+    @mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('SMTP error'))
+    def test_failed_after_max_attempts(self, mock_send_messages):
+        contact = ContactFactory(mail_attempts=MAIL_MAX_ATTEMPTS - 1)
+        send_pending_mail()
+        contact.refresh_from_db()
+        assert contact.mail_status == Contact.MAIL_FAILED
+
+    @mock.patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=OSError('Connection refused'))
+    def test_connection_error(self, mock_open):
+        ContactFactory.create_batch(2)
+        result = send_pending_mail()
+        assert (result.sent, result.failed) == (0, 2)
+
+    def test_command_once(self):
+        ContactFactory.create_batch(3)
+        out = StringIO()
+        call_command('send_mail_outbox', once=True, batch_size=2, stdout=out)
+        assert len(mail.outbox) == 3
+        assert not Contact.objects.filter(mail_status=Contact.MAIL_PENDING).exists()
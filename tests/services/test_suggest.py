@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from blog.models import Post
+from services import suggest
+from services.caching import NAMESPACE_POST_TITLES, bump_cache_version
+from tests.blog.factories import CategoryFactory, CommentFactory, PostFactory
+
+pytestmark = pytest.mark.django_db
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@pytest.fixture
+def locmem_cache():
+    with override_settings(CACHES=LOCMEM_CACHES):
+        cache.clear()
+        yield
+        cache.clear()
+
+
+@pytest.fixture
+def title_index(monkeypatch):
+    index = suggest.PostTitleIndex()
+    monkeypatch.setattr(suggest, 'post_title_index', index)
+    return index
+
+
+def _get_titles(q, language='ru'):
+    return [item['title'] for item in suggest.post_title_index.suggest(q, language)]
+
+
+class PostTitleIndexTest:
+    """Тестирование индекса подсказок заголовков постов"""
+
+    def test_prefix_of_any_word(self, title_index):
+        PostFactory(title_ru='Зимняя рыбалка')
+        PostFactory(title_ru='Поход в горы')
+        assert _get_titles('рыб') == ['Зимняя рыбалка']
+        assert _get_titles('зимняя ры') == ['Зимняя рыбалка']
+        assert _get_titles('ЗИМ') == ['Зимняя рыбалка']
+        assert _get_titles('лодка') == []
+
+    def test_title_starting_with_query_first(self, title_index):
+        PostFactory(title_ru='Рыбалка на озере', publish=timezone.now() - timedelta(days=1))
+        PostFactory(title_ru='Зимняя рыбалка')
+        assert _get_titles('рыбалка') == ['Рыбалка на озере', 'Зимняя рыбалка']
+
+    def test_only_published_posts(self, title_index):
+        PostFactory(title_ru='Рыбалка', draft=True)
+        PostFactory(title_ru='Рыбалка', publish=timezone.now() + timedelta(days=1))
+        assert _get_titles('рыбалка') == []
+
+    def test_language_with_fallback(self, title_index):
+        PostFactory(title_ru='Рыбалка', title_en='Fishing')
+        PostFactory(title_ru='Рыбная ловля', title_en=None)
+        assert _get_titles('fish', 'en') == ['Fishing']
+        assert _get_titles('рыбн', 'en') == ['Рыбная ловля']
+
+    def test_limit(self, title_index):
+        PostFactory.create_batch(3, title_ru='Рыбалка')
+        assert len(title_index.suggest('рыбалка', 'ru', limit=2)) == 2
+
+    def test_no_queries_after_build(self, title_index, locmem_cache, django_assert_num_queries):
+        PostFactory(title_ru='Рыбалка')
+        _get_titles('рыбалка')
+        with django_assert_num_queries(0):
+            assert _get_titles('рыб') == ['Рыбалка']
+
+    def test_incremental_update(
+        self, title_index, locmem_cache, django_capture_on_commit_callbacks, django_assert_num_queries
+    ):
+        post = PostFactory(title_ru='Рыбалка')
+        _get_titles('рыбалка')
+        with django_capture_on_commit_callbacks(execute=True):
+            PostFactory(title_ru='Рыбалка на озере', author=post.author, category=post.category)
+        with django_capture_on_commit_callbacks(execute=True):
+            post.title_ru = 'Поход в горы'
+            post.save()
+        with django_assert_num_queries(0):
+            assert _get_titles('рыбалка') == ['Рыбалка на озере']
+            assert _get_titles('поход') == ['Поход в горы']
+
+    def test_removed_on_delete(self, title_index, locmem_cache, django_capture_on_commit_callbacks):
+        post = PostFactory(title_ru='Рыбалка')
+        _get_titles('рыбалка')
+        with django_capture_on_commit_callbacks(execute=True):
+            post.delete()
+        assert _get_titles('рыбалка') == []
+
+    def test_rebuild_after_change_in_other_process(self, title_index, locmem_cache, django_capture_on_commit_callbacks):
+        post = PostFactory(title_ru='Рыбалка')
+        _get_titles('рыбалка')
+        # Изменение без сигналов этого процесса: меняется только версия пространства имён индекса
+        Post.objects.filter(id=post.id).update(title_ru='Поход в горы')
+        with django_capture_on_commit_callbacks(execute=True):
+            bump_cache_version(NAMESPACE_POST_TITLES)
+        assert _get_titles('рыбалка') == []
+        assert _get_titles('поход') == ['Поход в горы']
+
+    def test_not_rebuilt_on_comments_and_categories(
+        self, title_index, locmem_cache, django_capture_on_commit_callbacks, django_assert_num_queries
+    ):
+        post = PostFactory(title_ru='Рыбалка')
+        _get_titles('рыбалка')
+        with django_capture_on_commit_callbacks(execute=True):
+            CommentFactory(post=post)
+            post.tags.add('fishing')
+            CategoryFactory()
+        with django_assert_num_queries(0):
+            assert _get_titles('рыбалка') == ['Рыбалка']
+
+
+class SuggestViewTest:
+    """Тестирование эндпоинта подсказок заголовков постов"""
+
+    def test_suggest(self, title_index):
+        post = PostFactory(title_ru='Рыбалка')
+        response = APIClient().get('/api/v1/posts/suggest/', {'q': 'рыб'})
+        assert response.status_code == 200
+        assert response.json() == [{'title': 'Рыбалка', 'url': post.url}]
+
+    def test_suggest_without_q(self, title_index):
+        response = APIClient().get('/api/v1/posts/suggest/')
+        assert response.status_code == 400
@@ -38,6 +38,7 @@ class AuthorViewSetTest:
         expected_status_code = 404
         assert fact_status_code == expected_status_code
 
+    @pytest.mark.django_db
     @mock.patch('users.views.AuthorListSerializer')
     @mock.patch('users.views.AuthorViewSet.get_queryset')
     def test_view_list_get_serializer_class(self, mock_queryset, mock_serializer):
@@ -46,6 +47,7 @@ class AuthorViewSetTest:
         _ = self._make_request_list()
         mock_serializer.assert_called_once()
 
+    @pytest.mark.django_db
     @mock.patch('users.views.AuthorDetailSerializer')
     @mock.patch('users.views.AuthorViewSet.get_object')
     def test_view_retrieve_get_serializer_class(self, mock_object, mock_serializer):
@@ -55,6 +57,7 @@ class AuthorViewSetTest:
         _ = APIClient().get(f'/api/v1/authors/{test_user_id}/')
         mock_serializer.assert_called_once()
 
+    @pytest.mark.django_db
     @mock.patch('users.views.get_cached_objects_or_queryset')
     def test_view_list_get_queryset_return_mock(self, mock_get_cached_objects_or_queryset):
         _ = self._make_request_list()
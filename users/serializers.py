@@ -4,12 +4,24 @@ from rest_framework import serializers
 from users.models import User
 
 
+def _serialize_last_posts(author: User, fields: tuple[str, ...]) -> list:
+    """Последние посты автора, предварительно выбранные в сервисном слое (см. queryset._prefetch_last_posts())"""
+    from blog.serializers import PostsSerializer
+
+    return PostsSerializer(author.last_posts, many=True, fields=fields).data
+
+
 class AuthorListSerializer(serializers.ModelSerializer):
     """Список авторов"""
 
+    last_posts = serializers.SerializerMethodField()
+
+    def get_last_posts(self, obj):
+        return _serialize_last_posts(obj, fields=('title', 'url', 'publish'))
+
     class Meta:
         model = User
-        fields = ('id', 'username', 'image', 'description')
+        fields = ('id', 'username', 'image', 'description', 'last_posts')
 
 
 class AuthorDetailSerializer(serializers.ModelSerializer):
@@ -31,13 +43,7 @@ class AuthorDetailSerializer(serializers.ModelSerializer):
                 self.fields.pop(field_name)
 
     def get_last_posts(self, obj):
-        from blog.serializers import PostsSerializer
-
-        return PostsSerializer(
-            obj.last_3_posts,
-            many=True,
-            fields=('title', 'category', 'url', 'body', 'image', 'publish', 'tags'),
-        ).data
+        return _serialize_last_posts(obj, fields=('title', 'category', 'url', 'body', 'image', 'publish', 'tags'))
 
     class Meta:
         model = User
@@ -1,6 +1,7 @@
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch.dispatcher import receiver
 
+from services.caching import NAMESPACE_AUTHOR, NAMESPACE_AUTHORS, NAMESPACE_POSTS, bump_cache_version, make_namespace
 from users.models import User
 
 
@@ -18,3 +19,17 @@ def user_image_file_delete_when_replace(sender, instance, **kwargs):
         old_instance = User.objects.get(id=instance.id)
         if old_instance.image and old_instance.image != instance.image:
             old_instance.image.delete(save=False)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def clear_cache_when_changing_user(sender, instance, update_fields=None, **kwargs):
+    """
+    Удаляет старые данные авторов из кэша при изменении или удалении пользователя.
+    Данные постов (содержат имя автора) удаляются, только если могло измениться имя пользователя
+    (например, обновление last_login при входе в панель администратора кэш постов не затрагивает)
+    """
+    namespaces = [NAMESPACE_AUTHORS, make_namespace(NAMESPACE_AUTHOR, instance.pk)]
+    if update_fields is None or 'username' in update_fields:
+        namespaces.append(NAMESPACE_POSTS)
+    bump_cache_version(*namespaces)
@@ -2,7 +2,7 @@
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
 from blog_by_me_DRF.settings import KEY_AUTHOR_DETAIL, KEY_AUTHORS_LIST
-from services.caching import get_cached_objects_or_queryset
+from services.caching import CachedResponseMixin, get_cached_objects_or_queryset
 from users.serializers import AuthorDetailSerializer, AuthorListSerializer
 
 # from rest_framework.request import Request
@@ -46,9 +46,20 @@ from users.serializers import AuthorDetailSerializer, AuthorListSerializer
 #         return get_cached_objects_or_queryset(KEY_AUTHOR_DETAIL, pk=self.kwargs['pk'])
 
 
-class AuthorViewSet(ReadOnlyModelViewSet):
+class AuthorViewSet(CachedResponseMixin, ReadOnlyModelViewSet):
     """Вывод списка авторов и данных об отдельном авторе"""
 
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_response_cache_dependencies(self):
+        if self.action == 'retrieve':
+            return KEY_AUTHOR_DETAIL, {'pk': self.kwargs['pk']}
+        return KEY_AUTHORS_LIST, {}
+
     def get_serializer_class(self):
         if self.action == 'list':
             return AuthorListSerializer